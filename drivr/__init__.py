@@ -1,12 +1,57 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response, status
+from fastapi.responses import JSONResponse
 
+from drivr import cache, core, security
+from drivr.api.middleware import MetricsMiddleware, QueryRecorderMiddleware
 from drivr.api.v1 import router
+from drivr.core import metrics
 
 app = FastAPI()
 app.include_router(router)
+app.add_middleware(
+    QueryRecorderMiddleware,
+    budget=core.settings.QUERY_BUDGET,
+    repeat_threshold=core.settings.QUERY_REPEAT_THRESHOLD,
+    server_timing=core.settings.SERVER_TIMING,
+)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(security.PasswordHashingUnavailable)
+async def password_hashing_unavailable(
+    request: Request,
+    exception: security.PasswordHashingUnavailable,
+):
+    """Answer with 503 while the password work is saturated."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The service is busy, try again later."},
+        headers={"Retry-After": str(exception.retry_after)},
+    )
+
+
+@app.on_event("shutdown")
+def shutdown_password_hashing_pool():
+    """Stop the password hashing processes."""
+    security.password.pool.shutdown()
+
+
+@app.on_event("shutdown")
+async def shutdown_response_cache():
+    """Close the connections of the response cache backend."""
+    if cache.response_cache.backend is not None:
+        await cache.response_cache.backend.close()
 
 
 @app.get("/")
 async def home():
     """The home route of our API."""
     return {"message": "Hello from drivr's API."}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """The metrics of the process, in the Prometheus text format."""
+    return Response(
+        content=metrics.registry.expose(), media_type=metrics.CONTENT_TYPE
+    )
@@ -0,0 +1,156 @@
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from hashlib import blake2b
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Type, Union
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+from drivr.db.entity import Entity
+
+# The columns queried to check the client's copy, before the full query.
+VERSION_FIELDS = ["id", "updated_at"]
+
+Entities = Union[Entity, Sequence[Entity], None]
+
+
+def representation(
+    schema: Type[BaseModel],
+    fields: Optional[Sequence[str]] = None,
+) -> str:
+    """
+    Identify the representation of the entities sent by a response.
+
+    Args:
+        schema: the schema of the response.
+        fields: the fields sent, defaults to every field of the schema.
+
+    Returns:
+        The schema and the fields, e.g. `User(email,active)`.
+    """
+    return f"{schema.__name__}({','.join(fields or schema.__fields__)})"
+
+
+def validators(
+    entities: Entities,
+    representation: str = "",
+) -> Dict[str, str]:
+    """
+    The `ETag` and `Last-Modified` headers of the entities.
+
+    The (strong) entity tag is a digest of the representation and of the
+    table, `id` and `updated_at` of each entity, so it changes when an
+    entity is updated, added or removed, and differs between the
+    representations (e.g. the sparse fields) of the same entities.
+
+    Args:
+        entities: the entity, or the list of entities, of the response,
+            including the related entities it sends.
+        representation: the `representation` of the response.
+
+    Returns:
+        The headers, without `Last-Modified` when there are no entities.
+    """
+    entities = _as_list(entities)
+    digest = blake2b(representation.encode(), digest_size=16)
+
+    for entity in entities:
+        digest.update(
+            f"{entity.__tablename__}:{entity.id}:"
+            f"{entity.updated_at.isoformat()};".encode()
+        )
+
+    headers = {"ETag": f'"{digest.hexdigest()}"'}
+
+    if entities:
+        last_modified = max(entity.updated_at for entity in entities)
+        headers["Last-Modified"] = format_datetime(
+            last_modified.replace(tzinfo=timezone.utc), usegmt=True
+        )
+
+    return headers
+
+
+def is_conditional(request: Request) -> bool:
+    """Whether the request carries any validator of a cached copy."""
+    return (
+        "if-none-match" in request.headers
+        or "if-modified-since" in request.headers
+    )
+
+
+def is_not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """
+    Evaluate `If-None-Match` and `If-Modified-Since` (RFC 7232).
+
+    `If-Modified-Since` is ignored when `If-None-Match` is sent, since only
+    the entity tag notices a removed entity.
+
+    Args:
+        request: the conditional request.
+        headers: the validators of the current representation.
+
+    Returns:
+        Whether the client's copy is current.
+    """
+    if (if_none_match := request.headers.get("if-none-match")) is not None:
+        tags = {
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        }
+        return "*" in tags or headers["ETag"] in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_modified_since is None or "Last-Modified" not in headers:
+        return False
+
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+    return since.tzinfo is not None and (
+        parsedate_to_datetime(headers["Last-Modified"]) <= since
+    )
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """The `304 Not Modified` response, with the validators."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+async def check(
+    request: Request,
+    versions: Callable[[], Awaitable[Entities]],
+    representation: str = "",
+) -> Optional[Response]:
+    """
+    Answer a conditional request without querying the full entities.
+
+    Args:
+        request: the request.
+        versions: queries the entities of the response, loading only the
+            `VERSION_FIELDS`.
+        representation: the `representation` of the response.
+
+    Returns:
+        The `304` response if the client's copy is current, otherwise
+        `None` and the response must be built.
+    """
+    if not is_conditional(request):
+        return None
+
+    if (entities := await versions()) is None:
+        return None
+
+    headers = validators(entities, representation)
+
+    return not_modified(headers) if is_not_modified(request, headers) else None
+
+
+def _as_list(entities: Entities) -> Sequence[Entity]:
+    if entities is None:
+        return []
+    if isinstance(entities, Entity):
+        return [entities]
+    return entities
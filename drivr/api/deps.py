@@ -1,46 +1,89 @@
-from typing import Generator, Optional
+from hashlib import sha256
+from time import time
+from typing import AsyncGenerator, Callable, List, Optional, Type
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt import PyJWTError, decode
-from pydantic import ValidationError
-from sqlalchemy.orm.session import Session
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from drivr import core, crud, db, model, schema
+from drivr.core.cache import TTLCache, cache_metrics
+from drivr.core.metrics import registry
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl="/login")
 
+# The validated payloads, keyed by the token digest, kept until they expire.
+token_payloads = TTLCache(
+    maxsize=core.settings.ACCESS_TOKEN_CACHE_SIZE,
+    ttl=core.settings.ACCESS_TOKEN_EXPIRATION * 60,
+)
+registry.collector(lambda: cache_metrics("access_token", token_payloads))
 
-def db_session() -> Generator:
+
+async def db_session() -> AsyncGenerator:
     """Get the database session."""
 
     session = db.SessionLocal()
     try:
         yield session
     finally:
-        session.close()
+        await session.close()
+
+
+def decode_token(token: str) -> schema.TokenPayload:
+    """
+    Decode and validate the access token.
+
+    The payload is memoized until the token expires, so a token reused by
+    the client is verified (signature and schema) only once per process.
+
+    Args:
+        token: the encoded JWT.
+
+    Raises:
+        PyJWTError: when the token can not be decoded or has expired.
+        ValidationError: when the payload does not match the schema.
 
+    Returns:
+        The validated token payload.
+    """
+    key = sha256(token.encode()).hexdigest()
 
-def get_authenticated_user(
-    db: Session = Depends(db_session),
+    if (token_payload := token_payloads.get(key)) is not None:
+        return token_payload
+
+    payload = decode(
+        jwt=token,
+        key=core.settings.SECRET_KEY,
+        algorithms=[core.settings.ACCESS_TOKEN_ALGORITHM],
+    )
+    token_payload = schema.TokenPayload(**payload)
+
+    if "exp" not in payload:
+        token_payloads.set(key, token_payload)
+    elif (ttl := payload["exp"] - time()) > 0:
+        token_payloads.set(key, token_payload, ttl=ttl)
+
+    return token_payload
+
+
+async def get_authenticated_user(
+    db: AsyncSession = Depends(db_session),
     token: str = Depends(reusable_oauth2),
 ) -> Optional[model.User]:
     """Get the current authenticated user."""
 
     try:
-        payload = decode(
-            jwt=token,
-            key=core.settings.SECRET_KEY,
-            algorithms=[core.settings.ACCESS_TOKEN_ALGORITHM],
-        )
-        token_payload = schema.TokenPayload(**payload)
+        token_payload = decode_token(token)
     except (PyJWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate the user credentials.",
         )
 
-    user = crud.users.get(db=db, id=token_payload.sub)
+    user = await crud.users.get_cached(db=db, id=token_payload.sub)
 
     if not user:
         raise HTTPException(
@@ -77,3 +120,45 @@ def get_authenticated_moderator(
         )
 
     return user
+
+
+def sparse_fields(
+    schema: Type[BaseModel],
+) -> Callable[..., Optional[List[str]]]:
+    """
+    Create the dependency parsing the `fields` query param of the schema.
+
+    Args:
+        schema: the schema exposed by the endpoint.
+
+    Returns:
+        The dependency, which gets the fields requested (`None` when the
+        param is missing) and answers 400 to the unknown ones.
+    """
+
+    example = ",".join(list(schema.__fields__)[:2])
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None,
+            description=(
+                f"The comma separated fields to send, e.g. `{example}`."
+            ),
+        )
+    ) -> Optional[List[str]]:
+        if fields is None:
+            return None
+
+        names = {name.strip() for name in fields.split(",") if name.strip()}
+
+        if unknown := sorted(names.difference(schema.__fields__)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown)}.",
+            )
+
+        # In the schema's order and once each, so the same fields requested
+        # differently share their serializer and validators.
+        return [name for name in schema.__fields__ if name in names] or None
+
+    return dependency
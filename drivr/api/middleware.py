@@ -0,0 +1,161 @@
+import logging
+from time import perf_counter
+from typing import Any, Callable, Dict
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from drivr.core.metrics import Counter, Gauge, HistogramFamily, registry
+from drivr.db.recorder import QueryRecorder, recording
+
+logger = logging.getLogger(__name__)
+
+requests_total = registry.register(
+    Counter(
+        "http_requests_total",
+        "The HTTP requests served.",
+        ["method", "route", "status"],
+    )
+)
+request_duration = registry.register(
+    HistogramFamily(
+        "http_request_duration_seconds",
+        "The seconds taken to serve the HTTP requests.",
+        ["method", "route"],
+    )
+)
+requests_in_progress = registry.register(
+    Gauge(
+        "http_requests_in_progress",
+        "The HTTP requests being served.",
+        ["method"],
+    )
+)
+
+# The route label of the requests that match no route.
+UNMATCHED = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Record the latency, status and concurrency of the HTTP requests.
+
+    The requests are labeled by the path template of the route (e.g.
+    `/users/{id}/reports`), so the number of series stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Dict[Callable, str] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """Serve the request, recording it once the response is sent."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started_at = perf_counter()
+
+        async def send_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        requests_in_progress.inc(method)
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            requests_in_progress.dec(method)
+            route = self._route(scope)
+            requests_total.inc(method, route, str(status))
+            request_duration.observe(
+                method, route, value=perf_counter() - started_at
+            )
+
+    def _route(self, scope: Scope) -> str:
+        # The router adds the endpoint of the matched route to the scope.
+        if (endpoint := scope.get("endpoint")) is None:
+            return UNMATCHED
+
+        if endpoint not in self._routes:
+            self._routes.update(_endpoint_paths(scope["app"]))
+
+        return self._routes.get(endpoint, UNMATCHED)
+
+
+class QueryRecorderMiddleware:
+    """
+    Record the SQL statements executed by each HTTP request.
+
+    The number of statements and the time spent on them are sent in the
+    `Server-Timing` header, and the requests over the query budget or
+    repeating a `SELECT` (N+1) are logged as warnings.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        budget: int,
+        repeat_threshold: int,
+        server_timing: bool = True,
+    ):
+        self.app = app
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """Serve the request, recording the statements it executes."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with recording() as recorder:
+
+            async def send_timing(message: Message):
+                # A streamed body may query on, after the headers are sent.
+                if (
+                    self.server_timing
+                    and message["type"] == "http.response.start"
+                ):
+                    message.setdefault("headers", [])
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", recorder.server_timing()
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_timing)
+            finally:
+                self._report(scope, recorder)
+
+    def _report(self, scope: Scope, recorder: QueryRecorder):
+        request = f"{scope['method']} {scope['path']}"
+
+        if recorder.count > self.budget:
+            logger.warning(
+                "%s executed %d queries (budget %d) in %.1f ms.",
+                request,
+                recorder.count,
+                self.budget,
+                recorder.duration * 1000,
+            )
+
+        for statement, count in recorder.repeated(self.repeat_threshold):
+            logger.warning(
+                "%s executed the same query %d times (N+1?): %s",
+                request,
+                count,
+                statement,
+            )
+
+
+def _endpoint_paths(app: Any) -> Dict[Callable, str]:
+    return {
+        route.endpoint: route.path
+        for route in app.routes
+        if hasattr(route, "endpoint")
+    }
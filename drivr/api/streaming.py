@@ -0,0 +1,245 @@
+import csv
+import io
+import json
+from enum import Enum
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from drivr.api import responses
+from drivr.db.entity import Entity
+
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+MEDIA_TYPES = (NDJSON, CSV)
+
+# The bytes buffered before each chunk of the exports is sent.
+CHUNK_SIZE = 64 * 1024
+
+
+class ExportFormat(str, Enum):
+    """The formats of the export endpoints."""
+
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+async def read_lines(
+    chunks: AsyncIterable[bytes],
+    max_size: int,
+) -> AsyncIterator[Optional[str]]:
+    """
+    Split a stream of bytes in lines, as the chunks arrive.
+
+    The lines longer than `max_size` bytes are dropped as they arrive, so
+    they are never buffered whole.
+
+    Args:
+        chunks: the (UTF-8) chunks of the stream.
+        max_size: the bytes of the longest line read.
+
+    Returns:
+        An iterator over the lines, without the line terminators, which are
+        `None` when too long or not valid UTF-8.
+    """
+    buffer = b""
+    # Whether the rest of the current line is dropped, as it is too long.
+    dropping = False
+
+    async for chunk in chunks:
+        *lines, buffer = (buffer + chunk).split(b"\n")
+
+        for line in lines:
+            yield None if dropping else _decode(line, max_size)
+            dropping = False
+
+        if len(buffer) > max_size:
+            buffer, dropping = b"", True
+
+    if buffer or dropping:
+        yield None if dropping else _decode(buffer, max_size)
+
+
+def _decode(line: bytes, max_size: int) -> Optional[str]:
+    if len(line) > max_size:
+        return None
+
+    try:
+        return line.rstrip(b"\r").decode(errors="strict")
+    except UnicodeDecodeError:
+        return None
+
+
+async def read_rows(
+    chunks: AsyncIterable[bytes],
+    media_type: str,
+    max_line_size: int,
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """
+    Parse a stream of NDJSON objects or CSV records, one row at a time.
+
+    The first line of a CSV stream is the header naming the fields. The
+    blank lines are skipped, but still counted.
+
+    Args:
+        chunks: the (UTF-8) chunks of the stream.
+        media_type: either `NDJSON` or `CSV`.
+        max_line_size: the bytes of the longest line read, the longer ones
+            are malformed.
+
+    Returns:
+        An iterator over the line number of each row and its fields, which
+        are `None` when the line is malformed.
+    """
+    header = None
+    number = 0
+
+    async for line in read_lines(chunks, max_line_size):
+        number += 1
+
+        if line is None:
+            yield number, None
+            # Without the header, none of the records can be read.
+            if media_type == CSV and header is None:
+                header = []
+            continue
+
+        if not line.strip():
+            continue
+
+        if media_type == NDJSON:
+            yield number, _parse_json(line)
+        elif header is None:
+            header = next(csv.reader([line]))
+        else:
+            values = next(csv.reader([line]))
+            yield number, (
+                dict(zip(header, values))
+                if len(values) == len(header)
+                else None
+            )
+
+
+def _parse_json(line: str) -> Optional[Dict[str, Any]]:
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return None
+
+    return row if isinstance(row, dict) else None
+
+
+def export(
+    entities: AsyncIterable[Entity],
+    schema: Type[BaseModel],
+    format: ExportFormat,
+    filename: str,
+) -> StreamingResponse:
+    """
+    Stream the entities as an NDJSON or CSV attachment.
+
+    Each entity is serialized as soon as it is fetched, so the memory used
+    does not depend on the number of entities.
+
+    Args:
+        entities: the entities to export.
+        schema: the schema used to expose each entity.
+        format: the format of the export.
+        filename: the name of the attachment, without the extension.
+
+    Returns:
+        The streaming response.
+    """
+    if format == ExportFormat.csv:
+        media_type, lines = CSV, write_csv(entities, schema)
+    else:
+        media_type, lines = NDJSON, write_ndjson(entities, schema)
+
+    return StreamingResponse(
+        _chunked(lines),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{filename}.{format.value}"'
+            )
+        },
+    )
+
+
+async def write_ndjson(
+    entities: AsyncIterable[Entity],
+    schema: Type[BaseModel],
+) -> AsyncIterator[str]:
+    """
+    Serialize each entity as a line of JSON.
+
+    Args:
+        entities: the entities to serialize.
+        schema: the schema used to expose each entity.
+
+    Returns:
+        An iterator over the lines.
+    """
+    serialize = responses.serializer(schema)
+
+    async for entity in entities:
+        yield responses.dumps(serialize(entity)).decode() + "\n"
+
+
+async def write_csv(
+    entities: AsyncIterable[Entity],
+    schema: Type[BaseModel],
+) -> AsyncIterator[str]:
+    """
+    Serialize each entity as a CSV record, after the header.
+
+    Args:
+        entities: the entities to serialize.
+        schema: the schema used to expose each entity, whose fields are the
+            columns.
+
+    Returns:
+        An iterator over the lines.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    fields = list(schema.__fields__)
+
+    def record(values: List[Any]) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue()
+
+    yield record(fields)
+
+    async for entity in entities:
+        row = jsonable_encoder(schema.from_orm(entity))
+        yield record([row[field] for field in fields])
+
+
+async def _chunked(lines: AsyncIterable[str]) -> AsyncIterator[bytes]:
+    chunk = []
+    size = 0
+
+    async for line in lines:
+        chunk.append(line)
+        size += len(line)
+
+        if size >= CHUNK_SIZE:
+            yield "".join(chunk).encode()
+            chunk, size = [], 0
+
+    if chunk:
+        yield "".join(chunk).encode()
@@ -1,7 +1,11 @@
 from fastapi.routing import APIRouter
 
-from .endpoints import login, users
+from .endpoints import login, monitoring, reports, users
 
 router = APIRouter()
 router.include_router(login.router, prefix="/login", tags=["Login"])
 router.include_router(users.router, prefix="/users", tags=["Users"])
+router.include_router(reports.router, prefix="/reports", tags=["Reports"])
+router.include_router(
+    monitoring.router, prefix="/monitoring", tags=["Monitoring"]
+)
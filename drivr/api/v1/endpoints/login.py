@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm.session import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from drivr import crud, schema, security
 from drivr.api import deps
@@ -15,19 +15,21 @@ router = APIRouter()
     responses={
         200: {"model": schema.Token},
         400: {"model": schema.Detail},
+        503: {"model": schema.Detail},
     },
 )
 async def login(
     form: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(deps.db_session),
+    db: AsyncSession = Depends(deps.db_session),
 ):
     """Authenticate and create the access token."""
 
-    user = crud.users.authenticate(
-        db=db,
-        email=form.username,
-        password=form.password,
-    )
+    async with security.login_admission.admit():
+        user = await crud.users.authenticate(
+            db=db,
+            email=form.username,
+            password=form.password,
+        )
 
     if not user:
         raise HTTPException(
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, status
+from fastapi.params import Depends
+
+from drivr import cache, db, schema
+from drivr.api import deps
+
+router = APIRouter()
+
+
+@router.get(
+    "/db-pool",
+    summary="Get the live statistics of the database connection pool.",
+    response_model=schema.PoolStatus,
+    status_code=status.HTTP_200_OK,
+)
+async def get_db_pool_status(_=Depends(deps.get_authenticated_moderator)):
+    """GET method."""
+
+    return db.pool_status(db.engine.sync_engine.pool)
+
+
+@router.get(
+    "/response-cache",
+    summary="Get the counters of the response cache.",
+    response_model=schema.ResponseCacheStats,
+    status_code=status.HTTP_200_OK,
+)
+async def get_response_cache_stats(
+    _=Depends(deps.get_authenticated_moderator),
+):
+    """GET method."""
+
+    return {
+        "enabled": cache.response_cache.enabled,
+        **cache.response_cache.stats(),
+    }
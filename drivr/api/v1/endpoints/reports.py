@@ -0,0 +1,328 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Query, Request, Response, status
+from fastapi.exceptions import HTTPException
+from fastapi.params import Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from drivr import cache, core, crud, model, schema
+from drivr.api import conditional, deps, responses, streaming
+from drivr.crud.cursor import InvalidCursor
+
+router = APIRouter()
+
+# The report bodies are deferred by the mapping, but sent by default.
+FIELDS = list(schema.Report.__fields__)
+
+
+@router.get(
+    "/",
+    summary="Get all the reports.",
+    response_model=List[schema.Report],
+    status_code=status.HTTP_200_OK,
+    responses={304: {}, 400: {"model": schema.Detail}},
+)
+@cache.response_cache.cached("report")
+async def get_reports(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=core.settings.PAGINATION_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(deps.sparse_fields(schema.Report)),
+    db: AsyncSession = Depends(deps.db_session),
+    user: model.User = Depends(deps.get_authenticated_active_user),
+):
+    """
+    GET method.
+
+    The cursor of the next page, if any, is sent in the `X-Next-Cursor`
+    header. Unlike `skip`, it costs the same regardless of the depth.
+
+    With `fields`, only the columns of the fields are queried and sent, e.g.
+    `id,created_at` leaves the report bodies out.
+
+    The page is sent with an `ETag` and `Last-Modified`. A conditional
+    request whose copy is current gets a `304` and the page is not loaded.
+    """
+
+    representation = conditional.representation(schema.Report, fields)
+
+    try:
+        if not_modified := await conditional.check(
+            request,
+            lambda: crud.reports.all(
+                db=db,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                fields=conditional.VERSION_FIELDS,
+            ),
+            representation,
+        ):
+            return not_modified
+
+        reports = await crud.reports.all(
+            db=db,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            fields=fields or FIELDS,
+        )
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+
+    if next_cursor := crud.reports.next_cursor(reports, limit=limit):
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    response.headers.update(conditional.validators(reports, representation))
+
+    return responses.json_response(
+        reports, schema.Report, fields=fields, headers=dict(response.headers)
+    )
+
+
+@router.get(
+    "/with-user",
+    summary="Get all the reports, with their authors.",
+    response_model=List[schema.ReportWithUser],
+    status_code=status.HTTP_200_OK,
+    responses={304: {}, 400: {"model": schema.Detail}},
+)
+@cache.response_cache.cached("report", "user")
+async def get_reports_with_user(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=core.settings.PAGINATION_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(deps.db_session),
+    user: model.User = Depends(deps.get_authenticated_active_user),
+):
+    """
+    GET method.
+
+    The authors are joined in the query of the reports. The cursor of the
+    next page, if any, is sent in the `X-Next-Cursor` header.
+
+    The page is sent with an `ETag` and `Last-Modified`, which also change
+    with the authors. A conditional request whose copy is current gets a
+    `304`.
+    """
+
+    try:
+        reports = await crud.reports.all_with_user(
+            db=db,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            fields=FIELDS,
+        )
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+
+    headers = conditional.validators(
+        [entity for report in reports for entity in (report, report.user)],
+        conditional.representation(schema.ReportWithUser),
+    )
+
+    if conditional.is_not_modified(request, headers):
+        return conditional.not_modified(headers)
+
+    if next_cursor := crud.reports.next_cursor(reports, limit=limit):
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    response.headers.update(headers)
+
+    return responses.json_response(
+        reports, schema.ReportWithUser, headers=dict(response.headers)
+    )
+
+
+@router.get(
+    "/export",
+    summary="Export all the reports.",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {streaming.NDJSON: {}, streaming.CSV: {}}},
+    },
+)
+async def export_reports(
+    format: streaming.ExportFormat = streaming.ExportFormat.ndjson,
+    db: AsyncSession = Depends(deps.db_session),
+    moderator: model.User = Depends(deps.get_authenticated_moderator),
+):
+    """
+    GET method.
+
+    The reports are read through a server-side cursor and sent as they are
+    fetched, so the export runs with flat memory.
+    """
+
+    return streaming.export(
+        crud.reports.stream(db=db, fields=FIELDS),
+        schema=schema.Report,
+        format=format,
+        filename="reports",
+    )
+
+
+@router.get(
+    "/{id}",
+    summary="Get a report.",
+    status_code=status.HTTP_200_OK,
+    response_model=schema.Report,
+    responses={304: {}, 404: {"model": schema.Detail}},
+)
+@cache.response_cache.cached("report")
+async def get_report(
+    id: int,
+    request: Request,
+    db: AsyncSession = Depends(deps.db_session),
+    user: model.User = Depends(deps.get_authenticated_active_user),
+):
+    """
+    GET method.
+
+    The report is sent with an `ETag` and `Last-Modified`. A conditional
+    request whose copy is current gets a `304` and the bodies are not
+    loaded.
+    """
+
+    representation = conditional.representation(schema.Report)
+
+    if not_modified := await conditional.check(
+        request,
+        lambda: crud.reports.get(
+            db=db, id=id, fields=conditional.VERSION_FIELDS
+        ),
+        representation,
+    ):
+        return not_modified
+
+    if report := await crud.reports.get(db=db, id=id, fields=FIELDS):
+        return responses.json_response(
+            report,
+            schema.Report,
+            headers=conditional.validators(report, representation),
+        )
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="No report found for the ID provided.",
+    )
+
+
+@router.post(
+    "/",
+    summary="Create a new report.",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schema.Report,
+)
+async def create_report(
+    schema: schema.ReportCreate,
+    db: AsyncSession = Depends(deps.db_session),
+    user: model.User = Depends(deps.get_authenticated_active_user),
+):
+    """POST method."""
+
+    return await crud.reports.create(
+        db=db,
+        schema={**schema.dict(), "user_id": user.id},
+    )
+
+
+@router.put(
+    "/{id}",
+    summary="Edit an existing report.",
+    status_code=status.HTTP_200_OK,
+    response_model=schema.Report,
+    responses={
+        403: {"model": schema.Detail},
+        404: {"model": schema.Detail},
+    },
+)
+async def edit_report(
+    id: int,
+    schema: schema.ReportUpdate,
+    db: AsyncSession = Depends(deps.db_session),
+    user: model.User = Depends(deps.get_authenticated_active_user),
+):
+    """PUT method."""
+
+    report = await get_owned_report(db=db, id=id, user=user)
+
+    # The report may be removed between the read and the update.
+    if report := await crud.reports.update(db=db, model=report, schema=schema):
+        return report
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="No report found for the ID provided.",
+    )
+
+
+@router.delete(
+    "/{id}",
+    summary="Remove an existing report.",
+    status_code=status.HTTP_200_OK,
+    response_model=schema.Report,
+    responses={
+        403: {"model": schema.Detail},
+        404: {"model": schema.Detail},
+    },
+)
+async def delete_report(
+    id: int,
+    db: AsyncSession = Depends(deps.db_session),
+    user: model.User = Depends(deps.get_authenticated_active_user),
+):
+    """DELETE method."""
+
+    report = await get_owned_report(db=db, id=id, user=user)
+    return await crud.reports.remove(db=db, model=report)
+
+
+async def get_owned_report(
+    db: AsyncSession,
+    id: int,
+    user: model.User,
+) -> model.Report:
+    """
+    Get a report that the user is allowed to change.
+
+    Args:
+        db: the database session.
+        id: the PK value of the report.
+        user: the authenticated user.
+
+    Raises:
+        HTTPException: 404 when the report does not exist and 403 when it
+            belongs to other user (and the user is not a moderator).
+
+    Returns:
+        The report.
+    """
+    report = await crud.reports.get(db=db, id=id, fields=FIELDS)
+
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No report found for the ID provided.",
+        )
+
+    if report.user_id != user.id and not user.moderator:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the author or a moderator can change the report.",
+        )
+
+    return report
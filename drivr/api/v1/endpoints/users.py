@@ -1,31 +1,254 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Query, Request, Response, status
 from fastapi.exceptions import HTTPException
 from fastapi.params import Depends
-from sqlalchemy.orm.session import Session
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from drivr import crud, model, schema
-from drivr.api import deps
+from drivr import cache, core, crud, model, schema, security
+from drivr.api import conditional, deps, responses, streaming
+from drivr.crud.cursor import InvalidCursor
 
 router = APIRouter()
 
+# The report bodies are deferred by the mapping, but sent by default.
+REPORT_FIELDS = list(schema.Report.__fields__)
+
 
 @router.get(
     "/",
     summary="Get all the registered users.",
     response_model=List[schema.User],
     status_code=status.HTTP_200_OK,
+    responses={304: {}, 400: {"model": schema.Detail}},
 )
+@cache.response_cache.cached("user")
 async def get_users(
-    skip: Optional[int] = 0,
-    limit: Optional[int] = 100,
-    db: Session = Depends(deps.db_session),
-    _=Depends(deps.get_authenticated_active_user),
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=core.settings.PAGINATION_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(deps.sparse_fields(schema.User)),
+    db: AsyncSession = Depends(deps.db_session),
+    user: model.User = Depends(deps.get_authenticated_active_user),
+):
+    """
+    GET method.
+
+    The cursor of the next page, if any, is sent in the `X-Next-Cursor`
+    header. Unlike `skip`, it costs the same regardless of the depth.
+
+    With `fields`, only the columns of the fields are queried and sent.
+
+    The page is sent with an `ETag` and `Last-Modified`. A conditional
+    request whose copy is current gets a `304` and the page is not loaded.
+    """
+
+    representation = conditional.representation(schema.User, fields)
+
+    try:
+        if not_modified := await conditional.check(
+            request,
+            lambda: crud.users.all(
+                db=db,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                fields=conditional.VERSION_FIELDS,
+            ),
+            representation,
+        ):
+            return not_modified
+
+        users = await crud.users.all(
+            db=db,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            fields=fields,
+        )
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+
+    if next_cursor := crud.users.next_cursor(users, limit=limit):
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    response.headers.update(conditional.validators(users, representation))
+
+    return responses.json_response(
+        users, schema.User, fields=fields, headers=dict(response.headers)
+    )
+
+
+@router.get(
+    "/with-reports",
+    summary="Get the registered users, with their latest reports.",
+    response_model=List[schema.UserWithReports],
+    status_code=status.HTTP_200_OK,
+    responses={304: {}, 400: {"model": schema.Detail}},
+)
+@cache.response_cache.cached("user", "report")
+async def get_users_with_reports(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=core.settings.PAGINATION_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    reports_limit: int = Query(10, ge=0, le=100),
+    db: AsyncSession = Depends(deps.db_session),
+    user: model.User = Depends(deps.get_authenticated_active_user),
 ):
-    """GET method."""
+    """
+    GET method.
 
-    return crud.users.all(db=db, skip=skip, limit=limit)
+    Up to `reports_limit` reports are sent for each user, newest first.
+    The users and their reports are read by two queries, whatever the size
+    of the page.
+
+    The page is sent with an `ETag` and `Last-Modified`, which also change
+    with the reports. A conditional request whose copy is current gets a
+    `304`.
+    """
+
+    try:
+        users = await crud.users.all_with_reports(
+            db=db,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            reports_limit=reports_limit,
+            report_fields=REPORT_FIELDS,
+        )
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+
+    headers = conditional.validators(
+        [entity for user in users for entity in (user, *user.reports)],
+        conditional.representation(schema.UserWithReports),
+    )
+
+    if conditional.is_not_modified(request, headers):
+        return conditional.not_modified(headers)
+
+    if next_cursor := crud.users.next_cursor(users, limit=limit):
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    response.headers.update(headers)
+
+    return responses.json_response(
+        users, schema.UserWithReports, headers=dict(response.headers)
+    )
+
+
+@router.get(
+    "/export",
+    summary="Export all the registered users.",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {streaming.NDJSON: {}, streaming.CSV: {}}},
+    },
+)
+async def export_users(
+    format: streaming.ExportFormat = streaming.ExportFormat.ndjson,
+    db: AsyncSession = Depends(deps.db_session),
+    moderator: model.User = Depends(deps.get_authenticated_moderator),
+):
+    """
+    GET method.
+
+    The users are read through a server-side cursor and sent as they are
+    fetched, so the export runs with flat memory.
+    """
+
+    return streaming.export(
+        crud.users.stream(db=db, fields=list(schema.User.__fields__)),
+        schema=schema.User,
+        format=format,
+        filename="users",
+    )
+
+
+@router.get(
+    "/{id}/reports",
+    summary="Get the latest reports of an user.",
+    response_model=List[schema.Report],
+    status_code=status.HTTP_200_OK,
+    responses={304: {}, 400: {"model": schema.Detail}},
+)
+@cache.response_cache.cached("report")
+async def get_user_reports(
+    id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=core.settings.PAGINATION_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(deps.sparse_fields(schema.Report)),
+    db: AsyncSession = Depends(deps.db_session),
+    user: model.User = Depends(deps.get_authenticated_active_user),
+):
+    """
+    GET method.
+
+    The reports are sent newest first. The cursor of the next page, if any,
+    is sent in the `X-Next-Cursor` header.
+
+    With `fields`, only the columns of the fields are queried and sent.
+
+    The page is sent with an `ETag` and `Last-Modified`. A conditional
+    request whose copy is current gets a `304` and the page is not loaded.
+    """
+
+    representation = conditional.representation(schema.Report, fields)
+
+    try:
+        if not_modified := await conditional.check(
+            request,
+            lambda: crud.reports.latest_by_user(
+                db=db,
+                user_id=id,
+                limit=limit,
+                cursor=cursor,
+                fields=conditional.VERSION_FIELDS,
+            ),
+            representation,
+        ):
+            return not_modified
+
+        reports = await crud.reports.latest_by_user(
+            db=db,
+            user_id=id,
+            limit=limit,
+            cursor=cursor,
+            fields=fields or REPORT_FIELDS,
+        )
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+
+    if next_cursor := crud.reports.next_cursor(
+        reports,
+        limit=limit,
+        keyset=crud.reports.latest_keyset,
+    ):
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    response.headers.update(conditional.validators(reports, representation))
+
+    return responses.json_response(
+        reports, schema.Report, fields=fields, headers=dict(response.headers)
+    )
 
 
 @router.post(
@@ -35,21 +258,95 @@ async def get_users(
     response_model=schema.User,
     responses={
         409: {"model": schema.Detail},
+        503: {"model": schema.Detail},
     },
 )
 async def create_user(
     schema: schema.UserCreate,
-    db: Session = Depends(deps.db_session),
+    db: AsyncSession = Depends(deps.db_session),
 ):
     """POST method."""
 
-    if user := crud.users.get_by_email(db=db, email=schema.email):
+    async with security.signup_admission.admit():
+        user = await crud.users.create(db=db, schema=schema)
+
+    if user:
+        return user
+
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"The email '{schema.email} is alredy registered.",
+    )
+
+
+@router.post(
+    "/import",
+    summary="Import users in bulk.",
+    status_code=status.HTTP_200_OK,
+    response_model=schema.UserImport,
+    responses={415: {"model": schema.Detail}},
+)
+async def import_users(
+    request: Request,
+    db: AsyncSession = Depends(deps.db_session),
+    moderator: model.User = Depends(deps.get_authenticated_moderator),
+):
+    """
+    POST method.
+
+    The body is streamed as NDJSON (`application/x-ndjson`) or CSV
+    (`text/csv`, with a header line), one user per line. The rows are
+    validated as they arrive and the invalid ones, as well as the ones whose
+    email is already registered, are rejected by line number.
+    """
+
+    content_type = request.headers.get("content-type", "")
+    media_type = content_type.partition(";")[0].strip()
+
+    if media_type not in streaming.MEDIA_TYPES:
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"The email '{user.email} is alredy registered.",
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="The body must be NDJSON or CSV.",
+        )
+
+    rejected = []
+
+    async def users():
+        async for line, row in streaming.read_rows(
+            request.stream(),
+            media_type,
+            max_line_size=core.settings.IMPORT_MAX_LINE_SIZE,
+        ):
+            try:
+                user = schema.UserCreate.parse_obj(row)
+            except ValidationError as ex:
+                rejected.append(
+                    schema.UserImportRejection(
+                        line=line,
+                        detail="; ".join(
+                            f"{'.'.join(map(str, error['loc']))}: "
+                            f"{error['msg']}"
+                            for error in ex.errors()
+                        ),
+                    )
+                )
+            else:
+                yield line, user
+
+    created, conflicts = await crud.users.import_many(db=db, users=users())
+
+    rejected += [
+        schema.UserImportRejection(
+            line=line,
+            detail="The email is already registered.",
         )
+        for line in conflicts
+    ]
 
-    return crud.users.create(db=db, schema=schema)
+    return schema.UserImport(
+        created=created,
+        rejected=sorted(rejected, key=lambda rejection: rejection.line),
+    )
 
 
 @router.put(
@@ -62,13 +359,17 @@ async def create_user(
 async def edit_user(
     id: int,
     schema: schema.UserUpdate,
-    db: Session = Depends(deps.db_session),
+    db: AsyncSession = Depends(deps.db_session),
     moderator: model.User = Depends(deps.get_authenticated_moderator),
 ):
     """PUT method."""
 
-    if user := crud.users.get(db=db, id=id):
-        return crud.users.update(db=db, user=user, schema=schema)
+    if user := await crud.users.get(db=db, id=id):
+        # The user may be removed between the read and the update.
+        user = await crud.users.update(db=db, user=user, schema=schema)
+
+    if user:
+        return user
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -84,13 +385,13 @@ async def edit_user(
 )
 async def delete_user(
     id: int,
-    db: Session = Depends(deps.db_session),
+    db: AsyncSession = Depends(deps.db_session),
     moderator: model.User = Depends(deps.get_authenticated_moderator),
 ):
     """DELETE method."""
 
-    if user := crud.users.get(db=db, id=id):
-        return crud.users.remove(db=db, model=user)
+    if user := await crud.users.get(db=db, id=id):
+        return await crud.users.remove(db=db, model=user)
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,2 @@
+from .backends import *  # noqa
+from .response_cache import *  # noqa
@@ -0,0 +1,288 @@
+import asyncio
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlsplit
+
+from drivr.core.cache import TTLCache
+
+
+class CacheUnavailable(Exception):
+    """Raised when the cache backend can not be reached."""
+
+
+class CacheBackend(ABC):
+    """The storage of the response cache."""
+
+    @abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """
+        Get the values of the keys.
+
+        Args:
+            keys: the cache keys.
+
+        Returns:
+            The value of each key, `None` for the missing ones.
+        """
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float):
+        """
+        Store the value of the key.
+
+        Args:
+            key: the cache key.
+            value: the value to store.
+            ttl: the seconds until the value expires.
+        """
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """
+        Increment the counter of the key, which never expires.
+
+        Args:
+            key: the counter key.
+
+        Returns:
+            The incremented value.
+        """
+
+    async def close(self):
+        """Release the resources of the backend."""
+
+
+class MemoryBackend(CacheBackend):
+    """A process-local backend, for a single worker (or tests)."""
+
+    def __init__(self, maxsize: int):
+        self.values = TTLCache(maxsize=maxsize, ttl=0)
+        self.counters: Dict[str, int] = {}
+        self._lock = Lock()
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Get the values (or counters) of the keys."""
+        return [
+            str(self.counters[key]).encode()
+            if key in self.counters
+            else self.values.get(key)
+            for key in keys
+        ]
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        """Store the value of the key."""
+        self.values.set(key, value, ttl=ttl)
+
+    async def incr(self, key: str) -> int:
+        """Increment the counter of the key."""
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+
+class RESPError(Exception):
+    """An error reply of a Redis-protocol server."""
+
+
+class RESPBackend(CacheBackend):
+    """
+    A backend speaking the Redis protocol (RESP2), shared by the workers.
+
+    Only `MGET`, `SET ... PX` and `INCR` are used, so any server compatible
+    with Redis (e.g. KeyDB, Dragonfly) works.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        pool_size: int = 10,
+        timeout: float = 1.0,
+    ):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle: List[
+            Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+        ] = []
+        # Created on the first command, within the event loop of the app.
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RESPBackend":
+        """
+        Create the backend of a `redis://[:password@]host[:port][/db]` URL.
+
+        Args:
+            url: the URL of the server.
+            kwargs: the other arguments of the backend.
+
+        Returns:
+            The backend, which connects on the first command.
+        """
+        parts = urlsplit(url)
+        return cls(
+            host=parts.hostname or "localhost",
+            port=parts.port or 6379,
+            db=int(parts.path.strip("/") or 0),
+            password=unquote(parts.password) if parts.password else None,
+            **kwargs,
+        )
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Get the values of the keys, in a single `MGET`."""
+        return await self.execute("MGET", *keys)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        """Store the value of the key, expiring in `ttl` seconds."""
+        await self.execute("SET", key, value, "PX", max(int(ttl * 1000), 1))
+
+    async def incr(self, key: str) -> int:
+        """Increment the counter of the key."""
+        return await self.execute("INCR", key)
+
+    async def execute(self, *args: Any) -> Any:
+        """
+        Send a command and read its reply.
+
+        Args:
+            args: the command and its arguments.
+
+        Raises:
+            RESPError: when the server replies with an error.
+            CacheUnavailable: when the server can not be reached in time.
+
+        Returns:
+            The reply of the server.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(
+                        self._connect(), self.timeout
+                    )
+                reply = await asyncio.wait_for(
+                    self._command(*connection, args), self.timeout
+                )
+            except BaseException as ex:
+                # The reply may be half read, so the connection is dropped.
+                if connection is not None:
+                    connection[1].close()
+                if isinstance(ex, (OSError, EOFError, asyncio.TimeoutError)):
+                    raise CacheUnavailable(
+                        str(ex) or type(ex).__name__
+                    ) from ex
+                raise
+
+            self._idle.append(connection)
+
+        if isinstance(reply, RESPError):
+            raise reply
+
+        return reply
+
+    async def close(self):
+        """Close the idle connections."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def _connect(
+        self,
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+
+        for command in (
+            ("AUTH", self.password) if self.password else None,
+            ("SELECT", self.db) if self.db else None,
+        ):
+            if command and isinstance(
+                reply := await self._command(reader, writer, command),
+                RESPError,
+            ):
+                writer.close()
+                raise reply
+
+        return reader, writer
+
+    async def _command(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        args: Sequence[Any],
+    ) -> Any:
+        writer.write(encode_command(args))
+        await writer.drain()
+        return await read_reply(reader)
+
+
+def encode_command(args: Sequence[Any]) -> bytes:
+    """
+    Encode a command as a RESP array of bulk strings.
+
+    Args:
+        args: the command and its arguments (bytes, strings or numbers).
+
+    Returns:
+        The bytes to send.
+    """
+    chunks = [b"*%d\r\n" % len(args)]
+
+    for arg in args:
+        value = arg if isinstance(arg, bytes) else str(arg).encode()
+        chunks.append(b"$%d\r\n%s\r\n" % (len(value), value))
+
+    return b"".join(chunks)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """
+    Read a RESP reply.
+
+    Args:
+        reader: the stream of the connection.
+
+    Raises:
+        EOFError: when the connection is closed mid-reply.
+
+    Returns:
+        The reply: a string, an integer, bytes (or `None`), a list or a
+        `RESPError` (returned, so the connection can be reused).
+    """
+    line = await reader.readline()
+
+    if not line.endswith(b"\r\n"):
+        raise EOFError("The connection was closed.")
+
+    kind, value = line[:1], line[1:-2]
+
+    if kind == b"+":
+        return value.decode()
+    if kind == b"-":
+        return RESPError(value.decode())
+    if kind == b":":
+        return int(value)
+    if kind == b"$":
+        if (size := int(value)) < 0:
+            return None
+        try:
+            return (await reader.readexactly(size + 2))[:-2]
+        except asyncio.IncompleteReadError as ex:
+            raise EOFError("The connection was closed.") from ex
+    if kind == b"*":
+        if (size := int(value)) < 0:
+            return None
+        return [await read_reply(reader) for _ in range(size)]
+
+    raise EOFError(f"Unexpected reply: {line!r}.")
@@ -0,0 +1,254 @@
+import asyncio
+import functools
+from hashlib import blake2b
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+import orjson
+from fastapi import Request, Response, status
+
+from drivr import core
+from drivr.api import conditional
+
+from .backends import (
+    CacheBackend,
+    CacheUnavailable,
+    MemoryBackend,
+    RESPBackend,
+    RESPError,
+)
+
+# The response headers kept along with the body.
+CACHED_HEADERS = ("etag", "last-modified", "x-next-cursor")
+
+
+class ResponseCache:
+    """
+    Cache the responses of the read endpoints.
+
+    A response is cached under its route, query string and auth scope,
+    along with the generation of each namespace (table) it reads. The CRUD
+    actions bump the generation of the namespaces they write, so the stale
+    entries are never read again and just expire.
+
+    Concurrent misses of the same key, in a process, wait for the first one
+    instead of querying the database again. The errors of the backend are
+    counted and the responses are built as if there was no cache.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend],
+        ttl: float,
+        prefix: str = "drivr:responses",
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._flights: Dict[str, "asyncio.Future[Optional[bytes]]"] = {}
+
+    @classmethod
+    def from_url(cls, url: Optional[str], **kwargs: Any) -> "ResponseCache":
+        """
+        Create the cache of a backend URL.
+
+        Args:
+            url: `memory://` or `redis://[:password@]host[:port][/db]`, or
+                `None` to disable the cache.
+            kwargs: the other arguments of the cache.
+
+        Returns:
+            The response cache.
+        """
+        if url is None:
+            backend = None
+        elif url.startswith("memory://"):
+            backend = MemoryBackend(maxsize=core.settings.RESPONSE_CACHE_SIZE)
+        elif url.startswith("redis://"):
+            backend = RESPBackend.from_url(url)
+        else:
+            raise ValueError(f"Unsupported response cache backend: {url}")
+
+        return cls(backend=backend, **kwargs)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether there is a backend to cache the responses."""
+        return self.backend is not None
+
+    def cached(self, *namespaces: str) -> Callable:
+        """
+        Decorate an endpoint whose responses are cached.
+
+        The endpoint must take the `request` and the authenticated `user`,
+        and return a `Response`. Only the `200` responses are cached.
+
+        Args:
+            namespaces: the tables read by the endpoint.
+
+        Returns:
+            The decorator.
+        """
+
+        def decorator(endpoint: Callable[..., Awaitable[Response]]):
+            @functools.wraps(endpoint)
+            async def wrapper(**kwargs: Any) -> Response:
+                return await self.fetch(
+                    request=kwargs["request"],
+                    namespaces=namespaces,
+                    scope="moderator" if kwargs["user"].moderator else "user",
+                    build=lambda: endpoint(**kwargs),
+                )
+
+            return wrapper
+
+        return decorator
+
+    async def fetch(
+        self,
+        request: Request,
+        namespaces: Sequence[str],
+        scope: str,
+        build: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        """
+        Get the cached response of the request, or build and cache it.
+
+        Args:
+            request: the request.
+            namespaces: the tables read to build the response.
+            scope: the part of the authorization the response depends on.
+            build: builds the response on a miss.
+
+        Returns:
+            The response, `304 Not Modified` if the request is conditional
+            and the client's copy is current.
+        """
+        if self.backend is None:
+            return await build()
+
+        try:
+            key = await self._key(request, namespaces, scope)
+            (content,) = await self.backend.get_many([key])
+        except (CacheUnavailable, RESPError):
+            self.errors += 1
+            return await build()
+
+        if content is not None:
+            self.hits += 1
+            return _respond(request, content)
+
+        self.misses += 1
+
+        if (flight := self._flights.get(key)) is not None:
+            if (content := await asyncio.shield(flight)) is not None:
+                return _respond(request, content)
+            return await build()
+
+        self._flights[
+            key
+        ] = flight = asyncio.get_running_loop().create_future()
+        content = None
+
+        try:
+            response = await build()
+
+            if response.status_code == status.HTTP_200_OK:
+                content = _dump(response)
+                await self._store(key, content)
+
+            return response
+        finally:
+            del self._flights[key]
+            flight.set_result(content)
+
+    async def invalidate(self, *namespaces: str):
+        """
+        Drop the responses that read any of the namespaces.
+
+        Args:
+            namespaces: the tables written.
+        """
+        if self.backend is None:
+            return
+
+        try:
+            for namespace in namespaces:
+                await self.backend.incr(self._generation_key(namespace))
+        except (CacheUnavailable, RESPError):
+            self.errors += 1
+
+    def stats(self) -> Dict[str, int]:
+        """The hit/miss/error counters of the cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+    async def _key(
+        self,
+        request: Request,
+        namespaces: Sequence[str],
+        scope: str,
+    ) -> str:
+        generations = await self.backend.get_many(
+            [self._generation_key(namespace) for namespace in namespaces]
+        )
+        digest = blake2b(digest_size=16)
+
+        for part in (
+            request.url.path,
+            "&".join(sorted(str(request.query_params).split("&"))),
+            scope,
+            *(generation or b"0" for generation in generations),
+        ):
+            digest.update(part if isinstance(part, bytes) else part.encode())
+            digest.update(b"\0")
+
+        return f"{self.prefix}:{digest.hexdigest()}"
+
+    def _generation_key(self, namespace: str) -> str:
+        return f"{self.prefix}:generation:{namespace}"
+
+    async def _store(self, key: str, content: bytes):
+        try:
+            await self.backend.set(key, content, ttl=self.ttl)
+        except (CacheUnavailable, RESPError):
+            self.errors += 1
+
+
+def _dump(response: Response) -> bytes:
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name in CACHED_HEADERS
+    }
+    return b"%s\n%s" % (
+        orjson.dumps([response.media_type, headers]),
+        response.body,
+    )
+
+
+def _respond(request: Request, content: bytes) -> Response:
+    meta, _, body = content.partition(b"\n")
+    media_type, headers = orjson.loads(meta)
+    validators = {
+        name: headers[name.lower()]
+        for name in ("ETag", "Last-Modified")
+        if name.lower() in headers
+    }
+
+    if "ETag" in validators and conditional.is_not_modified(
+        request, validators
+    ):
+        return conditional.not_modified(validators)
+
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+response_cache = ResponseCache.from_url(
+    core.settings.RESPONSE_CACHE_URL, ttl=core.settings.RESPONSE_CACHE_TTL
+)
@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+from .metrics import Counter, Gauge, Metric
+
+
+class TTLCache:
+    """A bounded, process-local LRU cache whose entries expire."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = (
+            OrderedDict()
+        )
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the value cached for the key.
+
+        Args:
+            key: the cache key.
+            default: the value returned on a miss.
+
+        Returns:
+            The cached value, or `default` if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] <= monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Cache the value, evicting the least recently used entry if full.
+
+        Args:
+            key: the cache key.
+            value: the value to cache.
+            ttl: the seconds until the entry expires, defaults to `self.ttl`.
+        """
+        expires_at = monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Any:
+        """
+        Remove the entry of the key, if any.
+
+        Args:
+            key: the cache key.
+
+        Returns:
+            The value that was cached, even if expired, or `None`.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry else None
+
+    def clear(self):
+        """Remove all the entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """The hit/miss counters and the occupancy of the cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+
+def cache_metrics(name: str, cache: TTLCache) -> Iterator[Metric]:
+    """
+    The metrics of the cache, read when they are scraped.
+
+    Args:
+        name: the prefix of the metric names, e.g. `access_token`.
+        cache: the cache.
+
+    Returns:
+        The counters of the hits and misses and the gauge of the entries.
+    """
+    stats = cache.stats()
+
+    for counter in ("hits", "misses"):
+        metric = Counter(
+            f"{name}_cache_{counter}_total", f"The {counter} of the cache."
+        )
+        metric.inc(amount=stats[counter])
+        yield metric
+
+    size = Gauge(f"{name}_cache_size", "The entries of the cache.")
+    size.set(value=stats["size"])
+    yield size
@@ -0,0 +1,311 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+# The media type of the Prometheus text exposition format.
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds, from 1ms to 10s (the same defaults of the Prometheus clients).
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """A cumulative histogram of observed values."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = Lock()
+
+    def observe(self, value: float):
+        """
+        Record an observation.
+
+        Args:
+            value: the observed value.
+        """
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        The current state of the histogram.
+
+        Returns:
+            The cumulative count of each upper bound ("+Inf" included),
+            the sum and the count of the observations.
+        """
+        with self._lock:
+            buckets, cumulative = {}, 0
+            for bound, count in zip(self.buckets, self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = self.count
+
+            return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+MetricType = TypeVar("MetricType", bound="Metric")
+
+
+class Metric(ABC):
+    """A family of samples, one for each combination of label values."""
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = Lock()
+
+    @abstractmethod
+    def samples(self) -> Iterator[Sample]:
+        """The name, labels and value of each sample of the family."""
+
+    def expose(self) -> str:
+        """
+        The family in the Prometheus text format.
+
+        Returns:
+            The `HELP` and `TYPE` lines, followed by the samples.
+        """
+        documentation = self.documentation.replace("\\", r"\\").replace(
+            "\n", r"\n"
+        )
+        lines = [
+            f"# HELP {self.name} {documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {value!r}")
+
+        return "\n".join(lines) + "\n"
+
+    def _labels(self, values: Labels) -> Dict[str, str]:
+        if len(values) != len(self.labels):
+            raise ValueError(f"Expected the values of {self.labels}.")
+        return dict(zip(self.labels, values))
+
+
+class Counter(Metric):
+    """A value that only goes up, e.g. the requests served."""
+
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+    ):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        """
+        Increment the value of the labels.
+
+        Args:
+            labels: the label values, in the order of `self.labels`.
+            amount: the increment.
+        """
+        self._labels(labels)
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        """The value of each combination of labels."""
+        with self._lock:
+            values = list(self.values.items())
+
+        for labels, value in values:
+            yield self.name, self._labels(labels), float(value)
+
+
+class Gauge(Counter):
+    """A value that goes up and down, e.g. the requests in progress."""
+
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        """
+        Decrement the value of the labels.
+
+        Args:
+            labels: the label values, in the order of `self.labels`.
+            amount: the decrement.
+        """
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float):
+        """
+        Set the value of the labels.
+
+        Args:
+            labels: the label values, in the order of `self.labels`.
+            value: the new value.
+        """
+        self._labels(labels)
+        with self._lock:
+            self.values[labels] = value
+
+
+class HistogramFamily(Metric):
+    """A histogram for each combination of labels, e.g. the latencies."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        histograms: Optional[Dict[Labels, Histogram]] = None,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+        self.histograms: Dict[Labels, Histogram] = histograms or {}
+
+    def observe(self, *labels: str, value: float):
+        """
+        Record an observation in the histogram of the labels.
+
+        Args:
+            labels: the label values, in the order of `self.labels`.
+            value: the observed value.
+        """
+        if (histogram := self.histograms.get(labels)) is None:
+            self._labels(labels)
+            with self._lock:
+                histogram = self.histograms.setdefault(
+                    labels, Histogram(self.buckets)
+                )
+
+        histogram.observe(value)
+
+    def samples(self) -> Iterator[Sample]:
+        """The buckets, sum and count of each histogram."""
+        with self._lock:
+            histograms = list(self.histograms.items())
+
+        for labels, histogram in histograms:
+            labels = self._labels(labels)
+            snapshot = histogram.snapshot()
+
+            for bound, count in snapshot["buckets"].items():
+                yield (
+                    f"{self.name}_bucket",
+                    {**labels, "le": bound},
+                    float(count),
+                )
+
+            yield f"{self.name}_sum", labels, float(snapshot["sum"])
+            yield f"{self.name}_count", labels, float(snapshot["count"])
+
+
+class Registry:
+    """The metrics exposed by the process."""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: MetricType) -> MetricType:
+        """
+        Expose the metric.
+
+        Args:
+            metric: the metric, updated by the instrumented code.
+
+        Returns:
+            The same metric.
+        """
+        self.metrics.append(metric)
+        return metric
+
+    def collector(
+        self,
+        function: Callable[[], Iterable[Metric]],
+    ) -> Callable[[], Iterable[Metric]]:
+        """
+        Expose the metrics created by the function, on each scrape.
+
+        Used as a decorator, for the values read from elsewhere (e.g. the
+        connection pool) when they are exposed.
+
+        Args:
+            function: returns the current metrics.
+
+        Returns:
+            The same function.
+        """
+        self.collectors.append(function)
+        return function
+
+    def expose(self) -> str:
+        """The metrics in the Prometheus text format."""
+        metrics = [*self.metrics]
+
+        for collector in self.collectors:
+            metrics.extend(collector())
+
+        return "".join(metric.expose() for metric in metrics)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+
+    return "{%s}" % ",".join(
+        '%s="%s"'
+        % (
+            name,
+            str(value)
+            .replace("\\", r"\\")
+            .replace('"', r"\"")
+            .replace("\n", r"\n"),
+        )
+        for name, value in labels.items()
+    )
+
+
+registry = Registry()
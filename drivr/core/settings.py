@@ -1,6 +1,8 @@
+from os import cpu_count
 from secrets import token_urlsafe
 from typing import Any, Dict, List, Optional, Union
 
+from passlib.hash import argon2
 from pydantic import BaseSettings, validator
 from pydantic.networks import AnyHttpUrl, PostgresDsn
 
@@ -21,6 +23,66 @@ class Settings(BaseSettings):
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRATION: int = 60 * 24 * 8
     ACCESS_TOKEN_ALGORITHM: str = "HS256"
+    # The max number of decoded tokens memoized per process.
+    ACCESS_TOKEN_CACHE_SIZE: int = 4096
+
+    # Password hashing (argon2) runs in a process pool, off the event loop.
+    # Up to WORKERS + QUEUE_SIZE hashes may be in flight; beyond that (or
+    # after TIMEOUT seconds) the work is rejected instead of piling up.
+    PASSWORD_HASHING_WORKERS: int = cpu_count() or 1
+    PASSWORD_HASHING_QUEUE_SIZE: int = 64
+    PASSWORD_HASHING_TIMEOUT: float = 5.0
+
+    # The argon2id parameters of the new hashes: the passes, the memory (in
+    # KiB) and the lanes. The hashes made with other parameters are redone
+    # on the next login, so they default to passlib's, which the existing
+    # hashes were made with. Tune them for the hardware with
+    # `python -m drivr.security.calibration`.
+    ARGON2_TIME_COST: int = argon2.default_rounds
+    ARGON2_MEMORY_COST: int = argon2.memory_cost
+    ARGON2_PARALLELISM: int = argon2.parallelism
+
+    # The logins and the signups doing password work at a time (LIMIT), and
+    # waiting for their turn (QUEUE_SIZE), each path on its own budget. The
+    # others, and the ones waiting over PASSWORD_ADMISSION_TIMEOUT seconds,
+    # are answered with 503 and a Retry-After right away.
+    LOGIN_ADMISSION_LIMIT: int = cpu_count() or 1
+    LOGIN_ADMISSION_QUEUE_SIZE: int = 32
+    SIGNUP_ADMISSION_LIMIT: int = max((cpu_count() or 1) // 2, 1)
+    SIGNUP_ADMISSION_QUEUE_SIZE: int = 16
+    PASSWORD_ADMISSION_TIMEOUT: float = 2.0
+
+    # The authenticated users are cached per process, so a change made
+    # through another worker is only seen after the TTL (in seconds).
+    AUTHENTICATED_USER_CACHE_SIZE: int = 1024
+    AUTHENTICATED_USER_CACHE_TTL: float = 30.0
+
+    # The HTML rendered from the reports markdown is cached by the hash of
+    # the content. The documents from MARKDOWN_OFFLOAD_SIZE characters on
+    # are rendered in a thread, off the event loop.
+    MARKDOWN_CACHE_SIZE: int = 1024
+    MARKDOWN_CACHE_TTL: float = 3600.0
+    MARKDOWN_OFFLOAD_SIZE: int = 16 * 1024
+
+    # The report bodies from REPORT_COMPRESSION_THRESHOLD bytes on are
+    # stored compressed (zlib), with the preset dictionary of the file at
+    # REPORT_COMPRESSION_DICTIONARY if any (see `drivr.db.compression`).
+    # The dictionary must not change while there are reports using it.
+    # Turning the compression on or off applies to the bodies written from
+    # then on, `python -m drivr.db.backfill` rewrites the stored ones.
+    REPORT_COMPRESSION: bool = False
+    REPORT_COMPRESSION_THRESHOLD: int = 1024
+    REPORT_COMPRESSION_LEVEL: int = 6
+    REPORT_COMPRESSION_DICTIONARY: Optional[str] = None
+
+    # The responses of the read endpoints are cached for RESPONSE_CACHE_TTL
+    # seconds, and dropped as soon as the data they read is written. The
+    # URL is `memory://` (per process, up to RESPONSE_CACHE_SIZE entries) or
+    # `redis://[:password@]host[:port][/db]` (shared by the workers), and
+    # the cache is disabled when it is not set.
+    RESPONSE_CACHE_URL: Optional[str] = None
+    RESPONSE_CACHE_TTL: float = 30.0
+    RESPONSE_CACHE_SIZE: int = 1024
 
     # BACKEND_CORS_ORIGINS is a JSON-formatted list of origins
     # e.g: '["http://localhost", "http://localhost:4200"]'
@@ -63,6 +125,60 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB') or ''}",
         )
 
+    # The same database, reached through the asyncio driver (asyncpg).
+    SQLALCHEMY_ASYNC_DATABASE_URI: Optional[PostgresDsn] = None
+
+    @validator("SQLALCHEMY_ASYNC_DATABASE_URI", pre=True)
+    def mount_async_database_connection(
+        cls,
+        v: Optional[str],
+        values: Dict[str, Any],
+    ) -> Any:  # pragma: no cover
+        """Mount the database URL connection used by the asyncio engine."""
+
+        if isinstance(v, str):
+            return v
+        _, _, location = str(values.get("SQLALCHEMY_DATABASE_URI")).partition(
+            "://"
+        )
+        return f"postgresql+asyncpg://{location}"
+
+    # Connection pool of each worker process. The timeout and recycle are
+    # in seconds (-1 never recycles the connections).
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+
+    # Behind PgBouncer in transaction mode the pooling is left to PgBouncer
+    # (no idle connections are kept) and asyncpg does not cache prepared
+    # statements, since consecutive transactions may hit other backends.
+    DB_PGBOUNCER_TRANSACTION_MODE: bool = False
+
+    # The rows written by each statement of the bulk CRUD actions, keeping
+    # the bind parameters of a multi-row VALUES under the server limit.
+    DB_BULK_BATCH_SIZE: int = 1000
+
+    # The bytes of the longest line of the imports, the longer ones are
+    # rejected without being buffered.
+    IMPORT_MAX_LINE_SIZE: int = 64 * 1024
+
+    # The rows fetched by each round trip of the server-side cursors used
+    # by the exports.
+    DB_STREAM_BATCH_SIZE: int = 1000
+
+    # The SQL statements of each request are recorded, and reported in the
+    # `Server-Timing` header (when SERVER_TIMING is set). The requests
+    # executing more than QUERY_BUDGET statements, or the same SELECT at
+    # least QUERY_REPEAT_THRESHOLD times (N+1), are logged as warnings.
+    SERVER_TIMING: bool = True
+    QUERY_BUDGET: int = 20
+    QUERY_REPEAT_THRESHOLD: int = 5
+
+    # The upper bound of the `limit` of the list endpoints.
+    PAGINATION_MAX_LIMIT: int = 1000
+
     class Config:
         case_sensitive = True
 
@@ -1,11 +1,34 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Load, load_only, undefer
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+from sqlalchemy.sql.dml import Insert, UpdateBase
+from sqlalchemy.sql.expression import delete, insert, tuple_, update
 
+from drivr import cache, core
+from drivr.core.cache import TTLCache
 from drivr.db.entity import Entity
 
+from .cursor import decode_cursor, encode_cursor
+
 ModelType = TypeVar("ModelType", bound=Entity)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
@@ -14,47 +37,264 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """The generic implementation of CRUD actions."""
 
-    def __init__(self, model: Type[ModelType]):
+    # The (unique) columns used to order the pages of `all`.
+    cursor_columns: Tuple[str, ...] = ("id",)
+
+    # The columns left out of the entities kept by `get_cached`.
+    uncached_columns: Tuple[str, ...] = ()
+
+    # The columns always loaded, from which the validators of the HTTP
+    # conditional requests are computed.
+    version_columns: Tuple[str, ...] = ("id", "updated_at")
+
+    # The namespaces of the response cache written by the CRUD actions,
+    # defaults to the table of the model.
+    namespaces: Tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        model: Type[ModelType],
+        cache: Optional[TTLCache] = None,
+    ):
         self.model = model
+        self.cache = cache
+
+    @property
+    def keyset(self) -> List[InstrumentedAttribute]:
+        """The model attributes the pages are ordered by."""
+        return [getattr(self.model, name) for name in self.cursor_columns]
 
-    def get(self, db: Session, id: int) -> Optional[ModelType]:
+    async def get(
+        self,
+        db: AsyncSession,
+        id: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Optional[ModelType]:
         """
         Query for the entity by the PK value.
 
         Args:
             db: the database session.
             id: the value from the entity PK.
+            fields: the columns to load, defaults to the ones not deferred
+                by the mapping.
 
         Returns:
             The entity associated to the PK value provided if it exists,
             otherwise `None` is returned.
         """
-        return db.query(self.model).filter(self.model.id == id).first()
+        result = await db.execute(
+            select(self.model)
+            .where(self.model.id == id)
+            .options(*self.projection(fields))
+        )
+        return result.scalars().first()
+
+    async def get_cached(
+        self,
+        db: AsyncSession,
+        id: int,
+    ) -> Optional[ModelType]:
+        """
+        Query for the entity by the PK value, going through the cache.
+
+        On a hit, no query is made and a detached copy of the entity (with
+        the cached columns only) is returned. The cache entry is dropped by
+        `update` and `remove`.
+
+        Args:
+            db: the database session.
+            id: the value from the entity PK.
+
+        Returns:
+            The entity associated to the PK value provided if it exists,
+            otherwise `None` is returned.
+        """
+        if self.cache is None:
+            return await self.get(db=db, id=id)
+
+        if (columns := self.cache.get(id)) is not None:
+            return self.model(**columns)
+
+        if entity := await self.get(db=db, id=id):
+            unloaded = inspect(entity).unloaded
+            self.cache.set(
+                id,
+                {
+                    column.key: getattr(entity, column.key)
+                    for column in inspect(self.model).column_attrs
+                    if column.key not in self.uncached_columns
+                    and column.key not in unloaded
+                },
+            )
+
+        return entity
+
+    def projection(
+        self,
+        fields: Optional[Sequence[str]],
+        required: Sequence[str] = (),
+    ) -> List[Load]:
+        """
+        The loader options that narrow the SELECT to the fields.
+
+        The deferred columns are loaded when they are among the fields,
+        and the names that are not columns (e.g. relationships) are ignored.
+        The `version_columns` are always loaded.
+
+        Args:
+            fields: the fields to load, `None` for the mapping defaults.
+            required: the columns always loaded along with the fields.
+
+        Returns:
+            The options for the query.
+        """
+        if fields is None:
+            return []
+
+        columns = inspect(self.model).column_attrs.keys()
+        return [
+            load_only(
+                *(
+                    getattr(self.model, name)
+                    for name in dict.fromkeys(
+                        [*fields, *required, *self.version_columns]
+                    )
+                    if name in columns
+                )
+            )
+        ]
+
+    def invalidate(self, model: ModelType):
+        """
+        Drop the cached copy of the entity, if any.
+
+        Args:
+            model: the entity that changed.
+        """
+        if self.cache is not None:
+            self.cache.pop(model.id)
+
+    async def changed(self):
+        """Drop the cached responses that read the entities of the model."""
+        if cache.response_cache.enabled:
+            await cache.response_cache.invalidate(
+                *(self.namespaces or (self.model.__tablename__,))
+            )
 
-    def all(
+    async def all(
         self,
-        db: Session,
+        db: AsyncSession,
         skip: int = 0,
         limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        options: Sequence[Load] = (),
     ) -> List[ModelType]:
         """
-        Query for all entities.
+        Query for all entities, ordered by the `cursor_columns`.
 
         Args:
             db: the database session.
-            skip: the offset value.
+            skip: the offset value, ignored when a cursor is provided.
             limit: the max number of entities to query.
+            cursor: the cursor returned by `next_cursor` for the previous
+                page. The page starts right after it, regardless of depth.
+            fields: the columns to load (besides the `cursor_columns`),
+                defaults to the ones not deferred by the mapping.
+            options: the extra loader options, e.g. to eager load the
+                relationships of the page.
+
+        Raises:
+            InvalidCursor: when the cursor can not be decoded.
 
         Returns:
             A list of entities based on the query parameters provided.
             If no entity is found, an empty list is returned.
         """
-        return db.query(self.model).offset(skip).limit(limit).all()
+        query = (
+            select(self.model)
+            .options(*self.projection(fields, self.cursor_columns), *options)
+            .order_by(*self.keyset)
+        )
+
+        if cursor is None:
+            query = query.offset(skip)
+        else:
+            query = query.where(
+                tuple_(*self.keyset)
+                > tuple_(*decode_cursor(cursor, self.keyset))
+            )
+
+        result = await db.execute(query.limit(limit))
+        return result.scalars().all()
+
+    async def stream(
+        self,
+        db: AsyncSession,
+        batch_size: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> AsyncIterator[ModelType]:
+        """
+        Iterate over all the entities through a server-side cursor.
+
+        Only one batch of rows is fetched at a time, so the memory used is
+        the same whatever the size of the table.
+
+        Args:
+            db: the database session.
+            batch_size: the rows fetched by each round trip, defaults to the
+                `DB_STREAM_BATCH_SIZE` setting.
+            fields: the columns to load, defaults to the ones not deferred
+                by the mapping.
+
+        Returns:
+            An iterator over the entities, ordered by the keyset.
+        """
+        result = await db.stream(
+            select(self.model)
+            .options(*self.projection(fields, self.cursor_columns))
+            .order_by(*self.keyset)
+            .execution_options(
+                yield_per=batch_size or core.settings.DB_STREAM_BATCH_SIZE
+            )
+        )
+
+        async for entity in result.scalars():
+            yield entity
 
-    def create(self, db: Session, schema: CreateSchemaType) -> ModelType:
+    def next_cursor(
+        self,
+        entities: List[ModelType],
+        limit: int,
+        keyset: Optional[Sequence[InstrumentedAttribute]] = None,
+    ) -> Optional[str]:
+        """
+        Create the cursor of the page following the entities.
+
+        Args:
+            entities: the page returned by `all`.
+            limit: the limit used to query the page.
+            keyset: the attributes the page is ordered by, defaults to
+                `self.keyset`.
+
+        Returns:
+            The cursor of the next page, or `None` for the last page.
+        """
+        if entities and len(entities) >= limit:
+            return encode_cursor(entities[-1], keyset or self.keyset)
+
+    async def create(
+        self,
+        db: AsyncSession,
+        schema: Union[CreateSchemaType, Dict[str, Any]],
+    ) -> ModelType:
         """
         Persist a new entity.
 
+        The entity is read back from the `INSERT ... RETURNING` statement,
+        so the server generated values cost no extra query.
+
         Args:
             db: the database session.
             schema: the schema for create a new entity.
@@ -62,13 +302,123 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         Returns:
             The created entity.
         """
-        entity = self.model(**jsonable_encoder(schema))
-        db.add(entity)
-        db.commit()
-        db.refresh(entity)
+        entity = await self.execute_returning(
+            db=db,
+            statement=self.insert_statement().values(
+                **jsonable_encoder(schema)
+            ),
+        )
+        await db.commit()
+        await self.changed()
         return entity
 
-    def remove(self, db: Session, model: ModelType) -> ModelType:
+    async def create_many(
+        self,
+        db: AsyncSession,
+        schemas: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+        batch_size: Optional[int] = None,
+    ) -> List[ModelType]:
+        """
+        Persist many new entities in a single transaction.
+
+        Each batch is written by one multi-row `INSERT ... RETURNING`.
+
+        Args:
+            db: the database session.
+            schemas: the schemas for create the new entities.
+            batch_size: the entities inserted by each statement, defaults to
+                the `DB_BULK_BATCH_SIZE` setting.
+
+        Returns:
+            The created entities.
+        """
+        entities = []
+
+        for batch in self.batches(schemas, batch_size):
+            entities += await self.execute_returning_all(
+                db=db,
+                statement=self.insert_statement().values(
+                    [jsonable_encoder(schema) for schema in batch]
+                ),
+            )
+
+        await db.commit()
+        await self.changed()
+        return entities
+
+    def insert_statement(self) -> Insert:
+        """The `INSERT` statement used by `create` and `create_many`."""
+        return insert(self.model.__table__)
+
+    def batches(
+        self,
+        items: Sequence[Any],
+        batch_size: Optional[int] = None,
+    ) -> Iterator[Sequence[Any]]:
+        """
+        Split the items in the batches written by each bulk statement.
+
+        Args:
+            items: the items to split.
+            batch_size: the size of the batches, defaults to the
+                `DB_BULK_BATCH_SIZE` setting.
+
+        Returns:
+            An iterator over the (non empty) batches.
+        """
+        batch_size = batch_size or core.settings.DB_BULK_BATCH_SIZE
+
+        for start in range(0, len(items), batch_size):
+            yield items[start : start + batch_size]
+
+    async def execute_returning(
+        self,
+        db: AsyncSession,
+        statement: UpdateBase,
+    ) -> Optional[ModelType]:
+        """
+        Execute the DML statement, loading the entity it returns.
+
+        An entity already in the session is refreshed in place.
+
+        Args:
+            db: the database session.
+            statement: the INSERT/UPDATE/DELETE statement to execute.
+
+        Returns:
+            The entity of the row returned by the statement, or `None` when
+            no row was affected.
+        """
+        result = await db.execute(self._returning(statement))
+        return result.scalars().first()
+
+    async def execute_returning_all(
+        self,
+        db: AsyncSession,
+        statement: UpdateBase,
+    ) -> List[ModelType]:
+        """
+        Execute the DML statement, loading all the entities it returns.
+
+        Args:
+            db: the database session.
+            statement: the INSERT/UPDATE/DELETE statement to execute.
+
+        Returns:
+            The entities of the rows affected by the statement.
+        """
+        result = await db.execute(self._returning(statement))
+        return result.scalars().all()
+
+    def _returning(self, statement: UpdateBase):
+        return (
+            select(self.model)
+            .from_statement(statement.returning(*self.model.__table__.columns))
+            .options(undefer("*"))
+            .execution_options(populate_existing=True)
+        )
+
+    async def remove(self, db: AsyncSession, model: ModelType) -> ModelType:
         """
         Remove an existent entity.
 
@@ -79,39 +429,148 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         Returns:
             The removed entity.
         """
-        db.delete(model)
-        db.commit()
+        await db.delete(model)
+        await db.commit()
+        self.invalidate(model)
+        await self.changed()
         return model
 
-    def update(
+    async def update(
         self,
-        db: Session,
+        db: AsyncSession,
         model: ModelType,
         schema: Union[UpdateSchemaType, Dict[str, Any]],
-    ) -> ModelType:
+    ) -> Optional[ModelType]:
         """
         Update an existing entity.
 
+        The changes are applied by a single `UPDATE ... RETURNING` statement
+        that also refreshes the entity.
+
         Args:
             db: the database session.
             model: the target entity to be updated.
             schema: the schema used to update the entity.
 
         Returns:
-            The updated entity.
+            The updated entity, or `None` when its row no longer exists
+            (e.g. it was removed meanwhile).
         """
-        jsonable_entity = jsonable_encoder(model)
+        if values := self._update_values(schema):
+            updated = await self.execute_returning(
+                db=db,
+                statement=(
+                    update(self.model.__table__)
+                    .where(self.model.__table__.c.id == model.id)
+                    .values(**values)
+                ),
+            )
+            await db.commit()
+
+            if updated is None:
+                return None
+
+            model = updated
+            self.invalidate(model)
+            await self.changed()
+
+        return model
 
+    async def remove_many(
+        self,
+        db: AsyncSession,
+        ids: Sequence[int],
+        batch_size: Optional[int] = None,
+    ) -> List[ModelType]:
+        """
+        Remove many entities in a single transaction.
+
+        Each batch is removed by one `DELETE ... WHERE id IN (...) RETURNING`.
+
+        Args:
+            db: the database session.
+            ids: the PK values of the entities to remove.
+            batch_size: the entities removed by each statement, defaults to
+                the `DB_BULK_BATCH_SIZE` setting.
+
+        Returns:
+            The removed entities, the missing ones are skipped.
+        """
+        table = self.model.__table__
+        entities = []
+
+        for batch in self.batches(ids, batch_size):
+            entities += await self.execute_returning_all(
+                db=db,
+                statement=delete(table).where(table.c.id.in_(batch)),
+            )
+
+        await db.commit()
+
+        for entity in entities:
+            self.invalidate(entity)
+
+        await self.changed()
+        return entities
+
+    async def update_many(
+        self,
+        db: AsyncSession,
+        ids: Sequence[int],
+        schema: Union[UpdateSchemaType, Dict[str, Any]],
+        batch_size: Optional[int] = None,
+    ) -> List[ModelType]:
+        """
+        Apply the same changes to many entities in a single transaction.
+
+        Each batch is updated by one `UPDATE ... WHERE id IN (...) RETURNING`.
+
+        Args:
+            db: the database session.
+            ids: the PK values of the entities to update.
+            schema: the schema used to update the entities.
+            batch_size: the entities updated by each statement, defaults to
+                the `DB_BULK_BATCH_SIZE` setting.
+
+        Returns:
+            The updated entities, the missing ones are skipped.
+        """
+        values = self._update_values(schema)
+
+        if not values:
+            return []
+
+        table = self.model.__table__
+        entities = []
+
+        for batch in self.batches(ids, batch_size):
+            entities += await self.execute_returning_all(
+                db=db,
+                statement=update(table)
+                .where(table.c.id.in_(batch))
+                .values(**values),
+            )
+
+        await db.commit()
+
+        for entity in entities:
+            self.invalidate(entity)
+
+        await self.changed()
+        return entities
+
+    def _update_values(
+        self,
+        schema: Union[UpdateSchemaType, Dict[str, Any]],
+    ) -> Dict[str, Any]:
         if isinstance(schema, dict):
             update_data = schema
         else:
             update_data = schema.dict(exclude_unset=True)
 
-        for field in jsonable_entity:
-            if field in update_data:
-                setattr(model, field, update_data[field])
-
-        db.commit()
-        db.refresh(model)
-
-        return model
+        columns = inspect(self.model).column_attrs.keys()
+        return {
+            field: value
+            for field, value in update_data.items()
+            if field in columns
+        }
@@ -1,6 +1,17 @@
-from drivr import model, schema
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased, joinedload
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+from sqlalchemy.sql.expression import true, tuple_
+
+from drivr import model, render, schema
 
 from .crud_base import CRUDBase
+from .cursor import decode_cursor
 
 
 class CRUDReports(
@@ -12,5 +23,265 @@ class CRUDReports(
 ):
     """CRUD actions associated to the 'report' entity."""
 
+    # The (unique) columns used to order the latest reports of an user,
+    # matching the `ix_report_user_id_created_at` index.
+    latest_columns = ("created_at", "id")
+
+    @property
+    def latest_keyset(self) -> List[InstrumentedAttribute]:
+        """The model attributes the latest reports are ordered by."""
+        return [getattr(model.Report, name) for name in self.latest_columns]
+
+    async def latest_by_user(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[model.Report]:
+        """
+        Query for the reports of the user, newest first.
+
+        The reports are read in the order of the `(user_id, created_at, id)`
+        index, so a page costs the same whatever the number of reports.
+
+        Args:
+            db: the database session.
+            user_id: the PK value of the user.
+            limit: the max number of reports.
+            cursor: the cursor (from `next_cursor`) of the page to get.
+            fields: the columns to load (besides the `latest_columns`),
+                defaults to the ones not deferred by the mapping.
+
+        Raises:
+            InvalidCursor: when the cursor is malformed.
+
+        Returns:
+            The page of reports.
+        """
+        keyset = self.latest_keyset
+        query = (
+            select(model.Report)
+            .options(*self.projection(fields, self.latest_columns))
+            .where(model.Report.user_id == user_id)
+            .order_by(*(column.desc() for column in keyset))
+        )
+
+        if cursor is not None:
+            query = query.where(
+                tuple_(*keyset) < tuple_(*decode_cursor(cursor, keyset))
+            )
+
+        result = await db.execute(query.limit(limit))
+        return result.scalars().all()
+
+    async def latest_by_users(
+        self,
+        db: AsyncSession,
+        user_ids: Sequence[int],
+        limit: int = 10,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict[int, List[model.Report]]:
+        """
+        Query for the latest reports of many users, in a single query.
+
+        For each user, a `LATERAL` subquery reads the ids of its latest
+        reports in the order of the `(user_id, created_at, id)` index, and
+        stops after `limit` of them, so at most `limit` reports per user are
+        read whatever the number of reports.
+
+        Args:
+            db: the database session.
+            user_ids: the PK values of the users.
+            limit: the max number of reports of each user.
+            fields: the columns to load (besides the `latest_columns`),
+                defaults to the ones not deferred by the mapping.
+
+        Returns:
+            The reports of each user, newest first. The users without
+            reports are left out.
+        """
+        if not user_ids:
+            return {}
+
+        latest = aliased(model.Report)
+        ids = (
+            select(latest.id)
+            .where(latest.user_id == model.User.id)
+            .order_by(
+                *(getattr(latest, name).desc() for name in self.latest_columns)
+            )
+            .limit(limit)
+            .lateral()
+        )
+
+        result = await db.execute(
+            select(model.Report)
+            .options(
+                *self.projection(fields, ("user_id", *self.latest_columns))
+            )
+            .select_from(model.User)
+            .join(ids, true())
+            .join(model.Report, model.Report.id == ids.c.id)
+            .where(model.User.id.in_(user_ids))
+            .order_by(
+                model.Report.user_id,
+                *(column.desc() for column in self.latest_keyset),
+            )
+        )
+
+        reports = defaultdict(list)
+        for report in result.scalars():
+            reports[report.user_id].append(report)
+
+        return dict(reports)
+
+    async def all_with_user(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[model.Report]:
+        """
+        Query for all reports, along with their authors.
+
+        The authors are joined in the same query, since each report has at
+        most one.
+
+        Args:
+            db: the database session.
+            skip: the offset value, ignored when a cursor is provided.
+            limit: the max number of reports to query.
+            cursor: the cursor returned by `next_cursor` for the previous
+                page.
+            fields: the columns of the reports to load (besides the
+                `cursor_columns`), defaults to the ones not deferred by the
+                mapping.
+
+        Raises:
+            InvalidCursor: when the cursor can not be decoded.
+
+        Returns:
+            The page of reports, with `Report.user` loaded.
+        """
+        return await self.all(
+            db=db,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            fields=fields,
+            options=[joinedload(model.Report.user)],
+        )
+
+    async def create(
+        self,
+        db: AsyncSession,
+        schema: Union[schema.ReportCreate, Dict[str, Any]],
+    ) -> model.Report:
+        """
+        Persist a new report, along with the HTML rendered from markdown.
+
+        Args:
+            db: the database session.
+            schema: the schema for create the new report.
+
+        Returns:
+            The created report.
+        """
+        return await super().create(
+            db=db, schema=await self._render(self._data(schema))
+        )
+
+    async def create_many(
+        self,
+        db: AsyncSession,
+        schemas: Sequence[Union[schema.ReportCreate, Dict[str, Any]]],
+        batch_size: Optional[int] = None,
+    ) -> List[model.Report]:
+        """
+        Persist many new reports in a single transaction.
+
+        Args:
+            db: the database session.
+            schemas: the schemas for create the new reports.
+            batch_size: the reports inserted by each statement.
+
+        Returns:
+            The created reports.
+        """
+        create_data = await asyncio.gather(
+            *(self._render(self._data(schema)) for schema in schemas)
+        )
+
+        return await super().create_many(
+            db=db, schemas=create_data, batch_size=batch_size
+        )
+
+    async def update(
+        self,
+        db: AsyncSession,
+        model: model.Report,
+        schema: Union[schema.ReportUpdate, Dict[str, Any]],
+    ) -> Optional[model.Report]:
+        """
+        Update an existing report, rendering the HTML of a new markdown.
+
+        Args:
+            db: the database session.
+            model: the report to be updated.
+            schema: the schema used to update the report.
+
+        Returns:
+            The updated report, or `None` when it no longer exists.
+        """
+        return await super().update(
+            db=db,
+            model=model,
+            schema=await self._render(self._data(schema, exclude_unset=True)),
+        )
+
+    async def update_many(
+        self,
+        db: AsyncSession,
+        ids: Sequence[int],
+        schema: Union[schema.ReportUpdate, Dict[str, Any]],
+        batch_size: Optional[int] = None,
+    ) -> List[model.Report]:
+        """
+        Apply the same changes to many reports in a single transaction.
+
+        Args:
+            db: the database session.
+            ids: the PK values of the reports to update.
+            schema: the schema used to update the reports.
+            batch_size: the reports updated by each statement.
+
+        Returns:
+            The updated reports.
+        """
+        return await super().update_many(
+            db=db,
+            ids=ids,
+            schema=await self._render(self._data(schema, exclude_unset=True)),
+            batch_size=batch_size,
+        )
+
+    def _data(
+        self,
+        schema: Union[schema.ReportCreate, schema.ReportUpdate, Dict],
+        exclude_unset: bool = False,
+    ) -> Dict[str, Any]:
+        if isinstance(schema, dict):
+            return dict(schema)
+        return schema.dict(exclude_unset=exclude_unset)
+
+    async def _render(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if data.get("markdown") is not None:
+            data["html"] = await render.render_markdown_async(data["markdown"])
+        return data
+
 
 reports = CRUDReports(model=model.Report)
@@ -1,10 +1,32 @@
-from typing import Optional
+from typing import Any, AsyncIterable, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy.orm.session import Session
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import undefer
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.expression import delete, update
+from sqlalchemy.sql.schema import Column, MetaData, Table
+from sqlalchemy.sql.sqltypes import Integer, String
 
-from drivr import model, schema, security
+from drivr import core, model, schema, security
+from drivr.core.cache import TTLCache, cache_metrics
+from drivr.core.metrics import registry
 
 from .crud_base import CRUDBase
+from .crud_reports import reports
+
+# The staging table of `import_many`, private to the connection and dropped
+# at the end of the transaction.
+user_import = Table(
+    "user_import",
+    MetaData(),
+    Column("line", Integer, autoincrement=False),
+    Column("email", String, nullable=False),
+    Column("password", String, nullable=False),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
 
 
 class CRUDUsers(
@@ -16,15 +38,23 @@ class CRUDUsers(
 ):
     """CRUD actions associated to the 'user' entity."""
 
-    def authenticate(
+    uncached_columns = ("password",)
+
+    # The reports of an user are removed along with it.
+    namespaces = ("user", "report")
+
+    async def authenticate(
         self,
-        db: Session,
+        db: AsyncSession,
         email: str,
         password: str,
     ) -> Optional[model.User]:
         """
         Authenticate the user.
 
+        A password hashed with outdated parameters is rehashed with the
+        current ones once it is verified.
+
         Args:
             db: the database session.
             email: the user email.
@@ -34,14 +64,47 @@ class CRUDUsers(
             The user object, if it exists. Otherwise, None is returned.
         """
 
-        if user := self.get_by_email(db=db, email=email):
-            if security.password.verify_password(
+        if user := await self.get_by_email(db=db, email=email):
+            verification = security.password.verify_and_update_async(
                 plain_text=password,
                 hashed_password=user.password,
-            ):
+            )
+            verified, rehashed = await verification
+
+            if verified:
+                if rehashed is not None:
+                    await self.rehash(db=db, user=user, password=rehashed)
                 return user
 
-    def get_by_email(self, db: Session, email: str) -> Optional[model.User]:
+    async def rehash(
+        self,
+        db: AsyncSession,
+        user: model.User,
+        password: str,
+    ):
+        """
+        Replace the password hash of the user, by one of the same password.
+
+        Nothing visible changes, so the `updated_at` is kept. The hash is not
+        replaced if the password was changed meanwhile.
+
+        Args:
+            db: the database session.
+            user: the user, with the hash being replaced.
+            password: the new hash.
+        """
+        table = self.model.__table__
+        await db.execute(
+            update(table)
+            .where(table.c.id == user.id, table.c.password == user.password)
+            .values(password=password, updated_at=table.c.updated_at)
+        )
+        await db.commit()
+        set_committed_value(user, "password", password)
+
+    async def get_by_email(
+        self, db: AsyncSession, email: str
+    ) -> Optional[model.User]:
         """
         Query for an user based on the email address.
 
@@ -53,40 +116,227 @@ class CRUDUsers(
             The entity associated to the email address provided if it exists,
             otherwise `None` is returned.
         """
-        return db.query(model.User).filter_by(email=email).first()
+        result = await db.execute(
+            select(model.User)
+            .filter_by(email=email)
+            .options(undefer(model.User.password))
+        )
+        return result.scalars().first()
 
-    def create(
+    async def all_with_reports(
         self,
-        db: Session,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        reports_limit: int = 10,
+        report_fields: Optional[Sequence[str]] = None,
+    ) -> List[model.User]:
+        """
+        Query for all users, along with their latest reports.
+
+        The page of users and the reports of the whole page are read by two
+        queries, whatever the number of users.
+
+        Args:
+            db: the database session.
+            skip: the offset value, ignored when a cursor is provided.
+            limit: the max number of users to query.
+            cursor: the cursor returned by `next_cursor` for the previous
+                page.
+            reports_limit: the max number of reports of each user.
+            report_fields: the columns of the reports to load, defaults to
+                the ones not deferred by the mapping.
+
+        Raises:
+            InvalidCursor: when the cursor can not be decoded.
+
+        Returns:
+            The page of users, with `User.reports` loaded newest first.
+        """
+        users = await self.all(db=db, skip=skip, limit=limit, cursor=cursor)
+        latest = await reports.latest_by_users(
+            db=db,
+            user_ids=[user.id for user in users],
+            limit=reports_limit,
+            fields=report_fields,
+        )
+
+        for user in users:
+            set_committed_value(user, "reports", latest.get(user.id, []))
+
+        return users
+
+    async def create(
+        self,
+        db: AsyncSession,
         schema: schema.UserCreate,
     ) -> Optional[model.User]:
         """
-        Persist a new user.
+        Persist a new user, unless the email is already registered.
+
+        A single `INSERT ... ON CONFLICT (email) DO NOTHING RETURNING`
+        statement is issued, so concurrent signups with the same email
+        never fail on the unique constraint.
 
         Args:
             db: the database session.
             schema: the schema for create the new user.
 
         Returns:
-            The created user.
+            The created user, or `None` if the email is already registered.
+        """
+        create_data = schema.dict()
+        create_data["password"] = await security.password.hash_password_async(
+            schema.password.get_secret_value()
+        )
+
+        return await super().create(db=db, schema=create_data)
+
+    async def create_many(
+        self,
+        db: AsyncSession,
+        schemas: Sequence[schema.UserCreate],
+        batch_size: Optional[int] = None,
+    ) -> List[model.User]:
+        """
+        Persist many new users in a single transaction.
+
+        The passwords are hashed in parallel by the hashing pool and the
+        emails already registered are skipped.
+
+        Args:
+            db: the database session.
+            schemas: the schemas for create the new users.
+            batch_size: the users inserted by each statement.
+
+        Returns:
+            The created users.
         """
-        user = model.User(**schema.dict())
-        user.password = security.password.hash_password(
-            user.password.get_secret_value()
+        hashed_passwords = await security.password.hash_passwords_async(
+            schema.password.get_secret_value() for schema in schemas
+        )
+        create_data = [
+            {**schema.dict(), "password": hashed_password}
+            for schema, hashed_password in zip(schemas, hashed_passwords)
+        ]
+
+        return await super().create_many(
+            db=db, schemas=create_data, batch_size=batch_size
         )
 
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+    async def import_many(
+        self,
+        db: AsyncSession,
+        users: AsyncIterable[Tuple[int, schema.UserCreate]],
+        batch_size: Optional[int] = None,
+    ) -> Tuple[int, List[int]]:
+        """
+        Import a stream of users in a single transaction.
+
+        Each batch is hashed in parallel by the hashing pool, copied to a
+        staging table with `COPY` and moved to the user table by a single
+        `INSERT ... SELECT ... ON CONFLICT (email) DO NOTHING`, so only one
+        batch is held in memory.
+
+        Args:
+            db: the database session.
+            users: the line number and the schema of each user to import.
+            batch_size: the users copied by each `COPY`, defaults to the
+                `DB_BULK_BATCH_SIZE` setting.
+
+        Returns:
+            The number of users created and the lines of the users whose
+            email is already registered (or repeated in the stream).
+        """
+        batch_size = batch_size or core.settings.DB_BULK_BATCH_SIZE
+        connection = await db.connection()
+        await connection.run_sync(user_import.create)
+        raw_connection = await connection.get_raw_connection()
 
-        return user
+        created, conflicts = 0, []
+        batch: Dict[str, Tuple[int, schema.UserCreate]] = {}
 
-    def update(
+        async def flush():
+            nonlocal created
+
+            rejected = await self._import_batch(
+                db=db,
+                driver_connection=raw_connection.driver_connection,
+                batch=list(batch.values()),
+            )
+            created += len(batch) - len(rejected)
+            conflicts.extend(rejected)
+            batch.clear()
+
+        async for line, user in users:
+            if user.email in batch:
+                conflicts.append(line)
+                continue
+
+            batch[user.email] = (line, user)
+
+            if len(batch) >= batch_size:
+                await flush()
+
+        if batch:
+            await flush()
+
+        await db.commit()
+        await self.changed()
+        return created, sorted(conflicts)
+
+    async def _import_batch(
         self,
-        db: Session,
+        db: AsyncSession,
+        driver_connection: Any,
+        batch: List[Tuple[int, schema.UserCreate]],
+    ) -> List[int]:
+        hashed_passwords = await security.password.hash_passwords_async(
+            user.password.get_secret_value() for _, user in batch
+        )
+        await driver_connection.copy_records_to_table(
+            user_import.name,
+            records=[
+                (line, user.email, hashed_password)
+                for (line, user), hashed_password in zip(
+                    batch, hashed_passwords
+                )
+            ],
+            columns=[column.name for column in user_import.columns],
+        )
+
+        inserted = (
+            self.insert_statement()
+            .from_select(
+                ["email", "password"],
+                select(user_import.c.email, user_import.c.password),
+            )
+            .returning(model.User.__table__.c.email)
+            .cte("inserted")
+        )
+        result = await db.execute(
+            select(user_import.c.line).where(
+                user_import.c.email.not_in(select(inserted.c.email))
+            )
+        )
+        rejected = result.scalars().all()
+
+        await db.execute(delete(user_import))
+        return rejected
+
+    def insert_statement(self) -> Insert:
+        """Insert the users, skipping the emails already registered."""
+        return insert(model.User.__table__).on_conflict_do_nothing(
+            index_elements=["email"]
+        )
+
+    async def update(
+        self,
+        db: AsyncSession,
         user: model.User,
         schema: schema.UserUpdate,
-    ) -> model.User:
+    ) -> Optional[model.User]:
         """
         Update an existing user.
 
@@ -96,19 +346,56 @@ class CRUDUsers(
             - schema: the data used to update the user entity.
 
         Returns:
-            - the updated user entity.
+            - the updated user entity, or `None` when it no longer exists.
+        """
+        return await super().update(
+            db=db, model=user, schema=await self._update_data(schema)
+        )
+
+    async def update_many(
+        self,
+        db: AsyncSession,
+        ids: Sequence[int],
+        schema: schema.UserUpdate,
+        batch_size: Optional[int] = None,
+    ) -> List[model.User]:
+        """
+        Apply the same changes to many users in a single transaction.
+
+        Args:
+            db: the database session.
+            ids: the PK values of the users to update.
+            schema: the data used to update the users.
+            batch_size: the users updated by each statement.
+
+        Returns:
+            The updated users.
         """
+        return await super().update_many(
+            db=db,
+            ids=ids,
+            schema=await self._update_data(schema),
+            batch_size=batch_size,
+        )
 
+    async def _update_data(self, schema: schema.UserUpdate) -> Dict[str, Any]:
         update_data = schema.dict(exclude_unset=True)
 
         if schema.password:
-            hashed_password = security.password.hash_password(
+            update_data[
+                "password"
+            ] = await security.password.hash_password_async(
                 schema.password.get_secret_value()
             )
-            del update_data["password"]
-            update_data["password"] = hashed_password
 
-        return super().update(db=db, model=user, schema=update_data)
+        return update_data
 
 
-users = CRUDUsers(model=model.User)
+users = CRUDUsers(
+    model=model.User,
+    cache=TTLCache(
+        maxsize=core.settings.AUTHENTICATED_USER_CACHE_SIZE,
+        ttl=core.settings.AUTHENTICATED_USER_CACHE_TTL,
+    ),
+)
+registry.collector(lambda: cache_metrics("authenticated_user", users.cache))
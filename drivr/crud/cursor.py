@@ -0,0 +1,74 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Any, List, Sequence
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+from drivr.db.entity import Entity
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor can not be decoded."""
+
+
+def encode_cursor(
+    entity: Entity,
+    columns: Sequence[InstrumentedAttribute],
+) -> str:
+    """
+    Encode the keyset of an entity as an opaque cursor.
+
+    Args:
+        entity: the last entity of a page.
+        columns: the columns the pages are ordered by.
+
+    Returns:
+        The url-safe cursor pointing right after the entity.
+    """
+    values = [jsonable_encoder(getattr(entity, c.key)) for c in columns]
+    payload = json.dumps(values, separators=(",", ":")).encode()
+    return urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str,
+    columns: Sequence[InstrumentedAttribute],
+) -> List[Any]:
+    """
+    Decode an opaque cursor back to the keyset values.
+
+    Args:
+        cursor: the cursor created by `encode_cursor`.
+        columns: the columns the pages are ordered by.
+
+    Raises:
+        InvalidCursor: when the cursor is malformed or does not match the
+            columns provided.
+
+    Returns:
+        The keyset values, one for each column.
+    """
+    try:
+        payload = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursor(cursor)
+
+        return [_parse(c, value) for c, value in zip(columns, values)]
+    except (binascii.Error, TypeError, ValueError) as ex:
+        raise InvalidCursor(cursor) from ex
+
+
+def _parse(column: InstrumentedAttribute, value: Any) -> Any:
+    python_type = column.type.python_type
+
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if not isinstance(value, python_type):
+        raise InvalidCursor(value)
+
+    return value
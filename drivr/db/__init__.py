@@ -1,2 +1,3 @@
 from .base import *  # noqa
-from .session import SessionLocal  # noqa
+from .pool import pool_status  # noqa
+from .session import SessionLocal, engine  # noqa
@@ -0,0 +1,124 @@
+"""
+Rewrite the stored report bodies as the REPORT_COMPRESSION settings do.
+
+    python -m drivr.db.backfill
+
+Turning the compression on compresses the bodies over the threshold,
+turning it off stores them back uncompressed (e.g. before downgrading the
+migrations). The app reads both, so it runs along with the app.
+"""
+import argparse
+import asyncio
+from typing import Optional, Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from drivr import core
+
+from .compression import Compressor
+
+COLUMNS = ("markdown", "html")
+
+# The bodies as they are stored, whatever the mapping of the model.
+report = sa.table(
+    "report",
+    sa.column("id", sa.Integer),
+    sa.column("markdown", sa.LargeBinary),
+    sa.column("html", sa.LargeBinary),
+)
+
+
+async def rewrite(
+    engine: AsyncEngine,
+    compressor: Compressor,
+    batch_size: int,
+) -> int:
+    """
+    Store the report bodies as the compressor does, in batches.
+
+    Each batch is committed on its own, so the rows are not kept locked
+    until the whole table is rewritten.
+
+    Args:
+        engine: the database engine.
+        compressor: the compressor of the settings.
+        batch_size: the reports read by each batch.
+
+    Returns:
+        The number of reports rewritten.
+    """
+    statement = (
+        report.update()
+        .where(report.c.id == sa.bindparam("_id"))
+        .values({column: sa.bindparam(f"_{column}") for column in COLUMNS})
+    )
+    last_id, rewritten = 0, 0
+
+    while True:
+        async with engine.begin() as connection:
+            rows = (
+                await connection.execute(
+                    sa.select(report)
+                    .where(report.c.id > last_id)
+                    .order_by(report.c.id)
+                    .limit(batch_size)
+                )
+            ).fetchall()
+
+            if not rows:
+                return rewritten
+
+            changed = []
+
+            for row in rows:
+                values = {
+                    column: compressor.compress(
+                        compressor.decompress(getattr(row, column))
+                    )
+                    for column in COLUMNS
+                }
+                if any(
+                    values[column] != getattr(row, column)
+                    for column in COLUMNS
+                ):
+                    changed.append(
+                        {"_id": row.id}
+                        | {
+                            f"_{column}": value
+                            for column, value in values.items()
+                        }
+                    )
+
+            if changed:
+                await connection.execute(statement, changed)
+
+        last_id, rewritten = rows[-1].id, rewritten + len(changed)
+
+
+async def _backfill(batch_size: int) -> int:
+    from drivr.db import engine
+    from drivr.model.report import compressor
+
+    try:
+        return await rewrite(engine, compressor, batch_size)
+    finally:
+        await engine.dispose()
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """Rewrite the report bodies and print the reports rewritten."""
+    parser = argparse.ArgumentParser(
+        prog="python -m drivr.db.backfill",
+        description=__doc__.strip().splitlines()[0],
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=core.settings.DB_BULK_BATCH_SIZE
+    )
+    args = parser.parse_args(argv)
+
+    print(f"{asyncio.run(_backfill(args.batch_size))} reports rewritten.")
+
+
+if __name__ == "__main__":
+    main()
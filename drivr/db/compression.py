@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import zlib
+from collections import Counter
+from typing import Iterable, Optional
+
+# The first byte of the stored values tells how the rest was compressed.
+RAW = 0
+ZLIB = 1
+ZLIB_DICTIONARY = 2
+
+# The window of zlib, the bytes of a dictionary beyond it are never used.
+MAX_DICTIONARY_SIZE = 32 * 1024
+
+
+class Compressor:
+    """Compress the text stored in binary columns, behind a header byte."""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        threshold: int = 1024,
+        level: int = 6,
+        dictionary: bytes = b"",
+    ):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.level = level
+        self.dictionary = dictionary
+
+    def compress(self, text: str) -> bytes:
+        """
+        Encode the text, compressed if it is enabled and pays off.
+
+        Args:
+            text: the text to store.
+
+        Returns:
+            The header byte followed by the (compressed) UTF-8 text.
+        """
+        data = text.encode()
+
+        if self.enabled and len(data) >= self.threshold:
+            if self.dictionary:
+                header = ZLIB_DICTIONARY
+                compressor = zlib.compressobj(
+                    self.level, zdict=self.dictionary
+                )
+                compressed = compressor.compress(data) + compressor.flush()
+            else:
+                header = ZLIB
+                compressed = zlib.compress(data, self.level)
+
+            if len(compressed) < len(data):
+                return bytes([header]) + compressed
+
+        return bytes([RAW]) + data
+
+    def decompress(self, data: bytes) -> str:
+        """
+        Decode the text stored by `compress`.
+
+        Args:
+            data: the stored value.
+
+        Raises:
+            ValueError: when the header byte is unknown.
+
+        Returns:
+            The text.
+        """
+        header, body = data[0], bytes(data[1:])
+
+        if header == RAW:
+            return body.decode()
+        if header == ZLIB:
+            return zlib.decompress(body).decode()
+        if header == ZLIB_DICTIONARY:
+            decompressor = zlib.decompressobj(zdict=self.dictionary)
+            return (
+                decompressor.decompress(body) + decompressor.flush()
+            ).decode()
+
+        raise ValueError(f"Unknown compression header: {header}.")
+
+
+def read_dictionary(path: Optional[str]) -> bytes:
+    """
+    Read the compression dictionary file.
+
+    Args:
+        path: the path of the dictionary, if any.
+
+    Returns:
+        The dictionary, empty when there is no path.
+    """
+    if not path:
+        return b""
+
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def train_dictionary(
+    samples: Iterable[str],
+    size: int = MAX_DICTIONARY_SIZE,
+) -> bytes:
+    """
+    Build a compression dictionary from the lines shared by the samples.
+
+    The lines repeated across samples (templates, headings, boilerplate) are
+    scored by the bytes they would save and the best ones are kept, closer
+    to the end (where zlib reaches them with shorter distances).
+
+    Args:
+        samples: the texts the dictionary is built for.
+        size: the max size of the dictionary.
+
+    Returns:
+        The dictionary.
+    """
+    counts = Counter()
+
+    for sample in samples:
+        counts.update(
+            {line.encode() + b"\n" for line in sample.splitlines() if line}
+        )
+
+    lines = sorted(
+        (line for line, count in counts.items() if count > 1),
+        key=lambda line: counts[line] * len(line),
+        reverse=True,
+    )
+
+    dictionary = b""
+    for line in lines:
+        if len(dictionary) + len(line) <= size:
+            dictionary = line + dictionary
+
+    return dictionary
+
+
+async def _samples(limit: int):
+    from drivr import crud, db
+
+    async with db.SessionLocal() as session:
+        count = 0
+        # The bodies are deferred by the mapping, so they are asked for.
+        async for report in crud.reports.stream(
+            db=session, fields=["markdown", "html"]
+        ):
+            if count >= limit:
+                break
+            count += 1
+            yield report.markdown
+            yield report.html
+
+
+async def _train(output: str, limit: int, size: int):
+    samples = [sample async for sample in _samples(limit)]
+
+    with open(output, "wb") as file:
+        file.write(train_dictionary(samples, size=size))
+
+
+def main():
+    """Train the compression dictionary of the reports."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("output", help="the path of the dictionary file")
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=10000,
+        help="the number of reports sampled",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=MAX_DICTIONARY_SIZE,
+        help="the max size of the dictionary, in bytes",
+    )
+    arguments = parser.parse_args()
+
+    asyncio.run(_train(arguments.output, arguments.samples, arguments.size))
+
+
+if __name__ == "__main__":
+    main()
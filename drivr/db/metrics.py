@@ -0,0 +1,111 @@
+from time import perf_counter
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from drivr.core.metrics import (
+    Counter,
+    Gauge,
+    HistogramFamily,
+    Metric,
+    registry,
+)
+
+from . import recorder
+from .pool import pool_status, statistics
+from .recorder import operation
+
+queries_total = registry.register(
+    Counter(
+        "db_queries_total",
+        "The SQL statements executed.",
+        ["operation"],
+    )
+)
+query_errors_total = registry.register(
+    Counter(
+        "db_query_errors_total",
+        "The SQL statements that failed.",
+        ["operation"],
+    )
+)
+query_duration = registry.register(
+    HistogramFamily(
+        "db_query_duration_seconds",
+        "The seconds taken to execute the SQL statements.",
+        ["operation"],
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+    )
+)
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    context._drivr_started_at = perf_counter()
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    duration = perf_counter() - context._drivr_started_at
+    label = operation(statement)
+    queries_total.inc(label)
+    query_duration.observe(label, value=duration)
+    recorder.record(statement, duration)
+
+
+def _handle_error(exception_context):
+    if exception_context.statement is not None:
+        query_errors_total.inc(operation(exception_context.statement))
+
+
+def instrument_queries(engine: Engine):
+    """
+    Record the number and duration of the statements of the engine, in the
+    metrics and in the recorder of the current request.
+
+    Args:
+        engine: the (sync) engine, e.g. `AsyncEngine.sync_engine`.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def pool_metrics(pool) -> Iterator[Metric]:
+    """
+    The metrics of the connection pool, read when they are scraped.
+
+    Args:
+        pool: the pool of the engine.
+
+    Returns:
+        The gauges of the pool occupancy, the counter of the checkouts that
+        timed out and the histogram of the seconds waited for a connection.
+    """
+    status = pool_status(pool)
+
+    for name, documentation in (
+        ("size", "The connections kept by the pool."),
+        ("checked_in", "The idle connections of the pool."),
+        ("checked_out", "The connections in use."),
+        ("overflow", "The connections opened beyond the pool size."),
+    ):
+        gauge = Gauge(f"db_pool_{name}", documentation)
+        gauge.set(value=status[name])
+        yield gauge
+
+    timeouts = Counter(
+        "db_pool_timeouts_total",
+        "The checkouts that timed out waiting for a connection.",
+    )
+    timeouts.inc(amount=status["timeouts"])
+    yield timeouts
+
+    yield HistogramFamily(
+        "db_pool_wait_seconds",
+        "The seconds waited for a connection of the pool.",
+        histograms={(): statistics.wait_time},
+    )
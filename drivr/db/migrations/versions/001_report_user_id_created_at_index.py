@@ -0,0 +1,36 @@
+"""Index the reports of each user by creation.
+
+Revision ID: 3f9a1c2e7d4b
+Revises: 805ea4cb88c5
+Create Date: 2026-10-18 10:12:41.503217
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f9a1c2e7d4b"
+down_revision = "805ea4cb88c5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built concurrently (outside of the migration transaction), so the
+    # writes to the report table are not blocked meanwhile.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_report_user_id_created_at",
+            "report",
+            ["user_id", "created_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_report_user_id_created_at",
+            table_name="report",
+            postgresql_concurrently=True,
+        )
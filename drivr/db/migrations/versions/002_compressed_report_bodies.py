@@ -0,0 +1,43 @@
+"""Store the report bodies as bytes, behind the compression header.
+
+Revision ID: 9b2d5e8f4a61
+Revises: 3f9a1c2e7d4b
+Create Date: 2026-10-18 14:37:05.118402
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9b2d5e8f4a61"
+down_revision = "3f9a1c2e7d4b"
+branch_labels = None
+depends_on = None
+
+COLUMNS = ("markdown", "html")
+
+
+def upgrade():
+    # The existing bodies are kept as they are, behind the RAW header byte
+    # (0). They are compressed by `python -m drivr.db.backfill`.
+    for column in COLUMNS:
+        op.alter_column(
+            "report",
+            column,
+            type_=sa.LargeBinary(),
+            postgresql_using=f"'\\x00'::bytea || convert_to({column}, 'UTF8')",
+        )
+
+
+def downgrade():
+    # The bodies must be stored RAW first, by `python -m drivr.db.backfill`
+    # with REPORT_COMPRESSION off (the compressed ones are not valid UTF-8).
+    for column in COLUMNS:
+        op.alter_column(
+            "report",
+            column,
+            type_=sa.Text(),
+            postgresql_using=(
+                f"convert_from(substring({column} from 2), 'UTF8')"
+            ),
+        )
@@ -0,0 +1,92 @@
+from time import perf_counter
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool
+
+from drivr.core.metrics import Histogram
+
+
+class PoolStatistics:
+    """The connection pool usage, shared by the pools of the process."""
+
+    def __init__(self):
+        self.checked_out = 0
+        self.timeouts = 0
+        self.wait_time = Histogram()
+
+
+statistics = PoolStatistics()
+
+
+class _InstrumentedPool:
+    """Measure the time spent waiting for a connection of the pool."""
+
+    def _do_get(self):
+        started_at = perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            statistics.timeouts += 1
+            raise
+        finally:
+            statistics.wait_time.observe(perf_counter() - started_at)
+
+
+class InstrumentedQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    """The default pool, keeping up to `pool_size` idle connections."""
+
+
+class InstrumentedNullPool(_InstrumentedPool, NullPool):
+    """A pool without idle connections, used behind PgBouncer."""
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    statistics.checked_out += 1
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    statistics.checked_out -= 1
+
+
+def instrument(pool: Pool):
+    """
+    Track the connections checked out of the pool.
+
+    Args:
+        pool: the pool of the engine.
+    """
+    event.listen(pool, "checkout", _on_checkout)
+    event.listen(pool, "checkin", _on_checkin)
+
+
+def pool_status(pool: Pool) -> Dict[str, Any]:
+    """
+    Get the live statistics of the connection pool.
+
+    Args:
+        pool: the pool of the engine.
+
+    Returns:
+        The size and overflow of the pool (when it keeps connections), the
+        connections checked out, the checkouts that timed out and the
+        histogram of the seconds waited for a connection.
+    """
+    status = {
+        "size": 0,
+        "checked_in": 0,
+        "checked_out": statistics.checked_out,
+        "overflow": 0,
+        "timeouts": statistics.timeouts,
+        "wait_time": statistics.wait_time.snapshot(),
+    }
+
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+
+    return status
@@ -0,0 +1,123 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+# The statements labeled by their own keyword, the others are "OTHER".
+OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+# The placeholders of an expanded `IN`, whose number varies with the list.
+_IN_LIST = re.compile(r"\bIN \((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def operation(statement: str) -> str:
+    """
+    The label of the SQL statement.
+
+    Args:
+        statement: the SQL statement.
+
+    Returns:
+        The first keyword of the statement, or "OTHER".
+    """
+    keyword, *_ = statement.lstrip()[:7].upper().split(None, 1) or [""]
+    return keyword if keyword in OPERATIONS else "OTHER"
+
+
+def shape(statement: str) -> str:
+    """
+    The shape of the SQL statement, shared by its executions.
+
+    The values are already bound parameters, so only the whitespace and the
+    length of the `IN` lists differ between the executions of a statement.
+
+    Args:
+        statement: the SQL statement.
+
+    Returns:
+        The normalized statement.
+    """
+    return _IN_LIST.sub("IN (...)", _SPACES.sub(" ", statement).strip())
+
+
+class QueryRecorder:
+    """The SQL statements executed while serving a request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration: float):
+        """
+        Record an executed statement.
+
+        Args:
+            statement: the SQL statement.
+            duration: the seconds taken to execute it.
+        """
+        self.count += 1
+        self.duration += duration
+        self.shapes[shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        The `SELECT` shapes executed at least `threshold` times, which
+        usually means a query per entity of a list (N+1).
+
+        Args:
+            threshold: the executions of a shape to report it.
+
+        Returns:
+            The shapes and their executions, the most executed first.
+        """
+        return [
+            (statement, count)
+            for statement, count in self.shapes.most_common()
+            if count >= threshold and operation(statement) == "SELECT"
+        ]
+
+    def server_timing(self) -> str:
+        """The `Server-Timing` header value of the statements."""
+        return (
+            f"db;dur={self.duration * 1000:.1f};"
+            f'desc="{self.count} queries"'
+        )
+
+
+_recorder: ContextVar[Optional[QueryRecorder]] = ContextVar(
+    "query_recorder", default=None
+)
+
+
+@contextmanager
+def recording() -> Iterator[QueryRecorder]:
+    """
+    Record the statements executed within the context (i.e. the task).
+
+    Returns:
+        The recorder of the statements.
+    """
+    recorder = QueryRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+def record(statement: str, duration: float):
+    """
+    Record an executed statement in the current recorder, if any.
+
+    The asyncio engine runs the statements in greenlets which share the
+    context of the calling task, so the recorder of a request sees them.
+
+    Args:
+        statement: the SQL statement.
+        duration: the seconds taken to execute it.
+    """
+    if (recorder := _recorder.get()) is not None:
+        recorder.record(statement, duration)
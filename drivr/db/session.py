@@ -1,12 +1,60 @@
-from sqlalchemy.engine import create_engine
+from typing import Any, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm.session import sessionmaker
 
 from drivr import core
+from drivr.core.metrics import registry
+from drivr.core.settings import Settings
+
+from .metrics import instrument_queries, pool_metrics
+from .pool import InstrumentedNullPool, InstrumentedQueuePool, instrument
+
+
+def engine_options(settings: Settings) -> Dict[str, Any]:
+    """
+    Get the engine options for the connection pool settings.
+
+    Args:
+        settings: the app settings.
 
-engine = create_engine(core.settings.SQLALCHEMY_DATABASE_URI)
+    Returns:
+        The keyword arguments for `create_async_engine`.
+    """
+    if settings.DB_PGBOUNCER_TRANSACTION_MODE:
+        return {
+            "poolclass": InstrumentedNullPool,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+            },
+        }
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+engine = create_async_engine(
+    core.settings.SQLALCHEMY_ASYNC_DATABASE_URI,
+    **engine_options(core.settings),
+)
+instrument(engine.sync_engine.pool)
+instrument_queries(engine.sync_engine)
+registry.collector(lambda: pool_metrics(engine.sync_engine.pool))
 
+# The entities must stay readable after the commit, since lazy loading
+# (which the expiration relies on) is not available on asyncio sessions.
 SessionLocal = sessionmaker(
     bind=engine,
+    class_=AsyncSession,
     autocommit=False,
     autoflush=False,
+    expire_on_commit=False,
 )
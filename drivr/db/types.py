@@ -0,0 +1,37 @@
+from typing import Optional
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+from .compression import Compressor
+
+
+class CompressedText(TypeDecorator):
+    """A text stored as (optionally compressed) bytes."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, compressor: Compressor):
+        super().__init__()
+        self.compressor = compressor
+
+    @property
+    def python_type(self):
+        """The type of the values, once loaded."""
+        return str
+
+    def process_bind_param(
+        self,
+        value: Optional[str],
+        dialect,
+    ) -> Optional[bytes]:
+        """Compress the text written to the column."""
+        return None if value is None else self.compressor.compress(value)
+
+    def process_result_value(
+        self,
+        value: Optional[bytes],
+        dialect,
+    ) -> Optional[str]:
+        """Decompress the text read from the column."""
+        return None if value is None else self.compressor.decompress(value)
@@ -1,16 +1,31 @@
 from sqlalchemy import sql
-from sqlalchemy.sql.schema import Column, ForeignKey
-from sqlalchemy.sql.sqltypes import DateTime, Integer, Text
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql.schema import Column, ForeignKey, Index
+from sqlalchemy.sql.sqltypes import DateTime, Integer
 
+from drivr import core
+from drivr.db.compression import Compressor, read_dictionary
 from drivr.db.entity import Entity
+from drivr.db.types import CompressedText
+
+compressor = Compressor(
+    enabled=core.settings.REPORT_COMPRESSION,
+    threshold=core.settings.REPORT_COMPRESSION_THRESHOLD,
+    level=core.settings.REPORT_COMPRESSION_LEVEL,
+    dictionary=read_dictionary(core.settings.REPORT_COMPRESSION_DICTIONARY),
+)
 
 
 class Report(Entity):
     """The attribute from 'report' table."""
 
+    __table_args__ = (
+        Index("ix_report_user_id_created_at", "user_id", "created_at", "id"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
-    markdown = Column(Text, nullable=False)
-    html = Column(Text, nullable=False)
+    markdown = deferred(Column(CompressedText(compressor), nullable=False))
+    html = deferred(Column(CompressedText(compressor), nullable=False))
     created_at = Column(
         DateTime,
         nullable=False,
@@ -1,5 +1,5 @@
 from sqlalchemy import sql
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql.schema import Column
 from sqlalchemy.sql.sqltypes import Boolean, DateTime, Integer, String
 
@@ -11,7 +11,7 @@ class User(Entity):
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, nullable=False, unique=True)
-    password = Column(String, nullable=False)
+    password = deferred(Column(String, nullable=False))
     moderator = Column(Boolean, nullable=False, default=False)
     active = Column(Boolean, nullable=False, default=True)
     created_at = Column(
@@ -0,0 +1 @@
+from .markdown import *  # noqa
@@ -0,0 +1,101 @@
+import asyncio
+from hashlib import sha256
+
+import bleach
+from markdown import Markdown
+
+from drivr import core
+from drivr.core.cache import TTLCache
+
+# The markup produced by the markdown extensions below, anything else (raw
+# HTML included) is escaped.
+ALLOWED_TAGS = {
+    "a",
+    "abbr",
+    "blockquote",
+    "br",
+    "code",
+    "em",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "hr",
+    "img",
+    "li",
+    "ol",
+    "p",
+    "pre",
+    "strong",
+    "table",
+    "tbody",
+    "td",
+    "th",
+    "thead",
+    "tr",
+    "ul",
+}
+ALLOWED_ATTRIBUTES = {
+    "a": ["href", "title"],
+    "abbr": ["title"],
+    "img": ["src", "alt", "title"],
+    "td": ["align"],
+    "th": ["align"],
+}
+ALLOWED_PROTOCOLS = {"http", "https", "mailto"}
+EXTENSIONS = ["abbr", "fenced_code", "tables"]
+
+renders = TTLCache(
+    maxsize=core.settings.MARKDOWN_CACHE_SIZE,
+    ttl=core.settings.MARKDOWN_CACHE_TTL,
+)
+
+
+def render_markdown(text: str) -> str:
+    """
+    Render the markdown as sanitized HTML.
+
+    Args:
+        text: the markdown content.
+
+    Returns:
+        The HTML, stripped of any markup that is not allowed.
+    """
+    return bleach.clean(
+        Markdown(extensions=EXTENSIONS).convert(text),
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols=ALLOWED_PROTOCOLS,
+    )
+
+
+async def render_markdown_async(text: str) -> str:
+    """
+    Render the markdown as sanitized HTML, going through the cache.
+
+    The cache is keyed by the hash of the content, so the same markdown is
+    rendered once. The large documents are rendered in a thread, so the
+    event loop keeps serving the other requests meanwhile.
+
+    Args:
+        text: the markdown content.
+
+    Returns:
+        The HTML, stripped of any markup that is not allowed.
+    """
+    key = sha256(text.encode()).hexdigest()
+
+    if (html := renders.get(key)) is not None:
+        return html
+
+    if len(text) >= core.settings.MARKDOWN_OFFLOAD_SIZE:
+        html = await asyncio.get_running_loop().run_in_executor(
+            None, render_markdown, text
+        )
+    else:
+        html = render_markdown(text)
+
+    renders.set(key, html)
+    return html
@@ -1,4 +1,5 @@
 from .detail import *  # noqa
+from .monitoring import *  # noqa
 from .relationships import *  # noqa
 from .reports import *  # noqa
 from .token import *  # noqa
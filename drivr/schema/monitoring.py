@@ -0,0 +1,31 @@
+from typing import Dict
+
+from pydantic import BaseModel
+
+
+class HistogramSnapshot(BaseModel):
+    """The cumulative count of the observations under each bound."""
+
+    buckets: Dict[str, int]
+    sum: float
+    count: int
+
+
+class PoolStatus(BaseModel):
+    """The live statistics of the database connection pool."""
+
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    timeouts: int
+    wait_time: HistogramSnapshot
+
+
+class ResponseCacheStats(BaseModel):
+    """The counters of the response cache of the process."""
+
+    enabled: bool
+    hits: int
+    misses: int
+    errors: int
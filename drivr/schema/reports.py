@@ -1,14 +1,13 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 
 
 class ReportBase(BaseModel):
     """The shared attrs related to user model."""
 
     markdown: str
-    html: str
 
 
 class ReportCreate(ReportBase):
@@ -19,12 +18,21 @@ class ReportUpdate(ReportBase):
     """The schema used to update the report model."""
 
     markdown: Optional[str] = None
-    html: Optional[str] = None
+
+    @validator("markdown", pre=True)
+    def markdown_not_null(cls, value: Optional[str]) -> str:
+        """The markdown may be left out, but not cleared."""
+        if value is None:
+            raise ValueError("The markdown can not be null.")
+        return value
 
 
 class Report(ReportBase):
     """The schema used to expose the report model."""
 
+    id: int
+    user_id: Optional[int]
+    html: str
     created_at: datetime
     updated_at: datetime
 
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 from pydantic.networks import EmailStr
@@ -36,3 +36,17 @@ class User(UserBase):
 
     class Config:
         orm_mode = True
+
+
+class UserImportRejection(BaseModel):
+    """A row of the import that did not create a user."""
+
+    line: int
+    detail: str
+
+
+class UserImport(BaseModel):
+    """The outcome of a bulk import of users."""
+
+    created: int
+    rejected: List[UserImportRejection]
@@ -0,0 +1,132 @@
+"""
+Pick the argon2 parameters hitting a target hash latency on this machine.
+
+    python -m drivr.security.calibration --target-ms 250
+
+Prints the `ARGON2_*` settings to deploy. The hashes made with the previous
+parameters are redone as the users log in.
+"""
+import argparse
+import statistics
+import sys
+from time import perf_counter
+from typing import Callable, Optional, Sequence, Tuple
+
+from passlib.hash import argon2
+
+from drivr import core
+
+# The plain text hashed while measuring.
+PASSWORD = "calibration-password"
+
+Measure = Callable[[int, int, int], float]
+
+
+def measure(
+    time_cost: int,
+    memory_cost: int,
+    parallelism: int,
+    samples: int = 5,
+) -> float:
+    """
+    The median seconds taken to hash a password with the parameters.
+
+    Args:
+        time_cost: the passes over the memory.
+        memory_cost: the memory, in KiB.
+        parallelism: the lanes.
+        samples: the hashes timed.
+
+    Returns:
+        The median latency.
+    """
+    handler = argon2.using(
+        rounds=time_cost, memory_cost=memory_cost, parallelism=parallelism
+    )
+    durations = []
+
+    for _ in range(samples):
+        started_at = perf_counter()
+        handler.hash(PASSWORD)
+        durations.append(perf_counter() - started_at)
+
+    return statistics.median(durations)
+
+
+def calibrate(
+    target: float,
+    max_memory_cost: int,
+    parallelism: int,
+    measure: Measure = measure,
+) -> Tuple[int, int, float]:
+    """
+    Find the costliest parameters whose hashes take up to `target` seconds.
+
+    As recommended by RFC 9106, the memory is spent first: it is halved,
+    from `max_memory_cost`, until a single pass fits the target. Then the
+    passes are added while they still fit.
+
+    Args:
+        target: the seconds a hash should take.
+        max_memory_cost: the memory available to each hash, in KiB.
+        parallelism: the lanes.
+        measure: times the hash of the parameters.
+
+    Returns:
+        The time cost, the memory cost and the latency they measured.
+    """
+    time_cost, memory_cost = 1, max_memory_cost
+    latency = measure(time_cost, memory_cost, parallelism)
+
+    # argon2 takes at least 8 KiB per lane.
+    while latency > target and memory_cost // 2 >= 8 * parallelism:
+        memory_cost //= 2
+        latency = measure(time_cost, memory_cost, parallelism)
+
+    while latency <= target:
+        next_latency = measure(time_cost + 1, memory_cost, parallelism)
+        if next_latency > target:
+            break
+        time_cost, latency = time_cost + 1, next_latency
+
+    return time_cost, memory_cost, latency
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """Calibrate and print the settings."""
+    parser = argparse.ArgumentParser(
+        prog="python -m drivr.security.calibration",
+        description=__doc__.strip().splitlines()[0],
+    )
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument(
+        "--max-memory-cost",
+        type=int,
+        default=core.settings.ARGON2_MEMORY_COST,
+        help="the memory of each hash in KiB, times the hashing workers",
+    )
+    parser.add_argument(
+        "--parallelism", type=int, default=core.settings.ARGON2_PARALLELISM
+    )
+    args = parser.parse_args(argv)
+
+    time_cost, memory_cost, latency = calibrate(
+        target=args.target_ms / 1000,
+        max_memory_cost=args.max_memory_cost,
+        parallelism=args.parallelism,
+    )
+    workers = core.settings.PASSWORD_HASHING_WORKERS
+
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST={memory_cost}")
+    print(f"ARGON2_PARALLELISM={args.parallelism}")
+    print(
+        f"# {latency * 1000:.0f} ms per hash, about "
+        f"{workers / latency:.1f} logins/s with "
+        f"PASSWORD_HASHING_WORKERS={workers}.",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,335 @@
-from passlib.hash import argon2
+import asyncio
+import math
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from passlib.context import CryptContext
+
+from drivr import core
+from drivr.core.metrics import Counter, Gauge, HistogramFamily, registry
+
+hashing_duration = registry.register(
+    HistogramFamily(
+        "password_hashing_duration_seconds",
+        "The seconds taken by the password hashing, queueing included.",
+        ["function"],
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    )
+)
+hashing_rejections_total = registry.register(
+    Counter(
+        "password_hashing_rejections_total",
+        "The password hashing rejected because the pool was saturated.",
+        ["reason"],
+    )
+)
+
+
+admission_rejections_total = registry.register(
+    Counter(
+        "password_admission_rejections_total",
+        "The requests rejected before hashing, by path and reason.",
+        ["path", "reason"],
+    )
+)
+
+
+# The hashing policy: the new hashes use the argon2 parameters of the
+# settings, and the ones made with other parameters are outdated (see
+# `verify_and_update`).
+context = CryptContext(
+    schemes=["argon2"],
+    argon2__rounds=core.settings.ARGON2_TIME_COST,
+    argon2__memory_cost=core.settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=core.settings.ARGON2_PARALLELISM,
+)
+
+
+class PasswordHashingUnavailable(Exception):
+    """Raised when the password hashing pool can not take more work."""
+
+    def __init__(self, message: str = "", retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class HashingPool:
+    """A bounded process pool used to run the argon2 work."""
+
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, function: Callable, *args: Any) -> Any:
+        """
+        Run the function in one of the pool processes.
+
+        Args:
+            function: the (picklable) function to run.
+            args: the positional arguments of the function.
+
+        Raises:
+            PasswordHashingUnavailable: when the pool is saturated, the
+                work does not finish within the timeout or a process died.
+
+        Returns:
+            The value returned by the function.
+        """
+        if self.pending >= self.workers + self.queue_size:
+            hashing_rejections_total.inc("queue_full")
+            raise PasswordHashingUnavailable("The hashing queue is full.")
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        executor = self._executor
+        started_at = perf_counter()
+
+        try:
+            work = executor.submit(function, *args)
+        except BrokenProcessPool:
+            raise self._broken(executor)
+
+        future = asyncio.wrap_future(work)
+        # The work is pending until a process is done with it, even once
+        # the caller stopped waiting for it.
+        self.pending += 1
+        future.add_done_callback(self._done)
+
+        try:
+            result = await asyncio.wait_for(
+                asyncio.shield(future), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            hashing_rejections_total.inc("timeout")
+            raise PasswordHashingUnavailable("The hashing timed out.")
+        except BrokenProcessPool:
+            raise self._broken(executor)
+        finally:
+            # Dropped from the queue when it is not awaited anymore, unless
+            # a process already runs it.
+            work.cancel()
+
+        hashing_duration.observe(
+            function.__name__, value=perf_counter() - started_at
+        )
+        return result
+
+    async def map(self, function: Callable, items: Iterable[Any]) -> List:
+        """
+        Run the function over the items, at most one per worker at a time.
+
+        Keeping a single item per worker in flight leaves the queue to the
+        other requests, however many items there are. The items are pulled
+        by one task per worker, so only those tasks exist at a time.
+
+        Args:
+            function: the (picklable) function to run.
+            items: the argument of each call.
+
+        Raises:
+            PasswordHashingUnavailable: when the pool is saturated or some
+                work does not finish within the timeout.
+
+        Returns:
+            The values returned by the function, in the order of the items.
+        """
+        pending = enumerate(items)
+        results: Dict[int, Any] = {}
+
+        async def work():
+            # The iterator is shared, so each item is taken by one task.
+            for index, item in pending:
+                results[index] = await self.run(function, item)
+
+        tasks = [asyncio.ensure_future(work()) for _ in range(self.workers)]
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        return [results[index] for index in range(len(results))]
+
+    def _done(self, future: asyncio.Future):
+        self.pending -= 1
+
+    def _broken(
+        self,
+        executor: ProcessPoolExecutor,
+    ) -> PasswordHashingUnavailable:
+        # A process died (e.g. killed for its memory), which leaves the
+        # executor unusable: the next work starts a new one.
+        if self._executor is executor:
+            executor.shutdown(wait=False)
+            self._executor = None
+
+        hashing_rejections_total.inc("broken")
+        return PasswordHashingUnavailable("The hashing process died.")
+
+    def shutdown(self):
+        """Stop the pool processes, if they were started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+pool = HashingPool(
+    workers=core.settings.PASSWORD_HASHING_WORKERS,
+    queue_size=core.settings.PASSWORD_HASHING_QUEUE_SIZE,
+    timeout=core.settings.PASSWORD_HASHING_TIMEOUT,
+)
+
+
+class Admission:
+    """
+    Bound the requests of a path (e.g. login) doing password work.
+
+    Up to `limit` requests are admitted at a time and up to `queue_size`
+    more wait for their turn, for at most `timeout` seconds. The others are
+    rejected right away, so a burst on one path neither piles up in the
+    hashing pool nor starves the other paths.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        limit: int,
+        queue_size: int,
+        timeout: float,
+    ):
+        self.path = path
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.running = 0
+        self.waiting = 0
+        # The moving average of the seconds a request is admitted for.
+        self.duration = 0.0
+        # Created on the first request, within the event loop of the app.
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """
+        Run the block once admitted.
+
+        Raises:
+            PasswordHashingUnavailable: when the queue is full or the turn
+                does not come within the timeout, with the seconds after
+                which the client should retry.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.limit)
+
+        if self._slots.locked():
+            if self.waiting >= self.queue_size:
+                self._reject("queue_full")
+
+            self.waiting += 1
+            acquire = asyncio.ensure_future(self._slots.acquire())
+            try:
+                # Unlike `asyncio.wait_for` (before Python 3.12), `wait`
+                # leaves the acquire be when it times out, so a slot taken
+                # right then is noticed instead of leaked.
+                await asyncio.wait({acquire}, timeout=self.timeout)
+            except BaseException:
+                self._abandon(acquire)
+                raise
+            finally:
+                self.waiting -= 1
+
+            if not acquire.done():
+                self._abandon(acquire)
+                self._reject("timeout")
+        else:
+            await self._slots.acquire()
+
+        self.running += 1
+        started_at = perf_counter()
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._slots.release()
+            self.duration += 0.2 * (
+                perf_counter() - started_at - self.duration
+            )
+
+    def retry_after(self) -> int:
+        """The seconds until the queued requests are likely served."""
+        turns = (self.waiting + 1) / max(self.limit, 1)
+        return max(math.ceil(self.duration * turns), 1)
+
+    def _abandon(self, acquire: asyncio.Future):
+        # Stop waiting for the slot, or give it back if it was taken.
+        if not acquire.done():
+            acquire.cancel()
+        elif not acquire.cancelled():
+            self._slots.release()
+
+    def _reject(self, reason: str):
+        admission_rejections_total.inc(self.path, reason)
+        raise PasswordHashingUnavailable(
+            f"Too many {self.path} requests.", retry_after=self.retry_after()
+        )
+
+
+login_admission = Admission(
+    path="login",
+    limit=core.settings.LOGIN_ADMISSION_LIMIT,
+    queue_size=core.settings.LOGIN_ADMISSION_QUEUE_SIZE,
+    timeout=core.settings.PASSWORD_ADMISSION_TIMEOUT,
+)
+signup_admission = Admission(
+    path="signup",
+    limit=core.settings.SIGNUP_ADMISSION_LIMIT,
+    queue_size=core.settings.SIGNUP_ADMISSION_QUEUE_SIZE,
+    timeout=core.settings.PASSWORD_ADMISSION_TIMEOUT,
+)
+
+
+@registry.collector
+def hashing_metrics() -> Iterable[Gauge]:
+    """The work in flight in the hashing pool, read when it is scraped."""
+    pending = Gauge(
+        "password_hashing_pending",
+        "The password hashing running or queued in the pool.",
+    )
+    pending.set(value=pool.pending)
+    admitted = Gauge(
+        "password_admission_running",
+        "The requests admitted to do password work.",
+        ["path"],
+    )
+    waiting = Gauge(
+        "password_admission_waiting",
+        "The requests waiting to be admitted.",
+        ["path"],
+    )
+
+    for admission in (login_admission, signup_admission):
+        admitted.set(admission.path, value=admission.running)
+        waiting.set(admission.path, value=admission.waiting)
+
+    return [pending, admitted, waiting]
 
 
 def hash_password(plain_text: str) -> str:
@@ -11,7 +342,7 @@ def hash_password(plain_text: str) -> str:
     Returns:
         The hashed password.
     """
-    return argon2.hash(plain_text)
+    return context.hash(plain_text)
 
 
 def verify_password(plain_text: str, hashed_password: str) -> bool:
@@ -25,4 +356,80 @@ def verify_password(plain_text: str, hashed_password: str) -> bool:
     Returns:
         True if the plain text match the hashed password, otherwise False.
     """
-    return argon2.verify(plain_text, hashed_password)
+    return context.verify(plain_text, hashed_password)
+
+
+def verify_and_update(
+    plain_text: str,
+    hashed_password: str,
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify the password hash, rehashing the password if it is outdated.
+
+    Args:
+        plain_text: the plain text to be verified.
+        hashed_password: the hashed content.
+
+    Returns:
+        Whether the plain text match the hashed password, and the password
+        hashed with the current parameters when it does but the hash was
+        made with other ones (otherwise `None`).
+    """
+    return context.verify_and_update(plain_text, hashed_password)
+
+
+async def hash_password_async(plain_text: str) -> str:
+    """
+    Hash the plain text in the hashing pool, off the event loop.
+
+    Args:
+        plain_text: the value to be hashed.
+
+    Returns:
+        The hashed password.
+    """
+    return await pool.run(hash_password, plain_text)
+
+
+async def hash_passwords_async(plain_texts: Iterable[str]) -> List[str]:
+    """
+    Hash many plain texts in the hashing pool, off the event loop.
+
+    Args:
+        plain_texts: the values to be hashed.
+
+    Returns:
+        The hashed passwords, in the order of the plain texts.
+    """
+    return await pool.map(hash_password, plain_texts)
+
+
+async def verify_password_async(plain_text: str, hashed_password: str) -> bool:
+    """
+    Verify the password hash in the hashing pool, off the event loop.
+
+    Args:
+        plain_text: the plain text to be verified.
+        hashed_password: the hashed content.
+
+    Returns:
+        True if the plain text match the hashed password, otherwise False.
+    """
+    return await pool.run(verify_password, plain_text, hashed_password)
+
+
+async def verify_and_update_async(
+    plain_text: str,
+    hashed_password: str,
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify (and maybe rehash) the password in the hashing pool.
+
+    Args:
+        plain_text: the plain text to be verified.
+        hashed_password: the hashed content.
+
+    Returns:
+        The result of `verify_and_update`.
+    """
+    return await pool.run(verify_and_update, plain_text, hashed_password)
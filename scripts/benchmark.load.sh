@@ -0,0 +1,4 @@
+# Seeds the database of the settings (e.g. the one of docker.db.sh), runs
+# the app in process and prints the throughput and latency of each route.
+# Compare against a previous run with: --baseline baseline.json
+poetry run python -m tests.benchmarks.load "$@"
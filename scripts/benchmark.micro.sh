@@ -0,0 +1,3 @@
+# Times the CRUD, security and schema hot paths, printing the statistics of
+# each one. Compare against a previous run with: --baseline baseline.json
+poetry run python -m tests.benchmarks.micro "$@"
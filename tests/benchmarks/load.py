@@ -0,0 +1,439 @@
+"""
+HTTP load benchmark of the API.
+
+Seeds users and reports in the database of the settings, runs the app with
+uvicorn in a thread (unless `--url` targets a running server), drives the
+workloads with concurrent clients and prints the throughput and latency of
+each route as JSON. With `--baseline`, exits with 1 when a route regressed
+beyond `--threshold`.
+
+    python -m tests.benchmarks.load --duration 30 --output baseline.json
+    python -m tests.benchmarks.load --duration 30 --baseline baseline.json
+
+The clients share the process (and the GIL) of the in-process server, so
+the numbers are only comparable between runs taken the same way.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from uuid import uuid4
+
+import requests
+import uvicorn
+
+# The password of the seeded users.
+PASSWORD = "benchmark-password"
+
+# The workloads run by default, with their weights.
+DEFAULT_MIX = {"login": 1, "list": 6, "create": 1, "update": 1, "delete": 1}
+
+
+class Client:
+    """A user of the API, recording the latency of its requests."""
+
+    def __init__(self, url: str, email: str, markdown: str):
+        self.url = url
+        self.email = email
+        self.markdown = markdown
+        self.session = requests.Session()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.reports: List[int] = []
+
+    def request(
+        self,
+        method: str,
+        route: str,
+        path: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Optional[requests.Response]:
+        """
+        Send a request, recording it under the route.
+
+        Args:
+            method: the HTTP method.
+            route: the path template of the route, e.g. `/reports/{id}`.
+            path: the path requested, defaults to the route.
+            kwargs: the other arguments of `requests.Session.request`.
+
+        Returns:
+            The response, or `None` when the request failed.
+        """
+        name = f"{method} {route}"
+        started_at = perf_counter()
+
+        try:
+            response = self.session.request(
+                method, f"{self.url}{path or route}", timeout=30, **kwargs
+            )
+        except requests.RequestException:
+            response = None
+
+        self.latencies[name].append(perf_counter() - started_at)
+
+        if response is None or not response.ok:
+            self.errors[name] += 1
+
+        return response
+
+    def login(self):
+        """Authenticate, sending the new token from then on."""
+        response = self.request(
+            "POST",
+            "/login/",
+            data={"username": self.email, "password": PASSWORD},
+        )
+
+        if response is not None and response.ok:
+            token = response.json()["access_token"]
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def list(self):
+        """Read the first page of reports."""
+        self.request("GET", "/reports/", params={"limit": 50})
+
+    def create(self):
+        """Create a report, kept for the updates and deletes."""
+        response = self.request(
+            "POST", "/reports/", json={"markdown": self.markdown}
+        )
+
+        if response is not None and response.ok:
+            self.reports.append(response.json()["id"])
+
+    def update(self):
+        """Update the latest report created, creating one if needed."""
+        if not self.reports:
+            return self.create()
+
+        self.request(
+            "PUT",
+            "/reports/{id}",
+            f"/reports/{self.reports[-1]}",
+            json={"markdown": self.markdown[::-1]},
+        )
+
+    def delete(self):
+        """Remove the latest report created, creating one if needed."""
+        if not self.reports:
+            return self.create()
+
+        self.request(
+            "DELETE", "/reports/{id}", f"/reports/{self.reports.pop()}"
+        )
+
+
+WORKLOADS: Dict[str, Callable[[Client], None]] = {
+    "login": Client.login,
+    "list": Client.list,
+    "create": Client.create,
+    "update": Client.update,
+    "delete": Client.delete,
+}
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    The nearest-rank percentile of the sorted values.
+
+    Args:
+        values: the values, in ascending order.
+        q: the percentile, from 0 to 100.
+
+    Returns:
+        The percentile, `0.0` if there are no values.
+    """
+    if not values:
+        return 0.0
+    return values[max(math.ceil(q / 100 * len(values)) - 1, 0)]
+
+
+def summarize(
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+    elapsed: float,
+) -> Dict[str, Dict[str, float]]:
+    """
+    The throughput and latency of each route.
+
+    Args:
+        latencies: the seconds taken by the requests of each route.
+        errors: the failed requests of each route.
+        elapsed: the seconds the workloads ran.
+
+    Returns:
+        The requests, errors, requests per second and p50/p95/p99 latency
+        (in milliseconds) of each route.
+    """
+    routes = {}
+
+    for route, values in sorted(latencies.items()):
+        values = sorted(values)
+        routes[route] = {
+            "requests": len(values),
+            "errors": errors.get(route, 0),
+            "rps": round(len(values) / elapsed, 2),
+            **{
+                f"p{q}": round(percentile(values, q) * 1000, 2)
+                for q in (50, 95, 99)
+            },
+        }
+
+    return routes
+
+
+def compare(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+) -> List[str]:
+    """
+    The regressions of the report against the baseline.
+
+    A route regressed when its throughput dropped, or its p95 latency
+    rose, by more than the threshold, or when it was not requested.
+
+    Args:
+        report: the report of `run`.
+        baseline: a previous report.
+        threshold: the tolerated change, e.g. `0.1` for 10%.
+
+    Returns:
+        The description of each regression.
+    """
+    regressions = []
+
+    for route, expected in baseline["routes"].items():
+        if (actual := report["routes"].get(route)) is None:
+            regressions.append(f"{route}: not requested.")
+            continue
+
+        if actual["rps"] < expected["rps"] * (1 - threshold):
+            regressions.append(
+                f"{route}: {actual['rps']} rps, "
+                f"baseline {expected['rps']} rps."
+            )
+
+        if actual["p95"] > expected["p95"] * (1 + threshold):
+            regressions.append(
+                f"{route}: p95 of {actual['p95']} ms, "
+                f"baseline {expected['p95']} ms."
+            )
+
+    return regressions
+
+
+async def seed(users: int, reports: int, markdown: str) -> List[str]:
+    """
+    Create the users (and their reports) of a run.
+
+    Args:
+        users: the number of users.
+        reports: the number of reports of each user.
+        markdown: the markdown of the reports.
+
+    Returns:
+        The emails of the users, whose password is `PASSWORD`.
+    """
+    from drivr import crud, schema
+    from drivr.db import SessionLocal, engine
+
+    run = uuid4().hex[:8]
+
+    async with SessionLocal() as db:
+        created = await crud.users.create_many(
+            db=db,
+            schemas=[
+                schema.UserCreate(
+                    email=f"benchmark-{run}-{index}@example.com",
+                    password=PASSWORD,
+                )
+                for index in range(users)
+            ],
+        )
+        await crud.reports.create_many(
+            db=db,
+            schemas=[
+                {"markdown": markdown, "user_id": user.id}
+                for user in created
+                for _ in range(reports)
+            ],
+        )
+
+    # The connections belong to this event loop, not to the server's.
+    await engine.dispose()
+
+    return [user.email for user in created]
+
+
+def run(
+    url: str,
+    emails: Sequence[str],
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    markdown: str,
+) -> Dict[str, Any]:
+    """
+    Drive the workloads against the server.
+
+    Each client logs in as one of the users, then runs the workloads of
+    the mix (each one as many times as its weight) in turn until the
+    duration elapses.
+
+    Args:
+        url: the root URL of the server.
+        emails: the emails of the seeded users.
+        mix: the weight of each workload.
+        concurrency: the number of concurrent clients.
+        duration: the seconds to run.
+        markdown: the markdown of the reports created.
+
+    Returns:
+        The report, with the summary of each route.
+    """
+    schedule = [name for name, weight in mix.items() for _ in range(weight)]
+    deadline = perf_counter() + duration
+
+    def work(index: int) -> Client:
+        client = Client(url, emails[index % len(emails)], markdown)
+        client.login()
+
+        # The clients start at different workloads of the schedule.
+        for name in itertools.islice(itertools.cycle(schedule), index, None):
+            if perf_counter() >= deadline:
+                break
+            WORKLOADS[name](client)
+
+        return client
+
+    started_at = perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        clients = list(executor.map(work, range(concurrency)))
+
+    elapsed = perf_counter() - started_at
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+
+    for client in clients:
+        for route, values in client.latencies.items():
+            latencies[route] += values
+        for route, count in client.errors.items():
+            errors[route] += count
+
+    return {
+        "concurrency": concurrency,
+        "duration": round(elapsed, 2),
+        "mix": mix,
+        "routes": summarize(latencies, errors, elapsed),
+    }
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Parse a `name=weight,...` workload mix."""
+    mix = {}
+
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in WORKLOADS:
+            raise argparse.ArgumentTypeError(f"Unknown workload: {name}.")
+        mix[name] = int(weight or 1)
+
+    return mix
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the benchmark, returning the exit status."""
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.benchmarks.load",
+        description="HTTP load benchmark of the API.",
+    )
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--reports", type=int, default=20)
+    parser.add_argument("--markdown-size", type=int, default=2048)
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="the workloads and their weights, e.g. list=6,create=1",
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument(
+        "--url", help="a running server, instead of the in-process one"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--output", help="the file to write the report to")
+    parser.add_argument("--baseline", help="the report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    markdown = ("# Report\n\n" + "lorem ipsum " * args.markdown_size)[
+        : args.markdown_size
+    ]
+    emails = asyncio.run(seed(args.users, args.reports, markdown))
+
+    def benchmark(url: str) -> Dict[str, Any]:
+        return run(
+            url=url,
+            emails=emails,
+            mix=args.mix,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            markdown=markdown,
+        )
+
+    if args.url:
+        report = benchmark(args.url.rstrip("/"))
+    else:
+        from drivr import app
+        from tests.integration.modules.server_app import Server
+
+        server = Server(
+            config=uvicorn.Config(
+                app,
+                host=args.host,
+                port=args.port,
+                log_level="warning",
+                access_log=False,
+                loop="asyncio",
+            )
+        )
+        with server.run_in_thread():
+            report = benchmark(f"http://{args.host}:{args.port}")
+
+    report["dataset"] = {
+        "users": args.users,
+        "reports": args.reports,
+        "markdown_size": args.markdown_size,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+Micro-benchmarks of the CRUD, security and schema hot paths.
+
+Each benchmark is timed by `timeit` (garbage collection disabled): the
+number of calls per round is calibrated to last at least 0.2 seconds, and
+the statistics of the per-call time are taken over the rounds. The results
+are printed as JSON. With `--baseline`, exits with 1 when the median of a
+benchmark rose beyond `--threshold`.
+
+    python -m tests.benchmarks.micro --output baseline.json
+    python -m tests.benchmarks.micro --filter security --baseline baseline.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+from datetime import datetime
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Sequence
+
+from fastapi.encoders import jsonable_encoder
+
+from drivr import crud, model, schema, security
+from drivr.api import deps, responses
+
+Setup = Callable[[int], Callable[[], Any]]
+
+# The setup of each benchmark, taking the size of the lists.
+BENCHMARKS: Dict[str, Setup] = {}
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    """Register the setup of a benchmark, returning the function timed."""
+
+    def decorator(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+class Result:
+    """A stand-in of the database result, as the CRUD actions read it."""
+
+    def scalars(self) -> "Result":
+        return self
+
+    def first(self) -> None:
+        return None
+
+    def all(self) -> List[Any]:
+        return []
+
+
+class Session:
+    """A stand-in of the database session, which executes nothing."""
+
+    def __init__(self):
+        self.statement = None
+
+    async def execute(self, statement: Any) -> Result:
+        self.statement = statement
+        return Result()
+
+
+def run_until_complete(coroutine: Coroutine) -> Any:
+    """Run a coroutine which never suspends, without an event loop."""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("The coroutine was suspended.")
+
+
+def users(size: int) -> List[model.User]:
+    """The users of the list benchmarks."""
+    now = datetime(2021, 5, 1, 12)
+    return [
+        model.User(
+            id=index,
+            email=f"user-{index}@example.com",
+            moderator=False,
+            active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(size)
+    ]
+
+
+@benchmark("security.create_access_token")
+def create_access_token(size: int) -> Callable[[], Any]:
+    return lambda: security.create_access_token(subject="1")
+
+
+@benchmark("deps.decode_token")
+def decode_token(size: int) -> Callable[[], Any]:
+    token = security.create_access_token(subject="1")
+
+    def decode():
+        deps.token_payloads.clear()
+        return deps.decode_token(token)
+
+    return decode
+
+
+@benchmark("deps.decode_token (memoized)")
+def decode_token_memoized(size: int) -> Callable[[], Any]:
+    token = security.create_access_token(subject="1")
+    return lambda: deps.decode_token(token)
+
+
+@benchmark("security.password.hash_password")
+def hash_password(size: int) -> Callable[[], Any]:
+    return lambda: security.password.hash_password("benchmark-password")
+
+
+@benchmark("security.password.verify_password")
+def verify_password(size: int) -> Callable[[], Any]:
+    hashed = security.password.hash_password("benchmark-password")
+    return lambda: security.password.verify_password(
+        "benchmark-password", hashed
+    )
+
+
+@benchmark("schema.User.from_orm (list)")
+def from_orm(size: int) -> Callable[[], Any]:
+    entities = users(size)
+    return lambda: [schema.User.from_orm(user) for user in entities]
+
+
+@benchmark("responses.json_response (list)")
+def json_response(size: int) -> Callable[[], Any]:
+    entities = users(size)
+    return lambda: responses.json_response(entities, schema.User)
+
+
+@benchmark("jsonable_encoder (create schema)")
+def encode_schema(size: int) -> Callable[[], Any]:
+    create = schema.UserCreate(
+        email="user@example.com", password="benchmark-password"
+    )
+    return lambda: jsonable_encoder(create)
+
+
+@benchmark("CRUDBase._update_values")
+def update_values(size: int) -> Callable[[], Any]:
+    update = schema.UserUpdate(email="user@example.com", moderator=True)
+    return lambda: crud.users._update_values(update)
+
+
+@benchmark("CRUDBase.get (statement)")
+def get_statement(size: int) -> Callable[[], Any]:
+    db = Session()
+    return lambda: run_until_complete(crud.users.get(db=db, id=1))
+
+
+@benchmark("CRUDBase.all (statement)")
+def all_statement(size: int) -> Callable[[], Any]:
+    db = Session()
+    return lambda: run_until_complete(crud.users.all(db=db, limit=100))
+
+
+@benchmark("CRUDBase.all (statement cache key)")
+def all_cache_key(size: int) -> Callable[[], Any]:
+    db = Session()
+    run_until_complete(crud.users.all(db=db, limit=100))
+    return db.statement._generate_cache_key
+
+
+def measure(function: Callable[[], Any], rounds: int) -> Dict[str, float]:
+    """
+    Time the function.
+
+    Args:
+        function: the function to time.
+        rounds: the number of rounds.
+
+    Returns:
+        The calls per round, and the min, median, mean, standard deviation
+        and interquartile range of the per-call time (in microseconds),
+        with the calls per second at the median.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    # The first round warms up the caches (e.g. the compiled statements).
+    timer.timeit(number)
+    times = [
+        round_time / number * 1e6
+        for round_time in timer.repeat(repeat=rounds, number=number)
+    ]
+    quartiles = statistics.quantiles(times, n=4)
+    median = statistics.median(times)
+
+    return {
+        "number": number,
+        "rounds": rounds,
+        "min": round(min(times), 3),
+        "median": round(median, 3),
+        "mean": round(statistics.mean(times), 3),
+        "stdev": round(statistics.stdev(times), 3),
+        "iqr": round(quartiles[2] - quartiles[0], 3),
+        "ops": round(1e6 / median, 1),
+    }
+
+
+def compare(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+) -> List[str]:
+    """
+    The regressions of the report against the baseline.
+
+    Args:
+        report: the report of `main`.
+        baseline: a previous report.
+        threshold: the tolerated slowdown, e.g. `0.1` for 10%.
+
+    Returns:
+        The description of each benchmark whose median per-call time rose
+        beyond the threshold. The benchmarks not run are ignored.
+    """
+    regressions = []
+
+    for name, actual in report["benchmarks"].items():
+        if (expected := baseline["benchmarks"].get(name)) is None:
+            continue
+
+        if actual["median"] > expected["median"] * (1 + threshold):
+            regressions.append(
+                f"{name}: {actual['median']} us, "
+                f"baseline {expected['median']} us."
+            )
+
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the benchmarks, returning the exit status."""
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.benchmarks.micro",
+        description="Micro-benchmarks of the hot paths.",
+    )
+    parser.add_argument(
+        "--filter", default="", help="run the benchmarks whose name has it"
+    )
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument(
+        "--size", type=int, default=1000, help="the size of the lists"
+    )
+    parser.add_argument("--output", help="the file to write the report to")
+    parser.add_argument("--baseline", help="the report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.rounds < 2:
+        parser.error("the statistics need at least 2 rounds")
+
+    argon2 = security.password.context.handler("argon2")
+    report = {
+        "python": platform.python_version(),
+        "size": args.size,
+        "argon2": {
+            "type": argon2.type,
+            "time_cost": argon2.default_rounds,
+            "memory_cost": argon2.memory_cost,
+            "parallelism": argon2.parallelism,
+        },
+        "benchmarks": {
+            name: measure(setup(args.size), args.rounds)
+            for name, setup in BENCHMARKS.items()
+            if args.filter in name
+        },
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+from datetime import datetime
+
+import pytest
+
+from drivr import schema
+from drivr.api.conditional import (
+    check,
+    is_not_modified,
+    representation,
+    validators,
+)
+from tests.unit.factories import ReportFactory
+
+
+def request(mocker, **headers):
+    request = mocker.MagicMock()
+    request.headers = {
+        name.replace("_", "-"): value for name, value in headers.items()
+    }
+    return request
+
+
+class TestValidators:
+    def test_should_change_the_etag_when_an_entity_changes(self):
+        reports = ReportFactory.build_batch(2)
+        headers = validators(reports)
+
+        reports[1].updated_at = datetime(2021, 5, 1)
+
+        assert validators(reports)["ETag"] != headers["ETag"]
+        assert validators(reports[:1])["ETag"] != headers["ETag"]
+
+    def test_should_change_the_etag_with_the_representation(self):
+        reports = ReportFactory.build_batch(2)
+
+        assert (
+            validators(reports, representation(schema.Report))["ETag"]
+            != validators(
+                reports, representation(schema.Report, ["id", "html"])
+            )["ETag"]
+        )
+
+    def test_should_send_the_latest_update_as_last_modified(self):
+        reports = ReportFactory.build_batch(2)
+        reports[0].updated_at = datetime(2021, 5, 1, 10, 30, 15)
+        reports[1].updated_at = datetime(2021, 4, 1)
+
+        assert validators(reports)["Last-Modified"] == (
+            "Sat, 01 May 2021 10:30:15 GMT"
+        )
+
+    def test_should_not_send_last_modified_without_entities(self):
+        assert "Last-Modified" not in validators([])
+
+
+class TestRepresentation:
+    def test_should_name_the_schema_and_the_fields(self):
+        assert representation(schema.User, ["email", "active"]) == (
+            "User(email,active)"
+        )
+
+    def test_should_default_to_every_field_of_the_schema(self):
+        assert representation(schema.Report) == (
+            f"Report({','.join(schema.Report.__fields__)})"
+        )
+
+
+class TestIsNotModified:
+    def test_should_match_any_of_the_entity_tags(self, mocker):
+        headers = validators(ReportFactory.build_batch(2))
+
+        assert is_not_modified(
+            request(mocker, if_none_match=f'"other", W/{headers["ETag"]}'),
+            headers,
+        )
+        assert not is_not_modified(
+            request(mocker, if_none_match='"other"'), headers
+        )
+
+    def test_should_ignore_if_modified_since_with_if_none_match(
+        self,
+        mocker,
+    ):
+        report = ReportFactory(updated_at=datetime(2021, 5, 1))
+        headers = validators(report)
+
+        assert not is_not_modified(
+            request(
+                mocker,
+                if_none_match='"other"',
+                if_modified_since="Sun, 02 May 2021 00:00:00 GMT",
+            ),
+            headers,
+        )
+
+    @pytest.mark.parametrize(
+        "if_modified_since, expected",
+        [
+            ("Sat, 01 May 2021 10:30:15 GMT", True),
+            ("Sat, 01 May 2021 10:30:14 GMT", False),
+            ("yesterday", False),
+        ],
+    )
+    def test_should_compare_the_dates_to_the_second(
+        self,
+        mocker,
+        if_modified_since,
+        expected,
+    ):
+        report = ReportFactory(updated_at=datetime(2021, 5, 1, 10, 30, 15, 9))
+
+        assert expected == is_not_modified(
+            request(mocker, if_modified_since=if_modified_since),
+            validators(report),
+        )
+
+
+class TestCheck:
+    @pytest.mark.asyncio
+    async def test_should_not_query_unconditional_requests(self, mocker):
+        versions = mocker.AsyncMock()
+
+        assert await check(request(mocker), versions) is None
+
+        versions.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_should_answer_304_when_the_copy_is_current(self, mocker):
+        reports = ReportFactory.build_batch(2)
+        headers = validators(reports)
+        versions = mocker.AsyncMock(return_value=reports)
+
+        response = await check(
+            request(mocker, if_none_match=headers["ETag"]), versions
+        )
+
+        assert response.status_code == 304
+        assert response.headers["ETag"] == headers["ETag"]
+        assert response.body == b""
@@ -5,30 +5,105 @@ from pydantic import ValidationError
 
 from drivr.api.deps import (
     db_session,
+    decode_token,
     get_authenticated_active_user,
     get_authenticated_moderator,
     get_authenticated_user,
+    sparse_fields,
+    token_payloads,
 )
+from drivr.schema import TokenPayload, User
 from tests.unit.factories import UserFactory
 
 MODULE = "drivr.api.deps"
 
 
+@pytest.fixture(autouse=True)
+def clear_token_payloads():
+    token_payloads.clear()
+    yield
+    token_payloads.clear()
+
+
 class TestDbSession:
-    def test_should_call_session_local_and_close_db_session_on_yield(
+    @pytest.mark.asyncio
+    async def test_should_call_session_local_and_close_db_session_on_yield(
         self,
         mocker,
     ):
-        session_local = mocker.patch(f"{MODULE}.db.SessionLocal")
+        session_local = mocker.patch(
+            f"{MODULE}.db.SessionLocal",
+            return_value=mocker.AsyncMock(),
+        )
 
-        next(db_session())
+        session = session_local.return_value
+
+        async for _ in db_session():
+            session.close.assert_not_awaited()
 
         session_local.assert_called_once()
-        session_local().close.assert_called_once()
+        session.close.assert_awaited_once()
+
+
+class TestDecodeToken:
+    def test_should_memoize_the_payload_until_the_token_expires(
+        self,
+        mocker,
+        faker,
+    ):
+        token = faker.sha1()
+        sub = faker.pyint()
+
+        mocker.patch(f"{MODULE}.time", return_value=1000)
+        decode = mocker.patch(
+            f"{MODULE}.decode",
+            return_value={"sub": sub, "exp": 1060},
+        )
+        cache_set = mocker.spy(token_payloads, "set")
+
+        assert decode_token(token) == TokenPayload(sub=sub)
+        assert decode_token(token) == TokenPayload(sub=sub)
+
+        decode.assert_called_once()
+        cache_set.assert_called_once_with(
+            mocker.ANY,
+            TokenPayload(sub=sub),
+            ttl=60,
+        )
+        assert token not in cache_set.call_args.args[0]
+        assert token_payloads.stats()["hits"] == 1
+
+    def test_should_not_memoize_an_expired_payload(self, mocker, faker):
+        token = faker.sha1()
+
+        mocker.patch(f"{MODULE}.time", return_value=1000)
+        decode = mocker.patch(
+            f"{MODULE}.decode",
+            return_value={"sub": faker.pyint(), "exp": 1000},
+        )
+
+        decode_token(token)
+        decode_token(token)
+
+        assert decode.call_count == 2
+        assert len(token_payloads) == 0
+
+    def test_should_not_memoize_invalid_tokens(self, mocker, faker):
+        token = faker.sha1()
+
+        decode = mocker.patch(f"{MODULE}.decode", side_effect=PyJWTError())
+
+        for _ in range(2):
+            with pytest.raises(PyJWTError):
+                decode_token(token)
+
+        assert decode.call_count == 2
+        assert len(token_payloads) == 0
 
 
 class TestGetAuthenticated:
-    def test_should_raise_httpexception_403_when_pyjwterror_is_raised(
+    @pytest.mark.asyncio
+    async def test_should_raise_httpexception_403_when_pyjwterror_is_raised(
         self,
         mocker,
         faker,
@@ -44,7 +119,7 @@ class TestGetAuthenticated:
         settings.ACCESS_TOKEN_ALGORITHM = access_token_algorithm
 
         with pytest.raises(HTTPException) as ex:
-            get_authenticated_user(db=db, token=token)
+            await get_authenticated_user(db=db, token=token)
 
         assert ex.value.status_code == 403
         assert ex.value.detail == "Could not validate the user credentials."
@@ -55,7 +130,8 @@ class TestGetAuthenticated:
             algorithms=[access_token_algorithm],
         )
 
-    def test_should_raise_httpexception_403_when_validationerror_is_raised(
+    @pytest.mark.asyncio
+    async def test_should_raise_httpexception_403_when_validationerror_raised(
         self,
         mocker,
         faker,
@@ -77,7 +153,7 @@ class TestGetAuthenticated:
         settings.ACCESS_TOKEN_ALGORITHM = access_token_algorithm
 
         with pytest.raises(HTTPException) as ex:
-            get_authenticated_user(db=db, token=token)
+            await get_authenticated_user(db=db, token=token)
 
         assert ex.value.status_code == 403
         assert ex.value.detail == "Could not validate the user credentials."
@@ -88,7 +164,8 @@ class TestGetAuthenticated:
             algorithms=[access_token_algorithm],
         )
 
-    def test_should_raise_httpexception_404_when_user_is_not_found(
+    @pytest.mark.asyncio
+    async def test_should_raise_httpexception_404_when_user_is_not_found(
         self,
         mocker,
         faker,
@@ -101,13 +178,15 @@ class TestGetAuthenticated:
 
         payload = {"sub": sub}
         decode = mocker.patch(f"{MODULE}.decode", return_value=payload)
-        get = mocker.patch(f"{MODULE}.crud.users.get", return_value=None)
+        get = mocker.patch(
+            f"{MODULE}.crud.users.get_cached", return_value=None
+        )
         settings = mocker.patch(f"{MODULE}.core.settings")
         settings.SECRET_KEY = secret_key
         settings.ACCESS_TOKEN_ALGORITHM = access_token_algorithm
 
         with pytest.raises(HTTPException) as ex:
-            get_authenticated_user(db=db, token=token)
+            await get_authenticated_user(db=db, token=token)
 
         assert ex.value.status_code == 404
         assert ex.value.detail == "User not found."
@@ -118,9 +197,10 @@ class TestGetAuthenticated:
             algorithms=[access_token_algorithm],
         )
 
-        get.assert_called_once_with(db=db, id=sub)
+        get.assert_awaited_once_with(db=db, id=sub)
 
-    def test_should_the_user_object_when_it_exists_in_database(
+    @pytest.mark.asyncio
+    async def test_should_the_user_object_when_it_exists_in_database(
         self,
         mocker,
         faker,
@@ -134,12 +214,14 @@ class TestGetAuthenticated:
 
         payload = {"sub": sub}
         decode = mocker.patch(f"{MODULE}.decode", return_value=payload)
-        get = mocker.patch(f"{MODULE}.crud.users.get", return_value=user)
+        get = mocker.patch(
+            f"{MODULE}.crud.users.get_cached", return_value=user
+        )
         settings = mocker.patch(f"{MODULE}.core.settings")
         settings.SECRET_KEY = secret_key
         settings.ACCESS_TOKEN_ALGORITHM = access_token_algorithm
 
-        actual_user = get_authenticated_user(db=db, token=token)
+        actual_user = await get_authenticated_user(db=db, token=token)
         assert actual_user == user
 
         decode.assert_called_once_with(
@@ -148,7 +230,7 @@ class TestGetAuthenticated:
             algorithms=[access_token_algorithm],
         )
 
-        get.assert_called_once_with(db=db, id=sub)
+        get.assert_awaited_once_with(db=db, id=sub)
 
 
 class TestGetAuthenticatedActiveUser:
@@ -181,3 +263,27 @@ class TestGetAuthenticatedModerator:
     def test_should_the_user_when_it_is_active(self):
         user = UserFactory(moderator=True)
         assert user == get_authenticated_moderator(user=user)
+
+
+class TestSparseFields:
+    def test_should_document_an_example_of_the_schema(self):
+        dependency = sparse_fields(User)
+        example = dependency.__defaults__[0].description.split("`")[1]
+
+        assert example == "email,moderator"
+        assert dependency(example) == ["email", "moderator"]
+
+    def test_should_answer_400_to_the_unknown_fields(self):
+        with pytest.raises(HTTPException) as ex:
+            sparse_fields(User)("id,email")
+
+        assert ex.value.status_code == 400
+        assert ex.value.detail == "Unknown fields: id."
+
+    def test_should_dedupe_the_fields_in_the_schema_order(self):
+        dependency = sparse_fields(User)
+
+        assert dependency("moderator, email,moderator") == [
+            "email",
+            "moderator",
+        ]
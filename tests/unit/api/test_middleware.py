@@ -0,0 +1,86 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from drivr.api import middleware
+from drivr.db.metrics import instrument_queries
+
+
+class TestMetricsMiddleware:
+    def test_should_label_the_requests_by_the_route_template(
+        self,
+        mocker,
+        client,
+    ):
+        requests_total = mocker.patch.object(middleware, "requests_total")
+        request_duration = mocker.patch.object(middleware, "request_duration")
+        requests_in_progress = mocker.patch.object(
+            middleware, "requests_in_progress"
+        )
+
+        client.get("/users/1/reports")
+        client.get("/missing")
+
+        assert requests_total.inc.call_args_list == [
+            mocker.call("GET", "/users/{id}/reports", "401"),
+            mocker.call("GET", "unmatched", "404"),
+        ]
+        request_duration.observe.assert_any_call(
+            "GET", "/users/{id}/reports", value=mocker.ANY
+        )
+        assert requests_in_progress.inc.call_count == 2
+        assert requests_in_progress.dec.call_count == 2
+
+
+class TestQueryRecorderMiddleware:
+    @staticmethod
+    def client(queries, **kwargs):
+        engine = create_engine("sqlite://")
+        instrument_queries(engine)
+
+        async def app(scope, receive, send):
+            with engine.connect() as connection:
+                for query in queries:
+                    connection.execute(text(query))
+            await send(
+                {"type": "http.response.start", "status": 200, "headers": []}
+            )
+            await send({"type": "http.response.body", "body": b""})
+
+        return TestClient(middleware.QueryRecorderMiddleware(app, **kwargs))
+
+    def test_should_send_the_server_timing_of_the_queries(self):
+        client = self.client(
+            ["SELECT 1", "SELECT 2"], budget=10, repeat_threshold=5
+        )
+
+        response = client.get("/")
+
+        assert response.headers["server-timing"].endswith('desc="2 queries"')
+
+    def test_should_not_send_the_server_timing_when_disabled(self):
+        client = self.client(
+            ["SELECT 1"], budget=10, repeat_threshold=5, server_timing=False
+        )
+
+        assert "server-timing" not in client.get("/").headers
+
+    def test_should_warn_about_the_requests_over_the_budget(self, caplog):
+        client = self.client(
+            ["SELECT 1", "SELECT 2"], budget=1, repeat_threshold=5
+        )
+
+        client.get("/reports")
+
+        assert caplog.messages == [
+            "GET /reports executed 2 queries (budget 1) in "
+            f"{caplog.records[0].args[3]:.1f} ms."
+        ]
+
+    def test_should_warn_about_the_repeated_selects(self, caplog):
+        client = self.client(["SELECT 1"] * 3, budget=10, repeat_threshold=3)
+
+        client.get("/reports")
+
+        assert caplog.messages == [
+            "GET /reports executed the same query 3 times (N+1?): SELECT 1"
+        ]
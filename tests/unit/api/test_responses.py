@@ -0,0 +1,38 @@
+import json
+
+from fastapi.encoders import jsonable_encoder
+
+from drivr import schema
+from drivr.api.responses import json_response, serializer
+from tests.unit.factories import ReportFactory, UserFactory
+
+
+class TestSerializer:
+    def test_should_match_the_response_model_encoding(self):
+        user = UserFactory()
+
+        content = json_response([user], schema.UserWithReports).body
+
+        assert json.loads(content) == [
+            jsonable_encoder(schema.UserWithReports.from_orm(user))
+        ]
+
+    def test_should_serialize_the_nested_entity(self):
+        report = ReportFactory()
+
+        content = json_response(report, schema.ReportWithUser).body
+
+        assert json.loads(content) == jsonable_encoder(
+            schema.ReportWithUser.from_orm(report)
+        )
+
+    def test_should_keep_only_the_fields_provided(self):
+        report = ReportFactory()
+
+        assert serializer(schema.Report, ("id", "user_id"))(report) == {
+            "id": report.id,
+            "user_id": report.user_id,
+        }
+
+    def test_should_reuse_the_compiled_serializer(self):
+        assert serializer(schema.User) is serializer(schema.User)
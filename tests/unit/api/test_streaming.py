@@ -0,0 +1,138 @@
+import json
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from drivr import schema
+from drivr.api.streaming import (
+    CSV,
+    NDJSON,
+    ExportFormat,
+    export,
+    read_lines,
+    read_rows,
+)
+from tests.unit.factories import ReportFactory
+
+MODULE = "drivr.api.streaming"
+
+
+async def stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+class TestReadLines:
+    @pytest.mark.asyncio
+    async def test_should_split_the_lines_across_the_chunks(self):
+        lines = read_lines(
+            stream(b"fir", b"st\r\nsec", b"ond\n\nthird"), max_size=10
+        )
+
+        assert ["first", "second", "", "third"] == await collect(lines)
+
+    @pytest.mark.asyncio
+    async def test_should_decode_characters_split_across_the_chunks(self):
+        encoded = "café\n".encode()
+
+        lines = read_lines(stream(encoded[:4], encoded[4:]), max_size=10)
+
+        assert ["café"] == await collect(lines)
+
+    @pytest.mark.asyncio
+    async def test_should_drop_the_lines_not_in_utf8(self):
+        lines = read_lines(stream(b"caf\xe9\nok\n"), max_size=10)
+
+        assert [None, "ok"] == await collect(lines)
+
+    @pytest.mark.asyncio
+    async def test_should_drop_the_lines_too_long_as_they_arrive(self):
+        lines = read_lines(
+            stream(b"ok\nlo", b"ooo", b"oooo", b"ng\nok\nlooooong"),
+            max_size=4,
+        )
+
+        assert ["ok", None, "ok", None] == await collect(lines)
+
+
+class TestReadRows:
+    @pytest.mark.asyncio
+    async def test_should_parse_the_ndjson_objects(self):
+        rows = read_rows(
+            stream(b'{"email": "a@b.c"}\n\n[1]\n{"email": \n'),
+            NDJSON,
+            max_line_size=100,
+        )
+
+        assert [
+            (1, {"email": "a@b.c"}),
+            (3, None),
+            (4, None),
+        ] == await collect(rows)
+
+    @pytest.mark.asyncio
+    async def test_should_parse_the_csv_records_by_the_header(self):
+        rows = read_rows(
+            stream(b'email,password\na@b.c,"se,cret"\n\nd@e.f\n'),
+            CSV,
+            max_line_size=100,
+        )
+
+        assert [
+            (2, {"email": "a@b.c", "password": "se,cret"}),
+            (4, None),
+        ] == await collect(rows)
+
+    @pytest.mark.asyncio
+    async def test_should_reject_the_records_without_a_header(self):
+        rows = read_rows(
+            stream(b"em\xe1il,password\na@b.c,secret\n"),
+            CSV,
+            max_line_size=100,
+        )
+
+        assert [(1, None), (2, None)] == await collect(rows)
+
+
+class TestExport:
+    @pytest.mark.asyncio
+    async def test_should_send_the_lines_in_chunks(self, mocker):
+        reports = ReportFactory.build_batch(3)
+        mocker.patch(f"{MODULE}.CHUNK_SIZE", 1)
+
+        response = export(
+            stream(*reports),
+            schema=schema.Report,
+            format=ExportFormat.ndjson,
+            filename="reports",
+        )
+
+        assert response.media_type == NDJSON
+        chunks = [chunk async for chunk in response.body_iterator]
+        assert len(chunks) == len(reports)
+        assert [json.loads(chunk) for chunk in chunks] == [
+            jsonable_encoder(schema.Report.from_orm(report))
+            for report in reports
+        ]
+
+    @pytest.mark.asyncio
+    async def test_should_buffer_the_lines_up_to_the_chunk_size(self):
+        reports = ReportFactory.build_batch(3)
+
+        response = export(
+            stream(*reports),
+            schema=schema.Report,
+            format=ExportFormat.csv,
+            filename="reports",
+        )
+
+        chunks = [chunk async for chunk in response.body_iterator]
+        assert len(chunks) == 1
+        assert chunks[0].decode().splitlines()[0] == (
+            "markdown,id,user_id,html,created_at,updated_at"
+        )
+        assert len(chunks[0].decode().splitlines()) == 4
@@ -1,3 +1,4 @@
+from drivr.security import Admission, PasswordHashingUnavailable
 from tests.unit.factories import UserFactory
 
 MODULE = "drivr.api.v1.endpoints.login"
@@ -115,3 +116,45 @@ class TestLoginEndpoint:
             password=user.password,
         )
         create_access_token.assert_called_once_with(subject=user.id)
+
+    def test_should_return_503_when_password_hashing_is_unavailable(
+        self,
+        mocker,
+        faker,
+        client,
+    ):
+        mocker.patch(
+            f"{MODULE}.crud.users.authenticate",
+            side_effect=PasswordHashingUnavailable(),
+        )
+
+        response = client.post(
+            "/login/",
+            data={"username": faker.email(), "password": faker.password()},
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert response.json() == {
+            "detail": "The service is busy, try again later."
+        }
+
+    def test_should_return_503_when_the_logins_are_saturated(
+        self,
+        mocker,
+        faker,
+        client,
+    ):
+        authenticate = mocker.patch(f"{MODULE}.crud.users.authenticate")
+        admission = Admission("login", limit=0, queue_size=0, timeout=1)
+        admission.duration = 2.5
+        mocker.patch(f"{MODULE}.security.login_admission", admission)
+
+        response = client.post(
+            "/login/",
+            data={"username": faker.email(), "password": faker.password()},
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+        authenticate.assert_not_called()
@@ -0,0 +1,55 @@
+from drivr.api import deps
+from tests.unit.factories import UserFactory
+
+MODULE = "drivr.api.v1.endpoints.monitoring"
+
+
+class TestGetDbPoolStatus:
+    def test_should_return_the_pool_statistics(self, mocker, client):
+        moderator = UserFactory(moderator=True)
+        pool_status = {
+            "size": 5,
+            "checked_in": 3,
+            "checked_out": 2,
+            "overflow": 0,
+            "timeouts": 0,
+            "wait_time": {"buckets": {"+Inf": 4}, "sum": 0.5, "count": 4},
+        }
+
+        status = mocker.patch(
+            f"{MODULE}.db.pool_status",
+            return_value=pool_status,
+        )
+        client.app.dependency_overrides[
+            deps.get_authenticated_moderator
+        ] = lambda: moderator
+
+        response = client.get("/monitoring/db-pool")
+
+        assert response.status_code == 200
+        assert response.json() == pool_status
+        status.assert_called_once_with(mocker.ANY)
+
+
+class TestGetResponseCacheStats:
+    def test_should_return_the_cache_counters(self, mocker, client):
+        response_cache = mocker.patch(f"{MODULE}.cache.response_cache")
+        response_cache.enabled = True
+        response_cache.stats.return_value = {
+            "hits": 3,
+            "misses": 1,
+            "errors": 0,
+        }
+        client.app.dependency_overrides[
+            deps.get_authenticated_moderator
+        ] = lambda: UserFactory(moderator=True)
+
+        response = client.get("/monitoring/response-cache")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "enabled": True,
+            "hits": 3,
+            "misses": 1,
+            "errors": 0,
+        }
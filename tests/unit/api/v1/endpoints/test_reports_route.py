@@ -0,0 +1,368 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from drivr import schema
+from drivr.api import deps
+from drivr.api.streaming import ExportFormat
+from drivr.api.v1.endpoints.reports import FIELDS, export_reports
+from tests.unit.factories import ReportFactory, UserFactory
+
+MODULE = "drivr.api.v1.endpoints.reports"
+
+
+async def read(response) -> str:
+    return b"".join([chunk async for chunk in response.body_iterator]).decode()
+
+
+class TestExport:
+    @pytest.mark.asyncio
+    async def test_should_stream_the_reports_as_ndjson(self, mocker):
+        db = mocker.MagicMock()
+        reports = ReportFactory.build_batch(2)
+
+        async def stream(db, fields):
+            for report in reports:
+                yield report
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.stream.side_effect = stream
+
+        response = await export_reports(
+            format=ExportFormat.ndjson,
+            db=db,
+            moderator=UserFactory(moderator=True),
+        )
+
+        assert response.headers["content-disposition"] == (
+            'attachment; filename="reports.ndjson"'
+        )
+        assert [
+            json.loads(line) for line in (await read(response)).splitlines()
+        ] == [
+            jsonable_encoder(schema.Report.from_orm(report))
+            for report in reports
+        ]
+        crud.stream.assert_called_once_with(db=db, fields=FIELDS)
+
+
+class TestGetAll:
+    def test_should_send_the_page_and_the_next_cursor(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        reports = ReportFactory.build_batch(2)
+        next_cursor = faker.sha1()
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.all.return_value = reports
+        crud.next_cursor.return_value = next_cursor
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: UserFactory()
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        response = client.get("/reports/", params={"limit": 2})
+
+        assert response.status_code == 200
+        assert response.headers["X-Next-Cursor"] == next_cursor
+        assert [report["id"] for report in response.json()] == [
+            report.id for report in reports
+        ]
+        crud.all.assert_called_once_with(
+            db=db, skip=0, limit=2, cursor=None, fields=FIELDS
+        )
+
+    def test_should_send_only_the_fields_requested(
+        self,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        reports = ReportFactory.build_batch(2)
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.all.return_value = reports
+        crud.next_cursor.return_value = None
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: UserFactory()
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        response = client.get("/reports/", params={"fields": "id,user_id"})
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": report.id, "user_id": report.user_id} for report in reports
+        ]
+        crud.all.assert_called_once_with(
+            db=db, skip=0, limit=100, cursor=None, fields=["id", "user_id"]
+        )
+
+    def test_should_return_400_when_a_field_is_unknown(self, client):
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: UserFactory()
+        client.app.dependency_overrides[deps.db_session] = lambda: None
+
+        response = client.get("/reports/", params={"fields": "id,password"})
+
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Unknown fields: password."}
+
+    def test_should_answer_304_without_loading_the_page(
+        self,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        reports = ReportFactory.build_batch(2)
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.all.return_value = reports
+        crud.next_cursor.return_value = None
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: UserFactory()
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        etag = client.get("/reports/").headers["ETag"]
+        crud.all.reset_mock()
+        response = client.get("/reports/", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        crud.all.assert_called_once_with(
+            db=db,
+            skip=0,
+            limit=100,
+            cursor=None,
+            fields=["id", "updated_at"],
+        )
+
+
+class TestGetWithUser:
+    def test_should_send_the_reports_with_their_authors(
+        self,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        reports = ReportFactory.build_batch(2)
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.all_with_user.return_value = reports
+        crud.next_cursor.return_value = None
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: UserFactory()
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        response = client.get("/reports/with-user")
+
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+        assert [report["user"]["email"] for report in response.json()] == [
+            report.user.email for report in reports
+        ]
+        crud.all_with_user.assert_called_once_with(
+            db=db, skip=0, limit=100, cursor=None, fields=FIELDS
+        )
+
+    def test_should_change_the_etag_when_an_author_changes(
+        self,
+        mocker,
+        client,
+    ):
+        reports = ReportFactory.build_batch(2)
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.all_with_user.return_value = reports
+        crud.next_cursor.return_value = None
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: UserFactory()
+        client.app.dependency_overrides[deps.db_session] = lambda: None
+
+        etag = client.get("/reports/with-user").headers["ETag"]
+        not_modified = client.get(
+            "/reports/with-user", headers={"If-None-Match": etag}
+        )
+        reports[0].user.updated_at = datetime(2021, 5, 1)
+        modified = client.get(
+            "/reports/with-user", headers={"If-None-Match": etag}
+        )
+
+        assert not_modified.status_code == 304
+        assert modified.status_code == 200
+        assert modified.headers["ETag"] != etag
+
+
+class TestGet:
+    def test_should_return_404_when_report_is_not_found(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.get.return_value = None
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: UserFactory()
+        client.app.dependency_overrides[deps.db_session] = lambda: None
+
+        response = client.get(f"/reports/{faker.pyint()}")
+
+        assert response.status_code == 404
+
+
+class TestPost:
+    def test_should_create_the_report_of_the_authenticated_user(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        user = UserFactory()
+        report = ReportFactory(user=user)
+        payload = {"markdown": report.markdown}
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.create.return_value = report
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: user
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        response = client.post("/reports/", json=payload)
+
+        assert response.status_code == 201
+        assert response.json()["user_id"] == user.id
+        crud.create.assert_called_once_with(
+            db=db,
+            schema={**payload, "user_id": user.id},
+        )
+
+
+class TestPut:
+    def test_should_return_403_when_the_user_is_not_the_author(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        user = UserFactory(moderator=False)
+        report = ReportFactory()
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.get.return_value = report
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: user
+        client.app.dependency_overrides[deps.db_session] = lambda: None
+
+        response = client.put(
+            f"/reports/{report.id}", json={"markdown": faker.paragraph()}
+        )
+
+        assert response.status_code == 403
+        crud.update.assert_not_called()
+
+    def test_should_update_the_report_of_the_author(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        report = ReportFactory()
+        markdown = faker.paragraph()
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.get.return_value = report
+        crud.update.return_value = report
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: report.user
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        response = client.put(
+            f"/reports/{report.id}", json={"markdown": markdown}
+        )
+
+        assert response.status_code == 200
+        crud.update.assert_called_once_with(
+            db=db,
+            model=report,
+            schema=schema.ReportUpdate(markdown=markdown),
+        )
+
+    def test_should_return_422_when_the_markdown_is_null(
+        self,
+        mocker,
+        client,
+    ):
+        report = ReportFactory()
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: report.user
+        client.app.dependency_overrides[deps.db_session] = lambda: None
+
+        response = client.put(f"/reports/{report.id}", json={"markdown": None})
+
+        assert response.status_code == 422
+        crud.update.assert_not_called()
+
+    def test_should_return_404_when_the_report_was_removed_meanwhile(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        report = ReportFactory()
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.get.return_value = report
+        crud.update.return_value = None
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: report.user
+        client.app.dependency_overrides[deps.db_session] = lambda: None
+
+        response = client.put(
+            f"/reports/{report.id}", json={"markdown": faker.paragraph()}
+        )
+
+        assert response.status_code == 404
+
+
+class TestDelete:
+    def test_should_let_a_moderator_remove_any_report(
+        self,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        report = ReportFactory()
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.get.return_value = report
+        crud.remove.return_value = report
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: UserFactory(moderator=True)
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        response = client.delete(f"/reports/{report.id}")
+
+        assert response.status_code == 200
+        crud.remove.assert_called_once_with(db=db, model=report)
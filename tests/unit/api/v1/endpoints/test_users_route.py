@@ -1,10 +1,23 @@
+import json
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
 from drivr import schema
 from drivr.api import deps
-from tests.unit.factories import UserFactory
+from drivr.api.streaming import ExportFormat
+from drivr.api.v1.endpoints.users import REPORT_FIELDS, export_users
+from drivr.crud.cursor import InvalidCursor
+from drivr.security import Admission
+from tests.unit.factories import ReportFactory, UserFactory
 
 MODULE = "drivr.api.v1.endpoints.users"
 
 
+async def read(response) -> str:
+    return b"".join([chunk async for chunk in response.body_iterator]).decode()
+
+
 class TestGet:
     def test_should_query_for_all_users_using_default_query_params(
         self,
@@ -27,7 +40,9 @@ class TestGet:
         assert response.status_code == 200
         assert response.json() == []
 
-        all.assert_called_once_with(db=db, skip=0, limit=100)
+        all.assert_called_once_with(
+            db=db, skip=0, limit=100, cursor=None, fields=None
+        )
 
     def test_should_query_for_all_users_using_the_query_params_specified(
         self,
@@ -37,7 +52,7 @@ class TestGet:
     ):
         db = mocker.MagicMock()
         skip = faker.pyint()
-        limit = faker.pyint()
+        limit = faker.pyint(min_value=1, max_value=1000)
 
         user = UserFactory()
 
@@ -52,7 +67,265 @@ class TestGet:
         assert response.status_code == 200
         assert response.json() == []
 
-        all.assert_called_once_with(db=db, skip=skip, limit=limit)
+        all.assert_called_once_with(
+            db=db, skip=skip, limit=limit, cursor=None, fields=None
+        )
+
+    def test_should_return_422_when_the_limit_is_over_the_maximum(
+        self,
+        mocker,
+        client,
+    ):
+        all = mocker.patch(f"{MODULE}.crud.users.all", return_value=[])
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: UserFactory()
+        client.app.dependency_overrides[deps.db_session] = lambda: None
+
+        response = client.get("/users/", params={"limit": 1001})
+
+        assert response.status_code == 422
+        all.assert_not_called()
+
+    def test_should_send_the_next_cursor_when_the_page_is_full(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        users = UserFactory.build_batch(2)
+        cursor = faker.sha1()
+        next_cursor = faker.sha1()
+
+        all = mocker.patch(f"{MODULE}.crud.users.all", return_value=users)
+        next_cursor_method = mocker.patch(
+            f"{MODULE}.crud.users.next_cursor",
+            return_value=next_cursor,
+        )
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: users[0]
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        response = client.get("/users/", params={"limit": 2, "cursor": cursor})
+
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert response.headers["X-Next-Cursor"] == next_cursor
+
+        all.assert_called_once_with(
+            db=db, skip=0, limit=2, cursor=cursor, fields=None
+        )
+        next_cursor_method.assert_called_once_with(users, limit=2)
+
+    def test_should_return_400_when_the_cursor_is_invalid(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        user = UserFactory()
+
+        mocker.patch(
+            f"{MODULE}.crud.users.all",
+            side_effect=InvalidCursor(),
+        )
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: user
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        response = client.get("/users/", params={"cursor": faker.word()})
+
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Invalid cursor."}
+        assert "X-Next-Cursor" not in response.headers
+
+
+class TestExport:
+    @pytest.mark.asyncio
+    async def test_should_stream_the_users_as_ndjson(self, mocker):
+        db = mocker.MagicMock()
+        users = UserFactory.build_batch(2)
+
+        async def stream(db, fields):
+            for user in users:
+                yield user
+
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
+        crud.stream.side_effect = stream
+
+        response = await export_users(
+            format=ExportFormat.ndjson,
+            db=db,
+            moderator=UserFactory(moderator=True),
+        )
+
+        assert response.media_type == "application/x-ndjson"
+        assert response.headers["content-disposition"] == (
+            'attachment; filename="users.ndjson"'
+        )
+        assert [
+            json.loads(line) for line in (await read(response)).splitlines()
+        ] == [jsonable_encoder(schema.User.from_orm(user)) for user in users]
+        crud.stream.assert_called_once_with(
+            db=db, fields=list(schema.User.__fields__)
+        )
+
+    @pytest.mark.asyncio
+    async def test_should_stream_the_users_as_csv(self, mocker):
+        user = UserFactory()
+
+        async def stream(db, fields):
+            yield user
+
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
+        crud.stream.side_effect = stream
+
+        response = await export_users(
+            format=ExportFormat.csv,
+            db=mocker.MagicMock(),
+            moderator=UserFactory(moderator=True),
+        )
+
+        assert response.media_type == "text/csv"
+        assert (await read(response)).splitlines() == [
+            "email,moderator,active,created_at,updated_at",
+            f"{user.email},{user.moderator},{user.active},"
+            f"{user.created_at.isoformat()},{user.updated_at.isoformat()}",
+        ]
+
+
+class TestGetWithReports:
+    def test_should_send_the_users_with_their_latest_reports(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        user = UserFactory()
+        next_cursor = faker.sha1()
+
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
+        crud.all_with_reports.return_value = [user]
+        crud.next_cursor.return_value = next_cursor
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: user
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        response = client.get(
+            "/users/with-reports", params={"limit": 1, "reports_limit": 5}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["X-Next-Cursor"] == next_cursor
+        assert [report["id"] for report in response.json()[0]["reports"]] == [
+            report.id for report in user.reports
+        ]
+        crud.all_with_reports.assert_called_once_with(
+            db=db,
+            skip=0,
+            limit=1,
+            cursor=None,
+            reports_limit=5,
+            report_fields=REPORT_FIELDS,
+        )
+
+    def test_should_change_the_etag_when_a_report_is_removed(
+        self,
+        mocker,
+        client,
+    ):
+        user = UserFactory()
+
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
+        crud.all_with_reports.return_value = [user]
+        crud.next_cursor.return_value = None
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: user
+        client.app.dependency_overrides[deps.db_session] = lambda: None
+
+        etag = client.get("/users/with-reports").headers["ETag"]
+        not_modified = client.get(
+            "/users/with-reports", headers={"If-None-Match": etag}
+        )
+        user.reports.pop()
+        modified = client.get(
+            "/users/with-reports", headers={"If-None-Match": etag}
+        )
+
+        assert not_modified.status_code == 304
+        assert modified.status_code == 200
+        assert modified.headers["ETag"] != etag
+
+
+class TestGetReports:
+    def test_should_send_the_latest_reports_of_the_user(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        user = UserFactory()
+        reports = ReportFactory.build_batch(2, user=user)
+        cursor = faker.sha1()
+        next_cursor = faker.sha1()
+
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.latest_by_user.return_value = reports
+        crud.next_cursor.return_value = next_cursor
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: user
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        response = client.get(
+            f"/users/{user.id}/reports",
+            params={"limit": 2, "cursor": cursor},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["X-Next-Cursor"] == next_cursor
+        assert [report["id"] for report in response.json()] == [
+            report.id for report in reports
+        ]
+        crud.latest_by_user.assert_called_once_with(
+            db=db,
+            user_id=user.id,
+            limit=2,
+            cursor=cursor,
+            fields=REPORT_FIELDS,
+        )
+        crud.next_cursor.assert_called_once_with(
+            reports, limit=2, keyset=crud.latest_keyset
+        )
+
+    def test_should_return_400_when_the_cursor_is_invalid(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        crud = mocker.patch(f"{MODULE}.crud.reports", autospec=True)
+        crud.latest_by_user.side_effect = InvalidCursor
+        client.app.dependency_overrides[
+            deps.get_authenticated_active_user
+        ] = lambda: UserFactory()
+        client.app.dependency_overrides[deps.db_session] = lambda: None
+
+        response = client.get(
+            f"/users/{faker.pyint()}/reports",
+            params={"cursor": faker.sha1()},
+        )
+
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Invalid cursor."}
 
 
 class TestPost:
@@ -67,8 +340,8 @@ class TestPost:
         db = mocker.MagicMock()
         user = UserFactory()
 
-        crud = mocker.patch(f"{MODULE}.crud.users")
-        crud.get_by_email.return_value = user
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
+        crud.create.return_value = None
 
         client.app.dependency_overrides[deps.db_session] = lambda: db
 
@@ -85,8 +358,14 @@ class TestPost:
             "detail": f"The email '{user.email} is alredy registered."
         }
 
-        crud.get_by_email.assert_called_once_with(db=db, email=user.email)
-        crud.create.assert_not_called()
+        crud.get_by_email.assert_not_called()
+        crud.create.assert_called_once_with(
+            db=db,
+            schema=schema.UserCreate(
+                email=user.email,
+                password=user.password,
+            ),
+        )
 
     def test_should_return_201_with_created_user_data(
         self,
@@ -100,8 +379,7 @@ class TestPost:
             "password": user.password,
         }
 
-        crud = mocker.patch(f"{MODULE}.crud.users")
-        crud.get_by_email.return_value = None
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
         crud.create.return_value = user
 
         client.app.dependency_overrides[deps.db_session] = lambda: db
@@ -117,12 +395,106 @@ class TestPost:
             "moderator": user.moderator,
         }
 
-        crud.get_by_email.assert_called_once_with(db=db, email=user.email)
+        crud.get_by_email.assert_not_called()
         crud.create.assert_called_once_with(
             db=db,
             schema=schema.UserCreate(**request_payload),
         )
 
+    def test_should_return_503_when_the_signups_are_saturated(
+        self,
+        mocker,
+        client,
+    ):
+        user = UserFactory()
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
+        mocker.patch(
+            f"{MODULE}.security.signup_admission",
+            Admission("signup", limit=0, queue_size=0, timeout=1),
+        )
+
+        client.app.dependency_overrides[deps.db_session] = lambda: None
+
+        response = client.post(
+            "/users/", json={"email": user.email, "password": user.password}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        crud.create.assert_not_called()
+
+
+class TestImport:
+    def test_should_return_415_when_the_body_is_not_ndjson_or_csv(
+        self,
+        mocker,
+        client,
+    ):
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
+        client.app.dependency_overrides[
+            deps.get_authenticated_moderator
+        ] = lambda: UserFactory(moderator=True)
+        client.app.dependency_overrides[deps.db_session] = lambda: None
+
+        response = client.post("/users/import", json=[])
+
+        assert response.status_code == 415
+        crud.import_many.assert_not_called()
+
+    def test_should_import_the_valid_rows_and_reject_the_others(
+        self,
+        faker,
+        mocker,
+        client,
+    ):
+        db = mocker.MagicMock()
+        emails = [faker.unique.email() for _ in range(3)]
+        imported = []
+
+        async def import_many(db, users):
+            imported.extend([user async for user in users])
+            return 1, [4]
+
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
+        crud.import_many.side_effect = import_many
+        client.app.dependency_overrides[
+            deps.get_authenticated_moderator
+        ] = lambda: UserFactory(moderator=True)
+        client.app.dependency_overrides[deps.db_session] = lambda: db
+
+        response = client.post(
+            "/users/import",
+            data=(
+                "email,password\n"
+                f"{emails[0]},secret\n"
+                "not-an-email,secret\n"
+                f"{emails[1]},secret\n"
+                f"{emails[2]}\n"
+            ),
+            headers={"Content-Type": "text/csv; charset=utf-8"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "created": 1,
+            "rejected": [
+                {
+                    "line": 3,
+                    "detail": "email: value is not a valid email address",
+                },
+                {"line": 4, "detail": "The email is already registered."},
+                {
+                    "line": 5,
+                    "detail": "__root__: UserCreate expected dict not "
+                    "NoneType",
+                },
+            ],
+        }
+        assert imported == [
+            (2, schema.UserCreate(email=emails[0], password="secret")),
+            (4, schema.UserCreate(email=emails[1], password="secret")),
+        ]
+
 
 class TestPut:
     def test_should_return_422_when_request_schema_is_invalid(self, client):
@@ -143,7 +515,7 @@ class TestPut:
             "password": user.password,
         }
 
-        crud = mocker.patch(f"{MODULE}.crud.users")
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
         crud.get.return_value = None
 
         client.app.dependency_overrides[deps.db_session] = lambda: db
@@ -176,7 +548,7 @@ class TestPut:
             "password": user.password,
         }
 
-        crud = mocker.patch(f"{MODULE}.crud.users")
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
         crud.get.return_value = user
         crud.update.return_value = user
 
@@ -218,7 +590,7 @@ class TestDelete:
         user = UserFactory()
         moderator = UserFactory(moderator=True)
 
-        crud = mocker.patch(f"{MODULE}.crud.users")
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
         crud.get.return_value = None
 
         client.app.dependency_overrides[deps.db_session] = lambda: db
@@ -246,7 +618,7 @@ class TestDelete:
         user = UserFactory()
         moderator = UserFactory(moderator=True)
 
-        crud = mocker.patch(f"{MODULE}.crud.users")
+        crud = mocker.patch(f"{MODULE}.crud.users", autospec=True)
         crud.get.return_value = user
         crud.remove.return_value = user
 
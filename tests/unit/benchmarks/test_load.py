@@ -0,0 +1,68 @@
+import argparse
+
+import pytest
+
+from tests.benchmarks.load import compare, parse_mix, percentile, summarize
+
+
+def test_should_take_the_nearest_rank_percentile():
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 95) == 0.0
+
+
+def test_should_summarize_the_throughput_and_latency_of_each_route():
+    routes = summarize(
+        latencies={"GET /reports/": [0.003, 0.001, 0.002, 0.004]},
+        errors={"GET /reports/": 1},
+        elapsed=2.0,
+    )
+
+    assert routes == {
+        "GET /reports/": {
+            "requests": 4,
+            "errors": 1,
+            "rps": 2.0,
+            "p50": 2.0,
+            "p95": 4.0,
+            "p99": 4.0,
+        }
+    }
+
+
+class TestCompare:
+    baseline = {
+        "routes": {
+            "GET /reports/": {"rps": 100.0, "p95": 10.0},
+            "POST /login/": {"rps": 10.0, "p95": 100.0},
+        }
+    }
+
+    def test_should_tolerate_the_changes_within_the_threshold(self):
+        report = {
+            "routes": {
+                "GET /reports/": {"rps": 91.0, "p95": 10.9},
+                "POST /login/": {"rps": 12.0, "p95": 80.0},
+            }
+        }
+
+        assert compare(report, self.baseline, threshold=0.1) == []
+
+    def test_should_report_the_regressions_beyond_the_threshold(self):
+        report = {"routes": {"GET /reports/": {"rps": 89.0, "p95": 11.1}}}
+
+        assert compare(report, self.baseline, threshold=0.1) == [
+            "GET /reports/: 89.0 rps, baseline 100.0 rps.",
+            "GET /reports/: p95 of 11.1 ms, baseline 10.0 ms.",
+            "POST /login/: not requested.",
+        ]
+
+
+def test_should_parse_the_workload_mix():
+    assert parse_mix("list=6,create") == {"list": 6, "create": 1}
+
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix("list=1,unknown=2")
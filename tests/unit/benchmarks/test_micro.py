@@ -0,0 +1,58 @@
+import pytest
+
+from tests.benchmarks.micro import (
+    BENCHMARKS,
+    compare,
+    measure,
+    run_until_complete,
+)
+
+
+@pytest.mark.parametrize(
+    "name",
+    [name for name in BENCHMARKS if not name.startswith("security.pass")],
+)
+def test_should_set_up_a_callable_benchmark(name):
+    BENCHMARKS[name](10)()
+
+
+def test_should_run_a_coroutine_which_never_suspends():
+    async def answer():
+        return 42
+
+    assert run_until_complete(answer()) == 42
+
+
+def test_should_measure_the_per_call_time(mocker):
+    mocker.patch("timeit.Timer.autorange", return_value=(10, 0.2))
+    mocker.patch(
+        "timeit.Timer.repeat", return_value=[0.001, 0.002, 0.003, 0.004]
+    )
+
+    stats = measure(lambda: None, rounds=4)
+
+    assert stats == {
+        "number": 10,
+        "rounds": 4,
+        "min": 100.0,
+        "median": 250.0,
+        "mean": 250.0,
+        "stdev": 129.099,
+        "iqr": 250.0,
+        "ops": 4000.0,
+    }
+
+
+def test_should_report_the_benchmarks_slower_than_the_baseline():
+    baseline = {"benchmarks": {"a": {"median": 10.0}, "b": {"median": 10.0}}}
+    report = {
+        "benchmarks": {
+            "a": {"median": 10.9},
+            "b": {"median": 11.1},
+            "c": {"median": 99.0},
+        }
+    }
+
+    assert compare(report, baseline, threshold=0.1) == [
+        "b: 11.1 us, baseline 10.0 us."
+    ]
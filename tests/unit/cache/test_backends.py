@@ -0,0 +1,151 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from drivr.cache.backends import (
+    CacheUnavailable,
+    MemoryBackend,
+    RESPBackend,
+    RESPError,
+    encode_command,
+    read_reply,
+)
+
+
+class RESPStandIn:
+    """A local server answering the few commands of the RESP backend."""
+
+    def __init__(self, password=None):
+        self.password = password
+        self.values = {}
+        self.commands = []
+        self.connections = 0
+
+    async def serve(self, reader, writer):
+        self.connections += 1
+        authenticated = self.password is None
+
+        while (command := await self._read(reader)) is not None:
+            name, *args = command
+            self.commands.append(name.decode().upper())
+
+            if name.upper() == b"AUTH":
+                authenticated = args[0].decode() == self.password
+                reply = b"+OK" if authenticated else b"-WRONGPASS invalid"
+            elif not authenticated:
+                reply = b"-NOAUTH Authentication required."
+            else:
+                reply = self._execute(name.upper(), args)
+
+            writer.write(reply + b"\r\n")
+            await writer.drain()
+
+        writer.close()
+
+    async def _read(self, reader):
+        try:
+            return await read_reply(reader)
+        except EOFError:
+            return None
+
+    def _execute(self, name, args):
+        if name == b"SELECT":
+            return b"+OK"
+        if name == b"SET":
+            self.values[args[0]] = args[1]
+            return b"+OK"
+        if name == b"INCR":
+            value = int(self.values.get(args[0], b"0")) + 1
+            self.values[args[0]] = str(value).encode()
+            return b":%d" % value
+        if name == b"MGET":
+            return b"*%d\r\n" % len(args) + b"\r\n".join(
+                b"$-1"
+                if (value := self.values.get(key)) is None
+                else b"$%d\r\n%s" % (len(value), value)
+                for key in args
+            )
+        return b"-ERR unknown command"
+
+
+@asynccontextmanager
+async def serve(stand_in):
+    server = await asyncio.start_server(stand_in.serve, "127.0.0.1", 0)
+    backend = RESPBackend.from_url(
+        f"redis://:{stand_in.password}@127.0.0.1:"
+        f"{server.sockets[0].getsockname()[1]}/1"
+    )
+
+    try:
+        yield backend
+    finally:
+        await backend.close()
+        server.close()
+        await server.wait_closed()
+
+
+class TestMemoryBackend:
+    @pytest.mark.asyncio
+    async def test_should_store_the_values_and_the_counters(self):
+        backend = MemoryBackend(maxsize=10)
+
+        await backend.set("key", b"value", ttl=60)
+        assert await backend.incr("counter") == 1
+        assert await backend.incr("counter") == 2
+
+        assert await backend.get_many(["key", "counter", "missing"]) == [
+            b"value",
+            b"2",
+            None,
+        ]
+
+
+class TestRESPBackend:
+    def test_should_parse_the_url(self):
+        backend = RESPBackend.from_url("redis://:p%40ss@cache:6380/2")
+
+        assert (backend.host, backend.port, backend.db) == ("cache", 6380, 2)
+        assert backend.password == "p@ss"
+
+    def test_should_encode_the_command_as_bulk_strings(self):
+        assert encode_command(["SET", "key", b"v\r\n", "PX", 10]) == (
+            b"*5\r\n$3\r\nSET\r\n$3\r\nkey\r\n$3\r\nv\r\n\r\n"
+            b"$2\r\nPX\r\n$2\r\n10\r\n"
+        )
+
+    @pytest.mark.asyncio
+    async def test_should_run_the_commands_over_a_pooled_connection(self):
+        stand_in = RESPStandIn(password="secret")
+
+        async with serve(stand_in) as backend:
+            await backend.set("key", b"\x00binary\r\n", ttl=1.5)
+            assert await backend.incr("counter") == 1
+            assert await backend.get_many(["key", "counter", "missing"]) == [
+                b"\x00binary\r\n",
+                b"1",
+                None,
+            ]
+
+        assert stand_in.connections == 1
+        assert stand_in.commands == ["AUTH", "SELECT", "SET", "INCR", "MGET"]
+
+    @pytest.mark.asyncio
+    async def test_should_raise_the_error_replies(self):
+        async with serve(RESPStandIn(password="secret")) as backend:
+            with pytest.raises(RESPError, match="unknown command"):
+                await backend.execute("FLUSHALL")
+
+            assert await backend.incr("counter") == 1
+
+    @pytest.mark.asyncio
+    async def test_should_raise_unavailable_when_it_can_not_connect(self):
+        server = await asyncio.start_server(lambda *_: None, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        server.close()
+        await server.wait_closed()
+
+        backend = RESPBackend(port=port, host="127.0.0.1", timeout=0.5)
+
+        with pytest.raises(CacheUnavailable):
+            await backend.get_many(["key"])
@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+from fastapi import Request, Response
+
+from drivr.cache.backends import CacheUnavailable, MemoryBackend
+from drivr.cache.response_cache import ResponseCache
+
+
+def request(query=b"", headers=()):
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/reports/",
+            "query_string": query,
+            "headers": [
+                (name.encode(), value.encode()) for name, value in headers
+            ],
+        }
+    )
+
+
+def builder(mocker, status_code=200):
+    return mocker.AsyncMock(
+        return_value=Response(
+            content=b"[]",
+            status_code=status_code,
+            media_type="application/json",
+            headers={"ETag": '"v1"', "X-Next-Cursor": "abc"},
+        )
+    )
+
+
+def response_cache():
+    return ResponseCache(backend=MemoryBackend(maxsize=10), ttl=60)
+
+
+class TestFetch:
+    @pytest.mark.asyncio
+    async def test_should_build_once_then_send_the_cached_response(
+        self,
+        mocker,
+    ):
+        cache = response_cache()
+        build = builder(mocker)
+
+        await cache.fetch(request(b"b=2&a=1"), ["report"], "user", build)
+        response = await cache.fetch(
+            request(b"a=1&b=2"), ["report"], "user", build
+        )
+
+        build.assert_awaited_once()
+        assert response.status_code == 200
+        assert response.body == b"[]"
+        assert response.media_type == "application/json"
+        assert response.headers["ETag"] == '"v1"'
+        assert response.headers["X-Next-Cursor"] == "abc"
+        assert cache.stats() == {"hits": 1, "misses": 1, "errors": 0}
+
+    @pytest.mark.asyncio
+    async def test_should_key_the_responses_by_params_and_scope(
+        self,
+        mocker,
+    ):
+        cache = response_cache()
+        build = builder(mocker)
+
+        await cache.fetch(request(b"limit=1"), ["report"], "user", build)
+        await cache.fetch(request(b"limit=2"), ["report"], "user", build)
+        await cache.fetch(request(b"limit=1"), ["report"], "moderator", build)
+
+        assert build.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_should_rebuild_after_the_namespace_is_invalidated(
+        self,
+        mocker,
+    ):
+        cache = response_cache()
+        build = builder(mocker)
+
+        await cache.fetch(request(), ["report", "user"], "user", build)
+        await cache.invalidate("user")
+        await cache.fetch(request(), ["report", "user"], "user", build)
+        await cache.fetch(request(), ["report", "user"], "user", build)
+
+        assert build.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_should_build_once_for_concurrent_misses(self, mocker):
+        cache = response_cache()
+        release = asyncio.Event()
+        response = await builder(mocker)()
+
+        async def build():
+            await release.wait()
+            return response
+
+        build = mocker.AsyncMock(side_effect=build)
+        fetches = [
+            asyncio.create_task(
+                cache.fetch(request(), ["report"], "user", build)
+            )
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert [r.body for r in await asyncio.gather(*fetches)] == [b"[]"] * 3
+        build.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_should_not_cache_the_other_statuses(self, mocker):
+        cache = response_cache()
+        build = builder(mocker, status_code=304)
+
+        await cache.fetch(request(), ["report"], "user", build)
+        await cache.fetch(request(), ["report"], "user", build)
+
+        assert build.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_should_answer_304_when_the_cached_copy_matches(
+        self,
+        mocker,
+    ):
+        cache = response_cache()
+        build = builder(mocker)
+
+        await cache.fetch(request(), ["report"], "user", build)
+        response = await cache.fetch(
+            request(headers=[("if-none-match", '"v1"')]),
+            ["report"],
+            "user",
+            build,
+        )
+
+        assert response.status_code == 304
+        assert response.headers["ETag"] == '"v1"'
+
+    @pytest.mark.asyncio
+    async def test_should_build_the_response_when_the_backend_fails(
+        self,
+        mocker,
+    ):
+        backend = mocker.AsyncMock()
+        backend.get_many.side_effect = CacheUnavailable("down")
+        cache = ResponseCache(backend=backend, ttl=60)
+        build = builder(mocker)
+
+        response = await cache.fetch(request(), ["report"], "user", build)
+
+        assert response is build.return_value
+        assert cache.stats()["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_should_always_build_when_disabled(self, mocker):
+        cache = ResponseCache(backend=None, ttl=60)
+        build = builder(mocker)
+
+        await cache.fetch(request(), ["report"], "user", build)
+        await cache.fetch(request(), ["report"], "user", build)
+
+        assert build.await_count == 2
+
+
+class TestFromUrl:
+    def test_should_create_the_backend_of_the_url(self):
+        assert ResponseCache.from_url(None, ttl=1).backend is None
+        assert isinstance(
+            ResponseCache.from_url("memory://", ttl=1).backend, MemoryBackend
+        )
+
+        with pytest.raises(ValueError):
+            ResponseCache.from_url("memcached://localhost", ttl=1)
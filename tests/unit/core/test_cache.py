@@ -0,0 +1,75 @@
+from drivr.core.cache import TTLCache, cache_metrics
+
+MODULE = "drivr.core.cache"
+
+
+class TestTTLCache:
+    def test_should_count_hits_and_misses(self, faker):
+        key = faker.word()
+        value = faker.pyint()
+
+        cache = TTLCache(maxsize=2, ttl=60)
+        assert cache.get(key) is None
+        cache.set(key, value)
+        assert cache.get(key) == value
+
+        assert cache.stats() == {
+            "hits": 1,
+            "misses": 1,
+            "size": 1,
+            "maxsize": 2,
+        }
+
+    def test_should_evict_the_least_recently_used_entry(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_should_expire_the_entries_after_the_ttl(self, mocker):
+        monotonic = mocker.patch(f"{MODULE}.monotonic", return_value=100)
+
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=30)
+
+        monotonic.return_value = 115
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert len(cache) == 1
+
+    def test_should_pop_and_clear_the_entries(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        assert cache.pop("a") == 1
+        assert cache.pop("a") is None
+        assert cache.get("a") is None
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.stats()["misses"] == 0
+
+
+class TestCacheMetrics:
+    def test_should_read_the_metrics_when_scraped(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("key", "value")
+        cache.get("key")
+        cache.get("other")
+        cache.get("other")
+
+        exposed = "".join(
+            metric.expose() for metric in cache_metrics("user", cache)
+        )
+
+        assert "user_cache_hits_total 1.0\n" in exposed
+        assert "user_cache_misses_total 2.0\n" in exposed
+        assert "user_cache_size 1.0\n" in exposed
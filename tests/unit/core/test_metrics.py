@@ -0,0 +1,98 @@
+import pytest
+
+from drivr.core.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    HistogramFamily,
+    Registry,
+)
+
+
+class TestHistogram:
+    def test_should_count_the_observations_cumulatively(self):
+        histogram = Histogram(buckets=[1, 0.1])
+
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+
+        assert histogram.snapshot() == {
+            "buckets": {"0.1": 2, "1": 3, "+Inf": 4},
+            "sum": 3.65,
+            "count": 4,
+        }
+
+
+class TestCounter:
+    def test_should_expose_the_value_of_each_label_set(self):
+        counter = Counter("requests_total", "The requests.", ["method"])
+
+        counter.inc("GET")
+        counter.inc("GET", amount=2)
+        counter.inc('P"OST')
+
+        assert counter.expose() == (
+            "# HELP requests_total The requests.\n"
+            "# TYPE requests_total counter\n"
+            'requests_total{method="GET"} 3.0\n'
+            'requests_total{method="P\\"OST"} 1.0\n'
+        )
+
+    def test_should_require_a_value_for_each_label(self):
+        with pytest.raises(ValueError):
+            Counter("requests_total", "The requests.", ["method"]).inc()
+
+
+class TestGauge:
+    def test_should_go_up_and_down(self):
+        gauge = Gauge("in_progress", "The requests in progress.")
+
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        assert list(gauge.samples()) == [("in_progress", {}, 1.0)]
+
+        gauge.set(value=7)
+
+        assert list(gauge.samples()) == [("in_progress", {}, 7.0)]
+
+
+class TestHistogramFamily:
+    def test_should_expose_the_buckets_sum_and_count(self):
+        family = HistogramFamily(
+            "latency_seconds", "The latency.", ["route"], buckets=[0.1, 1]
+        )
+
+        family.observe("/", value=0.5)
+        family.observe("/", value=2)
+
+        assert family.expose().splitlines()[2:] == [
+            'latency_seconds_bucket{route="/",le="0.1"} 0.0',
+            'latency_seconds_bucket{route="/",le="1"} 1.0',
+            'latency_seconds_bucket{route="/",le="+Inf"} 2.0',
+            'latency_seconds_sum{route="/"} 2.5',
+            'latency_seconds_count{route="/"} 2.0',
+        ]
+
+
+class TestRegistry:
+    def test_should_expose_the_registered_and_collected_metrics(self):
+        registry = Registry()
+        counter = registry.register(Counter("a_total", "A."))
+        counter.inc()
+
+        @registry.collector
+        def collect():
+            gauge = Gauge("b", "B.")
+            gauge.set(value=2)
+            return [gauge]
+
+        assert registry.expose() == (
+            "# HELP a_total A.\n"
+            "# TYPE a_total counter\n"
+            "a_total 1.0\n"
+            "# HELP b B.\n"
+            "# TYPE b gauge\n"
+            "b 2.0\n"
+        )
@@ -1,28 +1,121 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from drivr import model, schema
+from drivr.core.cache import TTLCache
 from drivr.crud.crud_base import CRUDBase
+from tests.unit.factories import ReportFactory, UserFactory
 
 __TEST_FILE__ = "drivr.crud.crud_base"
 
 
 class TestGet:
-    def test_should_filter_the_entity_by_id_provided(self, faker, mocker):
+    @pytest.mark.asyncio
+    async def test_should_filter_the_entity_by_id_provided(
+        self,
+        faker,
+        mocker,
+    ):
         entity_id = faker.pyint()
 
         entity = mocker.MagicMock()
         model = mocker.MagicMock()
         model.id = faker.pyint()
-        db = mocker.MagicMock()
-        db.query().filter().first.return_value = entity
+        result = mocker.MagicMock()
+        result.scalars().first.return_value = entity
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
+
+        select = mocker.patch(f"{__TEST_FILE__}.select")
 
         crud = CRUDBase(model=model)
-        assert entity == crud.get(db=db, id=entity_id)
+        assert entity == await crud.get(db=db, id=entity_id)
+
+        select.assert_called_once_with(model)
+        select().where.assert_called_once_with(model.id == entity_id)
+        select().where().options.assert_called_once_with()
+        db.execute.assert_awaited_once_with(select().where().options())
+
+
+class TestGetCached:
+    @pytest.mark.asyncio
+    async def test_should_query_and_cache_the_entity_on_a_miss(
+        self,
+        mocker,
+    ):
+        user = UserFactory()
+        db = mocker.AsyncMock()
+        cache = TTLCache(maxsize=1, ttl=60)
+
+        get = mocker.patch.object(CRUDBase, "get", return_value=user)
+
+        crud = CRUDBase(model=model.User, cache=cache)
+        crud.uncached_columns = ("password",)
+        assert user == await crud.get_cached(db=db, id=user.id)
+
+        get.assert_awaited_once_with(db=db, id=user.id)
+        assert cache.get(user.id) == {
+            "id": user.id,
+            "email": user.email,
+            "moderator": user.moderator,
+            "active": user.active,
+            "created_at": user.created_at,
+            "updated_at": user.updated_at,
+        }
+
+    @pytest.mark.asyncio
+    async def test_should_return_a_copy_of_the_cached_entity_on_a_hit(
+        self,
+        mocker,
+    ):
+        user = UserFactory()
+        db = mocker.AsyncMock()
+        cache = TTLCache(maxsize=1, ttl=60)
+        cache.set(user.id, {"id": user.id, "active": user.active})
+
+        get = mocker.patch.object(CRUDBase, "get")
+
+        crud = CRUDBase(model=model.User, cache=cache)
+        cached_user = await crud.get_cached(db=db, id=user.id)
 
-        db.query.assert_called_with(model)
-        db.query().filter.assert_called_with(model.id == entity_id)
-        db.query().filter().first.assert_called_once()
+        assert cached_user is not user
+        assert isinstance(cached_user, model.User)
+        assert (cached_user.id, cached_user.active) == (user.id, user.active)
+        get.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_should_not_cache_missing_entities(self, faker, mocker):
+        entity_id = faker.pyint()
+        db = mocker.AsyncMock()
+        cache = TTLCache(maxsize=1, ttl=60)
+
+        mocker.patch.object(CRUDBase, "get", return_value=None)
+
+        crud = CRUDBase(model=model.User, cache=cache)
+        assert await crud.get_cached(db=db, id=entity_id) is None
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_should_query_the_entity_when_there_is_no_cache(
+        self,
+        faker,
+        mocker,
+    ):
+        entity_id = faker.pyint()
+        entity = mocker.MagicMock()
+        db = mocker.AsyncMock()
+
+        get = mocker.patch.object(CRUDBase, "get", return_value=entity)
+
+        crud = CRUDBase(model=mocker.MagicMock())
+        assert entity == await crud.get_cached(db=db, id=entity_id)
+        get.assert_awaited_once_with(db=db, id=entity_id)
 
 
 class TestAll:
-    def test_should_query_all_entities_using_offset_and_limit(
+    @pytest.mark.asyncio
+    async def test_should_query_all_entities_using_offset_and_limit(
         self,
         faker,
         mocker,
@@ -32,96 +125,474 @@ class TestAll:
 
         entities = [mocker.MagicMock()]
         model = mocker.MagicMock()
-        db = mocker.MagicMock()
-        db.query().offset().limit().all.return_value = entities
+        result = mocker.MagicMock()
+        result.scalars().all.return_value = entities
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
+
+        select = mocker.patch(f"{__TEST_FILE__}.select")
+        query = select().options().order_by()
 
         crud = CRUDBase(model=model)
-        assert entities == crud.all(db=db, skip=offset, limit=limit)
+        assert entities == await crud.all(db=db, skip=offset, limit=limit)
 
-        db.query.assert_called_with(model)
-        db.query().offset.assert_called_with(offset)
-        db.query().offset().limit.assert_called_with(limit)
-        db.query().offset().limit().all.assert_called_once()
+        select.assert_called_with(model)
+        select().options.assert_called_with()
+        select().options().order_by.assert_called_with(model.id)
+        query.offset.assert_called_once_with(offset)
+        query.offset().limit.assert_called_once_with(limit)
+        query.where.assert_not_called()
+        db.execute.assert_awaited_once_with(query.offset().limit())
 
+    @pytest.mark.asyncio
+    async def test_should_query_the_entities_after_the_cursor(
+        self,
+        faker,
+        mocker,
+    ):
+        cursor = faker.sha1()
+        limit = faker.pyint(min_value=100, max_value=200)
+        keyset = [faker.pyint()]
 
-class TestCreate:
-    def test_create_should_add_then_commit_and_refresh_the_entity(
+        entities = [mocker.MagicMock()]
+        model = mocker.MagicMock()
+        result = mocker.MagicMock()
+        result.scalars().all.return_value = entities
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
+
+        select = mocker.patch(f"{__TEST_FILE__}.select")
+        condition = mocker.MagicMock()
+        tuple_ = mocker.patch(f"{__TEST_FILE__}.tuple_")
+        tuple_().__gt__.return_value = condition
+        decode_cursor = mocker.patch(
+            f"{__TEST_FILE__}.decode_cursor",
+            return_value=keyset,
+        )
+        query = select().options().order_by()
+
+        crud = CRUDBase(model=model)
+        assert entities == await crud.all(db=db, limit=limit, cursor=cursor)
+
+        decode_cursor.assert_called_once_with(cursor, [model.id])
+        tuple_.assert_any_call(model.id)
+        tuple_.assert_any_call(*keyset)
+        query.offset.assert_not_called()
+        query.where.assert_called_once_with(condition)
+        query.where().limit.assert_called_once_with(limit)
+        db.execute.assert_awaited_once_with(query.where().limit())
+
+
+class TestProjection:
+    def test_should_load_only_the_fields_and_the_required_columns(self):
+        crud = CRUDBase(model=model.Report)
+        query = str(
+            select(model.Report).options(
+                *crud.projection(["created_at", "user"], ("id",))
+            )
+        )
+
+        assert "report.created_at" in query
+        assert "report.id" in query
+        assert "report.markdown" not in query
+        assert "report.html" not in query
+
+    def test_should_load_every_column_when_there_are_no_fields(self):
+        assert CRUDBase(model=model.Report).projection(None) == []
+
+
+class TestStream:
+    @pytest.mark.asyncio
+    async def test_should_iterate_over_a_server_side_cursor(self, mocker):
+        entities = ReportFactory.build_batch(3)
+
+        async def scalars():
+            for entity in entities:
+                yield entity
+
+        result = mocker.MagicMock()
+        result.scalars.return_value = scalars()
+        db = mocker.AsyncMock()
+        db.stream.return_value = result
+
+        crud = CRUDBase(model=model.Report)
+        assert entities == [
+            entity async for entity in crud.stream(db=db, batch_size=2)
+        ]
+
+        statement = db.stream.await_args.args[0]
+        assert statement.get_execution_options()["yield_per"] == 2
+        assert " ".join(
+            str(statement.compile(dialect=postgresql.dialect())).split()
+        ).endswith("FROM report ORDER BY report.id")
+
+
+class TestNextCursor:
+    def test_should_encode_the_last_entity_when_the_page_is_full(
         self,
+        faker,
         mocker,
     ):
+        cursor = faker.sha1()
         model = mocker.MagicMock()
-        entity = mocker.MagicMock()
-        schema = mocker.MagicMock()
-        db = mocker.MagicMock()
-        jsonable_encoder_return = mocker.MagicMock()
+        entities = [mocker.MagicMock(), mocker.MagicMock()]
 
-        jsonable_encoder = mocker.patch(
-            f"{__TEST_FILE__}.jsonable_encoder",
-            return_value=jsonable_encoder_return,
+        encode_cursor = mocker.patch(
+            f"{__TEST_FILE__}.encode_cursor",
+            return_value=cursor,
         )
 
-        model.return_value = entity
+        crud = CRUDBase(model=model)
+        assert cursor == crud.next_cursor(entities, limit=2)
+
+        encode_cursor.assert_called_once_with(entities[-1], [model.id])
+
+    def test_should_encode_the_keyset_provided(self, faker, mocker):
+        keyset = [mocker.MagicMock(), mocker.MagicMock()]
+        entities = [mocker.MagicMock()]
+
+        encode_cursor = mocker.patch(f"{__TEST_FILE__}.encode_cursor")
+
+        crud = CRUDBase(model=mocker.MagicMock())
+        crud.next_cursor(entities, limit=1, keyset=keyset)
+
+        encode_cursor.assert_called_once_with(entities[-1], keyset)
+
+    def test_should_return_none_for_the_last_page(self, mocker):
+        model = mocker.MagicMock()
+        entities = [mocker.MagicMock()]
+
+        encode_cursor = mocker.patch(f"{__TEST_FILE__}.encode_cursor")
 
         crud = CRUDBase(model=model)
-        assert entity == crud.create(db=db, schema=schema)
+        assert crud.next_cursor(entities, limit=2) is None
+        assert crud.next_cursor([], limit=0) is None
+
+        encode_cursor.assert_not_called()
+
 
-        jsonable_encoder.assert_called_once_with(schema)
-        model.assert_called_once_with(**jsonable_encoder_return)
-        db.add.assert_called_once_with(entity)
-        db.commit.assert_called_once()
-        db.refresh.assert_called_once_with(entity)
+def compile(db) -> str:
+    statement = db.execute.await_args.args[0]
+    assert statement.get_execution_options()["populate_existing"]
+    return " ".join(
+        str(statement.compile(dialect=postgresql.dialect())).split()
+    )
+
+
+class TestCreate:
+    @pytest.mark.asyncio
+    async def test_should_insert_returning_the_entity_then_commit(
+        self,
+        faker,
+        mocker,
+    ):
+        entity = ReportFactory()
+        result = mocker.MagicMock()
+        result.scalars().first.return_value = entity
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
+
+        crud = CRUDBase(model=model.Report)
+        assert entity == await crud.create(
+            db=db,
+            schema={"markdown": faker.paragraph(), "html": faker.paragraph()},
+        )
+
+        assert compile(db) == (
+            "INSERT INTO report (markdown, html) "
+            "VALUES (%(markdown)s, %(html)s) "
+            "RETURNING report.id, report.markdown, report.html, "
+            "report.created_at, report.updated_at, report.user_id"
+        )
+        db.commit.assert_awaited_once()
+        db.refresh.assert_not_awaited()
+
+
+class TestChanged:
+    @pytest.mark.asyncio
+    async def test_should_invalidate_the_responses_of_the_table(
+        self,
+        mocker,
+    ):
+        response_cache = mocker.patch(f"{__TEST_FILE__}.cache.response_cache")
+        response_cache.enabled = True
+        response_cache.invalidate = mocker.AsyncMock()
+
+        await CRUDBase(model=model.Report).changed()
+
+        response_cache.invalidate.assert_awaited_once_with("report")
+
+    @pytest.mark.asyncio
+    async def test_should_invalidate_the_namespaces_provided(self, mocker):
+        response_cache = mocker.patch(f"{__TEST_FILE__}.cache.response_cache")
+        response_cache.enabled = True
+        response_cache.invalidate = mocker.AsyncMock()
+
+        crud = CRUDBase(model=model.User)
+        crud.namespaces = ("user", "report")
+        await crud.changed()
+
+        response_cache.invalidate.assert_awaited_once_with("user", "report")
+
+    @pytest.mark.asyncio
+    async def test_should_be_called_after_the_commit(self, mocker):
+        db = mocker.AsyncMock()
+        changed = mocker.patch.object(CRUDBase, "changed")
+
+        await CRUDBase(model=mocker.MagicMock()).remove(
+            db=db, model=mocker.MagicMock()
+        )
+
+        db.commit.assert_awaited_once()
+        changed.assert_awaited_once_with()
 
 
 class TestRemove:
-    def test_should_delete_the_entity_then_commit_and_return(
+    @pytest.mark.asyncio
+    async def test_should_delete_the_entity_then_commit_and_return(
         self,
         mocker,
     ):
         model = mocker.MagicMock()
         entity = mocker.MagicMock()
-        db = mocker.MagicMock()
+        db = mocker.AsyncMock()
 
         crud = CRUDBase(model=model)
-        assert entity == crud.remove(db=db, model=entity)
+        assert entity == await crud.remove(db=db, model=entity)
+
+        db.delete.assert_awaited_with(entity)
+        db.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_should_invalidate_the_cached_entity(self, mocker):
+        entity = mocker.MagicMock()
+        cache = mocker.MagicMock()
+        db = mocker.AsyncMock()
 
-        db.delete.assert_called_with(entity)
-        db.commit.assert_called_once()
+        crud = CRUDBase(model=mocker.MagicMock(), cache=cache)
+        await crud.remove(db=db, model=entity)
+
+        cache.pop.assert_called_once_with(entity.id)
 
 
 class TestUpdate:
-    def test_should_exclude_unset_when_schema_is_not_instanceof_dict(
+    @pytest.mark.asyncio
+    async def test_should_update_returning_the_entity_then_commit(
         self,
+        faker,
         mocker,
     ):
-        db = mocker.MagicMock()
-        model = mocker.MagicMock()
-        schema = mocker.MagicMock()
+        entity = ReportFactory()
+        updated_entity = ReportFactory(id=entity.id)
+        result = mocker.MagicMock()
+        result.scalars().first.return_value = updated_entity
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
 
         jsonable_encoder = mocker.patch(f"{__TEST_FILE__}.jsonable_encoder")
 
-        crud = CRUDBase(model=model)
-        assert model == crud.update(db=db, model=model, schema=schema)
-        jsonable_encoder.assert_called_once_with(model)
-        schema.dict.assert_called_once_with(exclude_unset=True)
-        db.commit.assert_called_once()
-        db.refresh.assert_called_once_with(model)
+        crud = CRUDBase(model=model.Report)
+        assert updated_entity == await crud.update(
+            db=db,
+            model=entity,
+            schema=schema.ReportUpdate(markdown=faker.paragraph()),
+        )
 
-    def test_should_use_dict_to_update_the_entity(
+        assert compile(db) == (
+            "UPDATE report SET markdown=%(markdown)s, updated_at=now() "
+            "WHERE report.id = %(id_1)s "
+            "RETURNING report.id, report.markdown, report.html, "
+            "report.created_at, report.updated_at, report.user_id"
+        )
+        jsonable_encoder.assert_not_called()
+        db.commit.assert_awaited_once()
+        db.refresh.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_should_ignore_the_fields_that_are_not_columns(
         self,
         faker,
         mocker,
     ):
-        db = mocker.MagicMock()
-        model = mocker.MagicMock()
-        schema = {"key": faker.word()}
+        entity = ReportFactory()
+        db = mocker.AsyncMock()
 
-        jsonable_encoder = mocker.patch(
-            f"{__TEST_FILE__}.jsonable_encoder",
-            return_value=schema,
+        crud = CRUDBase(model=model.Report)
+        assert entity == await crud.update(
+            db=db,
+            model=entity,
+            schema={"user": faker.pyint(), "unknown": faker.word()},
         )
 
-        crud = CRUDBase(model=model)
-        assert model == crud.update(db=db, model=model, schema=schema)
-        jsonable_encoder.assert_called_once_with(model)
-        db.commit.assert_called_once()
-        db.refresh.assert_called_once_with(model)
+        db.execute.assert_not_awaited()
+        db.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_should_invalidate_the_cached_entity(self, mocker):
+        entity = ReportFactory()
+        db = mocker.AsyncMock()
+        db.execute.return_value = mocker.MagicMock()
+        db.execute.return_value.scalars().first.return_value = entity
+        cache = mocker.MagicMock()
+
+        crud = CRUDBase(model=model.Report, cache=cache)
+        await crud.update(db=db, model=entity, schema={"html": "<p></p>"})
+
+        cache.pop.assert_called_once_with(entity.id)
+
+    @pytest.mark.asyncio
+    async def test_should_return_none_when_no_row_was_updated(self, mocker):
+        entity = ReportFactory()
+        db = mocker.AsyncMock()
+        db.execute.return_value = mocker.MagicMock()
+        db.execute.return_value.scalars().first.return_value = None
+        cache = mocker.MagicMock()
+        changed = mocker.patch.object(CRUDBase, "changed")
+
+        crud = CRUDBase(model=model.Report, cache=cache)
+        assert (
+            await crud.update(db=db, model=entity, schema={"html": "<p></p>"})
+            is None
+        )
+
+        db.commit.assert_awaited_once()
+        cache.pop.assert_not_called()
+        changed.assert_not_awaited()
+
+
+class TestBatches:
+    def test_should_split_the_items_by_the_batch_size(self, mocker):
+        crud = CRUDBase(model=mocker.MagicMock())
+
+        assert list(crud.batches([1, 2, 3, 4, 5], batch_size=2)) == [
+            [1, 2],
+            [3, 4],
+            [5],
+        ]
+
+    def test_should_default_to_the_bulk_batch_size_setting(self, mocker):
+        mocker.patch(f"{__TEST_FILE__}.core.settings.DB_BULK_BATCH_SIZE", 3)
+        crud = CRUDBase(model=mocker.MagicMock())
+
+        assert list(crud.batches([1, 2, 3, 4])) == [[1, 2, 3], [4]]
+
+
+class TestCreateMany:
+    @pytest.mark.asyncio
+    async def test_should_insert_each_batch_in_a_single_transaction(
+        self,
+        faker,
+        mocker,
+    ):
+        entities = ReportFactory.build_batch(4)
+        result = mocker.MagicMock()
+        result.scalars().all.side_effect = [entities[:2], entities[2:]]
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
+
+        crud = CRUDBase(model=model.Report)
+        assert entities == await crud.create_many(
+            db=db,
+            schemas=[
+                {"markdown": faker.paragraph(), "html": faker.paragraph()}
+                for _ in entities
+            ],
+            batch_size=2,
+        )
+
+        assert db.execute.await_count == 2
+        assert compile(db) == (
+            "INSERT INTO report (markdown, html) "
+            "VALUES (%(markdown_m0)s, %(html_m0)s), "
+            "(%(markdown_m1)s, %(html_m1)s) "
+            "RETURNING report.id, report.markdown, report.html, "
+            "report.created_at, report.updated_at, report.user_id"
+        )
+        db.commit.assert_awaited_once()
+
+
+class TestRemoveMany:
+    @pytest.mark.asyncio
+    async def test_should_delete_each_batch_in_a_single_transaction(
+        self,
+        faker,
+        mocker,
+    ):
+        entities = ReportFactory.build_batch(3)
+        result = mocker.MagicMock()
+        result.scalars().all.side_effect = [entities[:2], entities[2:]]
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
+        cache = mocker.MagicMock()
+
+        crud = CRUDBase(model=model.Report, cache=cache)
+        assert entities == await crud.remove_many(
+            db=db,
+            ids=[entity.id for entity in entities],
+            batch_size=2,
+        )
+
+        assert db.execute.await_count == 2
+        assert compile(db) == (
+            "DELETE FROM report "
+            "WHERE report.id IN (__[POSTCOMPILE_id_1]) "
+            "RETURNING report.id, report.markdown, report.html, "
+            "report.created_at, report.updated_at, report.user_id"
+        )
+        db.commit.assert_awaited_once()
+        cache.pop.assert_has_calls(
+            [mocker.call(entity.id) for entity in entities]
+        )
+
+
+class TestUpdateMany:
+    @pytest.mark.asyncio
+    async def test_should_update_each_batch_in_a_single_transaction(
+        self,
+        faker,
+        mocker,
+    ):
+        entities = ReportFactory.build_batch(3)
+        result = mocker.MagicMock()
+        result.scalars().all.side_effect = [entities[:2], entities[2:]]
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
+        cache = mocker.MagicMock()
+
+        crud = CRUDBase(model=model.Report, cache=cache)
+        assert entities == await crud.update_many(
+            db=db,
+            ids=[entity.id for entity in entities],
+            schema={"html": faker.paragraph()},
+            batch_size=2,
+        )
+
+        assert db.execute.await_count == 2
+        assert compile(db) == (
+            "UPDATE report SET html=%(html)s, updated_at=now() "
+            "WHERE report.id IN (__[POSTCOMPILE_id_1]) "
+            "RETURNING report.id, report.markdown, report.html, "
+            "report.created_at, report.updated_at, report.user_id"
+        )
+        db.commit.assert_awaited_once()
+        cache.pop.assert_has_calls(
+            [mocker.call(entity.id) for entity in entities]
+        )
+
+    @pytest.mark.asyncio
+    async def test_should_skip_the_update_when_there_are_no_columns(
+        self,
+        faker,
+        mocker,
+    ):
+        db = mocker.AsyncMock()
+
+        crud = CRUDBase(model=model.Report)
+        assert [] == await crud.update_many(
+            db=db,
+            ids=[faker.pyint()],
+            schema={"unknown": faker.word()},
+        )
+
+        db.execute.assert_not_awaited()
+        db.commit.assert_not_awaited()
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pytest
+
+from drivr import model
+from drivr.crud.cursor import InvalidCursor, decode_cursor, encode_cursor
+from tests.unit.factories import ReportFactory
+
+KEYSET = [model.Report.created_at, model.Report.id]
+
+
+class TestEncodeCursor:
+    def test_should_be_decoded_back_to_the_keyset_values(self):
+        report = ReportFactory(created_at=datetime(2021, 5, 1, 12, 30, 0, 5))
+
+        cursor = encode_cursor(report, KEYSET)
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor, KEYSET) == [report.created_at, report.id]
+
+
+class TestDecodeCursor:
+    @pytest.mark.parametrize(
+        "cursor",
+        [
+            "not base64!",
+            "bm90IGpzb24",  # not json
+            "WzFd",  # [1]: wrong number of values
+            "WyJub3QgYSBkYXRlIiwxXQ",  # ["not a date",1]
+            "WyIyMDIxLTA1LTAxVDEyOjMwOjAwIiwiMSJd",  # [date,"1"]
+        ],
+    )
+    def test_should_raise_invalid_cursor_when_it_is_malformed(self, cursor):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor, KEYSET)
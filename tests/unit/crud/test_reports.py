@@ -0,0 +1,211 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from drivr import model, schema
+from drivr.crud.crud_reports import CRUDReports
+from drivr.crud.cursor import InvalidCursor, encode_cursor
+from tests.unit.factories import ReportFactory
+
+MODULE = "drivr.crud.crud_reports"
+
+
+def compile(db) -> str:
+    statement = db.execute.await_args.args[0]
+    return " ".join(
+        str(statement.compile(dialect=postgresql.dialect())).split()
+    )
+
+
+class TestLatestByUser:
+    @pytest.mark.asyncio
+    async def test_should_query_the_reports_of_the_user_newest_first(
+        self,
+        faker,
+        mocker,
+    ):
+        reports = ReportFactory.build_batch(2)
+        result = mocker.MagicMock()
+        result.scalars().all.return_value = reports
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
+
+        crud = CRUDReports(model=model.Report)
+        assert reports == await crud.latest_by_user(
+            db=db, user_id=faker.pyint(), limit=2
+        )
+
+        assert compile(db).endswith(
+            "FROM report WHERE report.user_id = %(user_id_1)s "
+            "ORDER BY report.created_at DESC, report.id DESC "
+            "LIMIT %(param_1)s"
+        )
+
+    @pytest.mark.asyncio
+    async def test_should_query_the_reports_older_than_the_cursor(
+        self,
+        faker,
+        mocker,
+    ):
+        db = mocker.AsyncMock()
+        db.execute.return_value = mocker.MagicMock()
+        crud = CRUDReports(model=model.Report)
+        report = ReportFactory(created_at=datetime(2021, 2, 2, 1, 43))
+        cursor = encode_cursor(report, crud.latest_keyset)
+
+        await crud.latest_by_user(
+            db=db, user_id=faker.pyint(), limit=2, cursor=cursor
+        )
+
+        statement = db.execute.await_args.args[0]
+        compiled = statement.compile(dialect=postgresql.dialect())
+        assert (
+            "AND (report.created_at, report.id) < "
+            "(%(param_1)s, %(param_2)s)"
+        ) in " ".join(str(compiled).split())
+        assert compiled.params["param_1"] == report.created_at
+        assert compiled.params["param_2"] == report.id
+
+    @pytest.mark.asyncio
+    async def test_should_raise_invalid_cursor_when_empty(
+        self,
+        faker,
+        mocker,
+    ):
+        db = mocker.AsyncMock()
+        crud = CRUDReports(model=model.Report)
+
+        with pytest.raises(InvalidCursor):
+            await crud.latest_by_user(
+                db=db, user_id=faker.pyint(), limit=2, cursor=""
+            )
+
+        db.execute.assert_not_awaited()
+
+
+class TestLatestByUsers:
+    @pytest.mark.asyncio
+    async def test_should_read_the_latest_reports_of_each_user_laterally(
+        self,
+        mocker,
+    ):
+        first, second, third = ReportFactory.build_batch(3)
+        third.user_id = first.user_id + 1
+        result = mocker.MagicMock()
+        result.scalars.return_value = [first, second, third]
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
+
+        crud = CRUDReports(model=model.Report)
+        assert await crud.latest_by_users(
+            db=db, user_ids=[first.user_id, third.user_id], limit=3
+        ) == {first.user_id: [first, second], third.user_id: [third]}
+
+        db.execute.assert_awaited_once()
+        statement = compile(db)
+        assert (
+            'FROM "user" JOIN LATERAL (SELECT report_1.id AS id '
+            "FROM report AS report_1 "
+            'WHERE report_1.user_id = "user".id '
+            "ORDER BY report_1.created_at DESC, report_1.id DESC "
+            "LIMIT %(param_1)s) AS anon_1 ON true "
+            "JOIN report ON report.id = anon_1.id"
+        ) in statement
+
+    @pytest.mark.asyncio
+    async def test_should_not_query_without_users(self, mocker):
+        db = mocker.AsyncMock()
+
+        crud = CRUDReports(model=model.Report)
+        assert await crud.latest_by_users(db=db, user_ids=[]) == {}
+
+        db.execute.assert_not_awaited()
+
+
+class TestAllWithUser:
+    @pytest.mark.asyncio
+    async def test_should_join_the_user_of_each_report(self, mocker):
+        reports = ReportFactory.build_batch(2)
+        result = mocker.MagicMock()
+        result.scalars().all.return_value = reports
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
+
+        crud = CRUDReports(model=model.Report)
+        assert reports == await crud.all_with_user(db=db, limit=2)
+
+        assert 'LEFT OUTER JOIN "user" AS user_1 ON user_1.id = ' in (
+            compile(db)
+        )
+
+
+class TestCreate:
+    @pytest.mark.asyncio
+    async def test_should_insert_the_html_rendered_from_the_markdown(
+        self,
+        faker,
+        mocker,
+    ):
+        markdown = faker.paragraph()
+        html = f"<p>{markdown}</p>"
+        report = ReportFactory()
+        db = mocker.AsyncMock()
+
+        render = mocker.patch(
+            f"{MODULE}.render.render_markdown_async", return_value=html
+        )
+        create = mocker.patch(f"{MODULE}.CRUDBase.create", return_value=report)
+
+        assert report == await CRUDReports(model=model.Report).create(
+            db=db, schema=schema.ReportCreate(markdown=markdown)
+        )
+
+        render.assert_awaited_once_with(markdown)
+        create.assert_awaited_once_with(
+            db=db, schema={"markdown": markdown, "html": html}
+        )
+
+
+class TestUpdate:
+    @pytest.mark.asyncio
+    async def test_should_render_the_html_of_a_new_markdown(
+        self,
+        faker,
+        mocker,
+    ):
+        markdown = faker.paragraph()
+        html = f"<p>{markdown}</p>"
+        report = ReportFactory()
+        db = mocker.AsyncMock()
+
+        mocker.patch(
+            f"{MODULE}.render.render_markdown_async", return_value=html
+        )
+        update = mocker.patch(f"{MODULE}.CRUDBase.update", return_value=report)
+
+        await CRUDReports(model=model.Report).update(
+            db=db, model=report, schema=schema.ReportUpdate(markdown=markdown)
+        )
+
+        update.assert_awaited_once_with(
+            db=db, model=report, schema={"markdown": markdown, "html": html}
+        )
+
+    @pytest.mark.asyncio
+    async def test_should_not_render_when_the_markdown_is_unset(
+        self,
+        mocker,
+    ):
+        report = ReportFactory()
+        db = mocker.AsyncMock()
+
+        render = mocker.patch(f"{MODULE}.render.render_markdown_async")
+        update = mocker.patch(f"{MODULE}.CRUDBase.update", return_value=report)
+
+        await CRUDReports(model=model.Report).update(
+            db=db, model=report, schema=schema.ReportUpdate()
+        )
+
+        render.assert_not_awaited()
+        update.assert_awaited_once_with(db=db, model=report, schema={})
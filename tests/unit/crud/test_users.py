@@ -1,38 +1,47 @@
-from pydantic.types import SecretStr
+import pytest
+from sqlalchemy.dialects import postgresql
 
 from drivr import model, schema
-from drivr.crud.crud_users import CRUDUsers
-from tests.unit.factories import UserFactory
+from drivr.crud.crud_users import CRUDUsers, user_import
+from tests.unit.factories import ReportFactory, UserFactory
 
 MODULE = "drivr.crud.crud_users"
 
 
 class TestByEmail:
-    def test_should_query_filtering_by_email_provided(
+    @pytest.mark.asyncio
+    async def test_should_query_filtering_by_email_provided(
         self,
         faker,
         mocker,
     ):
         email = faker.email()
-        db = mocker.MagicMock()
+        user = UserFactory()
+        result = mocker.MagicMock()
+        result.scalars().first.return_value = user
+        db = mocker.AsyncMock()
+        db.execute.return_value = result
+
+        select = mocker.patch(f"{MODULE}.select")
 
         crud_users = CRUDUsers(model=model.User)
-        crud_users.get_by_email(db=db, email=email)
+        assert user == await crud_users.get_by_email(db=db, email=email)
 
-        db.query.assert_called_once_with(model.User)
-        db.query().filter_by.assert_called_once_with(email=email)
-        db.query().filter_by().first.assert_called_once()
+        select.assert_called_once_with(model.User)
+        select().filter_by.assert_called_once_with(email=email)
+        db.execute.assert_awaited_once_with(select().filter_by().options())
 
 
 class TestAuthenticate:
-    def test_should_return_none_when_user_does_not_exist(
+    @pytest.mark.asyncio
+    async def test_should_return_none_when_user_does_not_exist(
         self,
         faker,
         mocker,
     ):
         email = faker.email()
         password = faker.sha1()
-        db = mocker.MagicMock()
+        db = mocker.AsyncMock()
 
         get_by_email = mocker.patch.object(
             CRUDUsers,
@@ -40,7 +49,7 @@ class TestAuthenticate:
             return_value=None,
         )
 
-        actual_user = CRUDUsers(model=model.User).authenticate(
+        actual_user = await CRUDUsers(model=model.User).authenticate(
             db=db,
             email=email,
             password=password,
@@ -49,7 +58,8 @@ class TestAuthenticate:
         assert actual_user is None
         get_by_email.assert_called_once_with(db=db, email=email)
 
-    def test_should_return_none_when_password_hash_does_not_match(
+    @pytest.mark.asyncio
+    async def test_should_return_none_when_password_hash_does_not_match(
         self,
         faker,
         mocker,
@@ -58,11 +68,11 @@ class TestAuthenticate:
 
         email = faker.email()
         password = faker.sha1()
-        db = mocker.MagicMock()
+        db = mocker.AsyncMock()
 
         verify_password = mocker.patch(
-            f"{MODULE}.security.password.verify_password",
-            return_value=False,
+            f"{MODULE}.security.password.verify_and_update_async",
+            return_value=(False, None),
         )
 
         get_by_email = mocker.patch.object(
@@ -71,7 +81,7 @@ class TestAuthenticate:
             return_value=user,
         )
 
-        actual_user = CRUDUsers(model=model.User).authenticate(
+        actual_user = await CRUDUsers(model=model.User).authenticate(
             db=db,
             email=email,
             password=password,
@@ -79,12 +89,13 @@ class TestAuthenticate:
         assert actual_user is None
 
         get_by_email.assert_called_once_with(db=db, email=email)
-        verify_password.assert_called_once_with(
+        verify_password.assert_awaited_once_with(
             plain_text=password,
             hashed_password=user.password,
         )
 
-    def test_should_return_the_user_object_when_it_exist_and_password_match(
+    @pytest.mark.asyncio
+    async def test_should_return_the_user_when_it_exist_and_password_match(
         self,
         faker,
         mocker,
@@ -93,7 +104,7 @@ class TestAuthenticate:
 
         email = faker.email()
         password = faker.sha1()
-        db = mocker.MagicMock()
+        db = mocker.AsyncMock()
 
         get_by_email = mocker.patch.object(
             CRUDUsers,
@@ -101,11 +112,12 @@ class TestAuthenticate:
             return_value=user,
         )
         verify_password = mocker.patch(
-            f"{MODULE}.security.password.verify_password",
-            return_value=True,
+            f"{MODULE}.security.password.verify_and_update_async",
+            return_value=(True, None),
         )
+        rehash = mocker.patch.object(CRUDUsers, "rehash")
 
-        actual_user = CRUDUsers(model=model.User).authenticate(
+        actual_user = await CRUDUsers(model=model.User).authenticate(
             db=db,
             email=email,
             password=password,
@@ -114,50 +126,152 @@ class TestAuthenticate:
         assert actual_user == user
 
         get_by_email.assert_called_once_with(db=db, email=email)
-        verify_password.assert_called_once_with(
+        verify_password.assert_awaited_once_with(
             plain_text=password,
             hashed_password=user.password,
         )
+        rehash.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_should_rehash_the_outdated_password_once_verified(
+        self,
+        faker,
+        mocker,
+    ):
+        user = UserFactory()
+        rehashed = faker.sha256()
+        db = mocker.AsyncMock()
+
+        mocker.patch.object(CRUDUsers, "get_by_email", return_value=user)
+        mocker.patch(
+            f"{MODULE}.security.password.verify_and_update_async",
+            return_value=(True, rehashed),
+        )
+        rehash = mocker.patch.object(CRUDUsers, "rehash")
+
+        actual_user = await CRUDUsers(model=model.User).authenticate(
+            db=db,
+            email=user.email,
+            password=faker.password(),
+        )
+
+        assert actual_user == user
+        rehash.assert_awaited_once_with(db=db, user=user, password=rehashed)
+
+
+class TestRehash:
+    @pytest.mark.asyncio
+    async def test_should_replace_the_hash_keeping_the_updated_at(
+        self,
+        faker,
+        mocker,
+    ):
+        user = UserFactory(id=7, password="old-hash")
+        db = mocker.AsyncMock()
+
+        await CRUDUsers(model=model.User).rehash(
+            db=db, user=user, password="new-hash"
+        )
+
+        (statement,), _ = db.execute.await_args
+        compiled = statement.compile(dialect=postgresql.dialect())
+
+        assert str(compiled) == (
+            'UPDATE "user" SET password=%(password)s, '
+            'updated_at="user".updated_at '
+            'WHERE "user".id = %(id_1)s AND "user".password = %(password_1)s'
+        )
+        assert compiled.params == {
+            "password": "new-hash",
+            "id_1": 7,
+            "password_1": "old-hash",
+        }
+        db.commit.assert_awaited_once()
+        assert user.password == "new-hash"
 
 
 class TestCreate:
-    def test_should_commit_and_refresh_the_create_entity(self, faker, mocker):
+    @pytest.mark.asyncio
+    async def test_should_insert_the_user_with_the_hashed_password(
+        self,
+        faker,
+        mocker,
+    ):
+        plain_password = faker.word()
         hashed_password = faker.sha1()
 
-        db = mocker.MagicMock()
-        created_user = UserFactory(password=SecretStr(hashed_password))
+        db = mocker.AsyncMock()
+        created_user = UserFactory(password=hashed_password)
 
-        mocker.patch(f"{MODULE}.model.User", return_value=created_user)
         hash_password = mocker.patch(
-            f"{MODULE}.security.password.hash_password",
+            f"{MODULE}.security.password.hash_password_async",
             return_value=hashed_password,
         )
+        execute_returning = mocker.patch.object(
+            CRUDUsers,
+            "execute_returning",
+            return_value=created_user,
+        )
 
         user_schema = schema.UserCreate(
-            email=faker.email(), password=faker.word()
+            email=faker.email(),
+            password=plain_password,
         )
 
-        actual_user = CRUDUsers(model=model.User).create(
+        actual_user = await CRUDUsers(model=model.User).create(
             db=db, schema=user_schema
         )
 
         assert actual_user == created_user
-        hash_password.assert_called_once_with(created_user.password)
-        db.add.assert_called_once_with(created_user)
-        db.commit.assert_called_once()
-        db.refresh.assert_called_once_with(created_user)
+        hash_password.assert_awaited_once_with(plain_password)
+        db.commit.assert_awaited_once()
+
+        statement = execute_returning.await_args.kwargs["statement"]
+        compiled = statement.compile(dialect=postgresql.dialect())
+        assert "ON CONFLICT (email) DO NOTHING" in str(compiled)
+        assert compiled.params["email"] == user_schema.email
+        assert compiled.params["password"] == hashed_password
+
+    @pytest.mark.asyncio
+    async def test_should_return_none_when_the_email_is_registered(
+        self,
+        faker,
+        mocker,
+    ):
+        db = mocker.AsyncMock()
+
+        mocker.patch(
+            f"{MODULE}.security.password.hash_password_async",
+            return_value=faker.sha1(),
+        )
+        mocker.patch.object(
+            CRUDUsers,
+            "execute_returning",
+            return_value=None,
+        )
+
+        user_schema = schema.UserCreate(
+            email=faker.email(),
+            password=faker.word(),
+        )
+
+        assert (
+            await CRUDUsers(model=model.User).create(db=db, schema=user_schema)
+            is None
+        )
 
 
 class TestUpdate:
-    def test_should_update_the_user_with_the_schema_data_provided(
+    @pytest.mark.asyncio
+    async def test_should_update_the_user_with_the_schema_data_provided(
         self,
         mocker,
     ):
-        db = mocker.MagicMock()
+        db = mocker.AsyncMock()
         user = UserFactory()
 
         hash_password = mocker.patch(
-            f"{MODULE}.security.password.hash_password"
+            f"{MODULE}.security.password.hash_password_async"
         )
         update_method = mocker.patch(
             f"{MODULE}.CRUDBase.update",
@@ -167,7 +281,7 @@ class TestUpdate:
         user_schema = mocker.MagicMock()
         user_schema.password = None
 
-        actual_user = CRUDUsers(model=model.User).update(
+        actual_user = await CRUDUsers(model=model.User).update(
             db=db,
             user=user,
             schema=user_schema,
@@ -182,18 +296,19 @@ class TestUpdate:
         )
         hash_password.assert_not_called()
 
-    def test_should_hash_the_new_password_when_it_is_present_in_schema_data(
+    @pytest.mark.asyncio
+    async def test_should_hash_the_new_password_when_it_is_present_in_schema(
         self,
         faker,
         mocker,
     ):
         plain_password = faker.word()
         hashed_password = faker.sha1()
-        db = mocker.MagicMock()
+        db = mocker.AsyncMock()
         user = UserFactory()
 
         hash_password = mocker.patch(
-            f"{MODULE}.security.password.hash_password",
+            f"{MODULE}.security.password.hash_password_async",
             return_value=hashed_password,
         )
         update_method = mocker.patch(
@@ -208,7 +323,7 @@ class TestUpdate:
             "password": hashed_password,
         }
 
-        actual_user = CRUDUsers(model=model.User).update(
+        actual_user = await CRUDUsers(model=model.User).update(
             db=db,
             user=user,
             schema=user_schema,
@@ -217,7 +332,7 @@ class TestUpdate:
         assert actual_user == user
 
         user_schema.password.get_secret_value.assert_called_once()
-        hash_password.assert_called_once_with(plain_password)
+        hash_password.assert_awaited_once_with(plain_password)
         update_method.assert_called_once_with(
             db=db,
             model=user,
@@ -226,3 +341,176 @@ class TestUpdate:
                 "password": hashed_password,
             },
         )
+
+
+class TestAllWithReports:
+    @pytest.mark.asyncio
+    async def test_should_attach_the_latest_reports_of_each_user(
+        self,
+        faker,
+        mocker,
+    ):
+        users = UserFactory.build_batch(2, reports=[])
+        reports = ReportFactory.build_batch(2, user=users[0])
+        fields = [faker.word()]
+
+        db = mocker.AsyncMock()
+        all = mocker.patch.object(CRUDUsers, "all", return_value=users)
+        latest_by_users = mocker.patch(
+            f"{MODULE}.reports.latest_by_users",
+            return_value={users[0].id: reports},
+        )
+
+        actual_users = await CRUDUsers(model=model.User).all_with_reports(
+            db=db, limit=2, reports_limit=3, report_fields=fields
+        )
+
+        assert actual_users == users
+        assert users[0].reports == reports
+        assert users[1].reports == []
+        all.assert_awaited_once_with(db=db, skip=0, limit=2, cursor=None)
+        latest_by_users.assert_awaited_once_with(
+            db=db,
+            user_ids=[user.id for user in users],
+            limit=3,
+            fields=fields,
+        )
+
+
+class TestCreateMany:
+    @pytest.mark.asyncio
+    async def test_should_insert_the_users_with_the_hashed_passwords(
+        self,
+        faker,
+        mocker,
+    ):
+        user_schemas = [
+            schema.UserCreate(email=faker.email(), password=faker.word())
+            for _ in range(3)
+        ]
+        hashed_passwords = [faker.sha1() for _ in user_schemas]
+        created_users = UserFactory.build_batch(3)
+
+        db = mocker.AsyncMock()
+        hash_passwords = mocker.patch(
+            f"{MODULE}.security.password.hash_passwords_async",
+            return_value=hashed_passwords,
+        )
+        execute_returning_all = mocker.patch.object(
+            CRUDUsers,
+            "execute_returning_all",
+            return_value=created_users,
+        )
+
+        actual_users = await CRUDUsers(model=model.User).create_many(
+            db=db, schemas=user_schemas
+        )
+
+        assert actual_users == created_users
+        assert list(hash_passwords.await_args.args[0]) == [
+            user_schema.password.get_secret_value()
+            for user_schema in user_schemas
+        ]
+        db.commit.assert_awaited_once()
+
+        statement = execute_returning_all.await_args.kwargs["statement"]
+        compiled = statement.compile(dialect=postgresql.dialect())
+        assert "ON CONFLICT (email) DO NOTHING" in str(compiled)
+        assert [
+            compiled.params[f"password_m{index}"]
+            for index in range(len(user_schemas))
+        ] == hashed_passwords
+
+
+class TestUpdateMany:
+    @pytest.mark.asyncio
+    async def test_should_hash_the_password_once_for_all_the_users(
+        self,
+        faker,
+        mocker,
+    ):
+        ids = [faker.pyint() for _ in range(3)]
+        plain_password = faker.word()
+        hashed_password = faker.sha1()
+        db = mocker.AsyncMock()
+
+        hash_password = mocker.patch(
+            f"{MODULE}.security.password.hash_password_async",
+            return_value=hashed_password,
+        )
+        update_many = mocker.patch(f"{MODULE}.CRUDBase.update_many")
+
+        await CRUDUsers(model=model.User).update_many(
+            db=db,
+            ids=ids,
+            schema=schema.UserUpdate(password=plain_password),
+        )
+
+        hash_password.assert_awaited_once_with(plain_password)
+        update_many.assert_awaited_once_with(
+            db=db,
+            ids=ids,
+            schema={"password": hashed_password},
+            batch_size=None,
+        )
+
+
+class TestImportMany:
+    @pytest.mark.asyncio
+    async def test_should_copy_each_batch_and_report_the_conflicts(
+        self,
+        faker,
+        mocker,
+    ):
+        emails = [faker.unique.email() for _ in range(3)]
+        users = [
+            (1, schema.UserCreate(email=emails[0], password="first")),
+            (2, schema.UserCreate(email=emails[0], password="repeated")),
+            (3, schema.UserCreate(email=emails[1], password="second")),
+            (5, schema.UserCreate(email=emails[2], password="third")),
+        ]
+
+        async def stream():
+            for user in users:
+                yield user
+
+        driver_connection = mocker.AsyncMock()
+        connection = mocker.AsyncMock()
+        connection.get_raw_connection.return_value = mocker.MagicMock(
+            driver_connection=driver_connection
+        )
+        result = mocker.MagicMock()
+        result.scalars().all.side_effect = [[3], []]
+        db = mocker.AsyncMock()
+        db.connection.return_value = connection
+        db.execute.return_value = result
+
+        hash_passwords = mocker.patch(
+            f"{MODULE}.security.password.hash_passwords_async",
+            side_effect=lambda plain_texts: [
+                f"hashed-{plain_text}" for plain_text in plain_texts
+            ],
+        )
+
+        created, conflicts = await CRUDUsers(model=model.User).import_many(
+            db=db, users=stream(), batch_size=2
+        )
+
+        assert created == 2
+        assert conflicts == [2, 3]
+
+        connection.run_sync.assert_awaited_once_with(user_import.create)
+        assert hash_passwords.await_count == 2
+        assert [
+            call.kwargs["records"]
+            for call in driver_connection.copy_records_to_table.await_args_list
+        ] == [
+            [(1, emails[0], "hashed-first"), (3, emails[1], "hashed-second")],
+            [(5, emails[2], "hashed-third")],
+        ]
+        db.commit.assert_awaited_once()
+
+        inserted = db.execute.await_args_list[0].args[0]
+        compiled = str(inserted.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (email) DO NOTHING" in compiled
+        assert 'RETURNING "user".email' in compiled
@@ -0,0 +1,61 @@
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from drivr.db.backfill import rewrite
+from drivr.db.compression import RAW, ZLIB, Compressor
+
+MODULE = "drivr.db.backfill"
+
+TEXT = "# Daily report\n\n" + "The vehicle was inspected. " * 100
+
+
+class TestRewrite:
+    @pytest.mark.asyncio
+    async def test_should_store_the_bodies_as_the_compressor_does(self):
+        engine = create_async_engine(
+            "sqlite+aiosqlite://", poolclass=StaticPool
+        )
+        metadata = sa.MetaData()
+        report = sa.Table(
+            "report",
+            metadata,
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("markdown", sa.LargeBinary),
+            sa.Column("html", sa.LargeBinary),
+        )
+        raw = bytes([RAW]) + TEXT.encode()
+
+        async with engine.begin() as connection:
+            await connection.run_sync(metadata.create_all)
+            await connection.execute(
+                report.insert(),
+                [
+                    {"id": 1, "markdown": raw, "html": b"\0<p></p>"},
+                    {"id": 2, "markdown": b"\0short", "html": b"\0<p></p>"},
+                    {"id": 3, "markdown": raw, "html": raw},
+                ],
+            )
+
+        try:
+            rewritten = await rewrite(
+                engine, Compressor(enabled=True, threshold=16), batch_size=2
+            )
+
+            async with engine.connect() as connection:
+                rows = (
+                    await connection.execute(
+                        sa.select(report).order_by(report.c.id)
+                    )
+                ).fetchall()
+        finally:
+            await engine.dispose()
+
+        assert rewritten == 2
+        assert [(row.markdown[0], row.html[0]) for row in rows] == [
+            (ZLIB, RAW),
+            (RAW, RAW),
+            (ZLIB, ZLIB),
+        ]
+        assert rows[1].markdown == b"\0short"
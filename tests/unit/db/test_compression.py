@@ -0,0 +1,137 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from drivr import model
+from drivr.db.base import Entity
+from drivr.db.compression import (
+    RAW,
+    ZLIB,
+    ZLIB_DICTIONARY,
+    Compressor,
+    _samples,
+    read_dictionary,
+    train_dictionary,
+)
+
+MODULE = "drivr.db.compression"
+
+TEXT = "# Daily report\n\n" + "The vehicle was inspected. " * 100
+
+
+class TestCompressor:
+    def test_should_store_the_text_raw_when_disabled(self):
+        assert Compressor().compress(TEXT) == bytes([RAW]) + TEXT.encode()
+
+    def test_should_store_the_text_raw_under_the_threshold(self):
+        compressor = Compressor(enabled=True, threshold=len(TEXT) + 1)
+
+        assert compressor.compress(TEXT)[0] == RAW
+
+    def test_should_store_the_text_raw_when_it_does_not_shrink(self):
+        compressor = Compressor(enabled=True, threshold=0)
+
+        assert compressor.compress("abc") == bytes([RAW]) + b"abc"
+
+    def test_should_compress_the_text_over_the_threshold(self):
+        compressor = Compressor(enabled=True, threshold=16)
+
+        compressed = compressor.compress(TEXT)
+
+        assert compressed[0] == ZLIB
+        assert len(compressed) < len(TEXT)
+        assert compressor.decompress(compressed) == TEXT
+
+    def test_should_compress_with_the_dictionary(self):
+        dictionary = "The vehicle was inspected. ".encode()
+        compressor = Compressor(
+            enabled=True, threshold=16, dictionary=dictionary
+        )
+
+        compressed = compressor.compress(TEXT)
+
+        assert compressed[0] == ZLIB_DICTIONARY
+        assert len(compressed) < len(Compressor(True, 16).compress(TEXT))
+        assert compressor.decompress(compressed) == TEXT
+
+    def test_should_decompress_whatever_was_stored_before(self):
+        stored = Compressor(enabled=True, threshold=16).compress(TEXT)
+
+        assert Compressor().decompress(memoryview(stored)) == TEXT
+
+    def test_should_raise_on_unknown_header(self):
+        with pytest.raises(ValueError):
+            Compressor().decompress(b"\xffdata")
+
+
+class TestReadDictionary:
+    def test_should_read_the_file(self, tmp_path):
+        path = tmp_path / "reports.dict"
+        path.write_bytes(b"dictionary")
+
+        assert read_dictionary(str(path)) == b"dictionary"
+
+    def test_should_be_empty_without_path(self):
+        assert read_dictionary(None) == b""
+
+
+class TestTrainDictionary:
+    def test_should_keep_the_most_valuable_shared_lines_last(self):
+        samples = [
+            "# Daily report\nVehicle: A\nThe vehicle was inspected.",
+            "# Daily report\nVehicle: B\nThe vehicle was inspected.",
+            "# Weekly report\nVehicle: C\nThe vehicle was inspected.",
+        ]
+
+        assert train_dictionary(samples) == (
+            b"# Daily report\nThe vehicle was inspected.\n"
+        )
+
+    def test_should_respect_the_size(self):
+        samples = ["a long shared line\nshort\n"] * 2
+
+        assert train_dictionary(samples, size=8) == b"short\n"
+
+
+class TestSamples:
+    @pytest.mark.asyncio
+    async def test_should_read_the_deferred_bodies_of_the_reports(
+        self,
+        mocker,
+    ):
+        engine = create_async_engine(
+            "sqlite+aiosqlite://", poolclass=StaticPool
+        )
+        session = sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False
+        )
+        now = datetime(2021, 5, 1)
+
+        async with engine.begin() as connection:
+            await connection.run_sync(Entity.metadata.create_all)
+        async with session() as db:
+            db.add_all(
+                [
+                    model.Report(
+                        id=id,
+                        markdown=f"# {id}",
+                        html=f"<h1>{id}</h1>",
+                        created_at=now,
+                        updated_at=now,
+                    )
+                    for id in (1, 2, 3)
+                ]
+            )
+            await db.commit()
+
+        mocker.patch("drivr.db.SessionLocal", session)
+
+        try:
+            samples = [sample async for sample in _samples(limit=2)]
+        finally:
+            await engine.dispose()
+
+        assert samples == ["# 1", "<h1>1</h1>", "# 2", "<h1>2</h1>"]
@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from drivr.db.pool import (
+    InstrumentedNullPool,
+    InstrumentedQueuePool,
+    PoolStatistics,
+    pool_status,
+)
+
+MODULE = "drivr.db.pool"
+
+
+@pytest.fixture
+def statistics(mocker):
+    return mocker.patch(f"{MODULE}.statistics", PoolStatistics())
+
+
+class TestInstrumentedPool:
+    def test_should_observe_the_time_waited_for_a_connection(
+        self,
+        mocker,
+        statistics,
+    ):
+        connection = mocker.MagicMock()
+        mocker.patch.object(
+            AsyncAdaptedQueuePool,
+            "_do_get",
+            return_value=connection,
+        )
+
+        pool = InstrumentedQueuePool(creator=mocker.MagicMock())
+        assert connection == pool._do_get()
+
+        assert statistics.wait_time.count == 1
+        assert statistics.timeouts == 0
+
+    def test_should_count_the_checkouts_that_timed_out(
+        self,
+        mocker,
+        statistics,
+    ):
+        mocker.patch.object(NullPool, "_do_get", side_effect=TimeoutError())
+
+        pool = InstrumentedNullPool(creator=mocker.MagicMock())
+        with pytest.raises(TimeoutError):
+            pool._do_get()
+
+        assert statistics.wait_time.count == 1
+        assert statistics.timeouts == 1
+
+
+class TestPoolStatus:
+    def test_should_include_the_queue_pool_occupancy(
+        self,
+        mocker,
+        statistics,
+    ):
+        statistics.checked_out = 7
+        pool = InstrumentedQueuePool(
+            creator=mocker.MagicMock(),
+            pool_size=5,
+            max_overflow=10,
+        )
+        mocker.patch.object(pool, "checkedin", return_value=0)
+        mocker.patch.object(pool, "overflow", return_value=2)
+
+        status = pool_status(pool)
+
+        assert status["size"] == 5
+        assert status["checked_in"] == 0
+        assert status["checked_out"] == 7
+        assert status["overflow"] == 2
+        assert status["wait_time"]["count"] == 0
+
+    def test_should_report_no_idle_connections_for_the_null_pool(
+        self,
+        mocker,
+        statistics,
+    ):
+        statistics.checked_out = 3
+        pool = InstrumentedNullPool(creator=mocker.MagicMock())
+
+        status = pool_status(pool)
+
+        assert status["size"] == 0
+        assert status["checked_in"] == 0
+        assert status["checked_out"] == 3
+        assert status["overflow"] == 0
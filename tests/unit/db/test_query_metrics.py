@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from drivr.db import metrics
+from drivr.db.metrics import instrument_queries, operation
+
+
+@pytest.mark.parametrize(
+    "statement, expected",
+    [
+        ("SELECT 1", "SELECT"),
+        ("\n  insert into report", "INSERT"),
+        ("WITH inserted AS (...)", "WITH"),
+        ("BEGIN", "OTHER"),
+        ("", "OTHER"),
+    ],
+)
+def test_should_label_the_statement_by_its_keyword(statement, expected):
+    assert operation(statement) == expected
+
+
+def test_should_record_the_statements_of_the_engine(mocker):
+    queries_total = mocker.patch.object(metrics, "queries_total")
+    query_duration = mocker.patch.object(metrics, "query_duration")
+    query_errors_total = mocker.patch.object(metrics, "query_errors_total")
+    engine = create_engine("sqlite://")
+    instrument_queries(engine)
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing"))
+
+    queries_total.inc.assert_called_once_with("SELECT")
+    query_duration.observe.assert_called_once_with("SELECT", value=mocker.ANY)
+    query_errors_total.inc.assert_called_once_with("SELECT")
+
+
+def test_should_read_the_pool_metrics_when_scraped(mocker):
+    mocker.patch.object(
+        metrics,
+        "pool_status",
+        return_value={
+            "size": 5,
+            "checked_in": 3,
+            "checked_out": 2,
+            "overflow": 0,
+            "timeouts": 1,
+        },
+    )
+
+    exposed = "".join(
+        metric.expose() for metric in metrics.pool_metrics(mocker.Mock())
+    )
+
+    assert "db_pool_checked_out 2.0\n" in exposed
+    assert "db_pool_timeouts_total 1.0\n" in exposed
+    assert "# TYPE db_pool_wait_seconds histogram\n" in exposed
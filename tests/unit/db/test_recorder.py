@@ -0,0 +1,49 @@
+from sqlalchemy import create_engine, text
+
+from drivr.db.metrics import instrument_queries
+from drivr.db.recorder import QueryRecorder, recording, shape
+
+
+class TestShape:
+    def test_should_ignore_the_whitespace_and_the_in_list_length(self):
+        assert shape("SELECT *\n  FROM report WHERE id IN (?, ?)") == (
+            shape("SELECT * FROM report WHERE id IN (?, ?, ?, ?)")
+        )
+
+
+class TestQueryRecorder:
+    def test_should_count_the_statements_and_their_duration(self):
+        recorder = QueryRecorder()
+
+        recorder.record("SELECT 1", 0.002)
+        recorder.record("SELECT 2", 0.0005)
+
+        assert recorder.count == 2
+        assert recorder.server_timing() == 'db;dur=2.5;desc="2 queries"'
+
+    def test_should_report_the_selects_repeated_from_the_threshold(self):
+        recorder = QueryRecorder()
+
+        for _ in range(3):
+            recorder.record("SELECT * FROM report WHERE id = ?", 0)
+            recorder.record("INSERT INTO report VALUES (?)", 0)
+        recorder.record("SELECT * FROM user", 0)
+
+        assert recorder.repeated(threshold=3) == [
+            ("SELECT * FROM report WHERE id = ?", 3)
+        ]
+
+
+def test_should_record_the_statements_within_the_context():
+    engine = create_engine("sqlite://")
+    instrument_queries(engine)
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+        with recording() as recorder:
+            connection.execute(text("SELECT 2"))
+            connection.execute(text("SELECT 3"))
+
+    assert recorder.count == 2
+    assert list(recorder.shapes) == ["SELECT 2", "SELECT 3"]
@@ -0,0 +1,35 @@
+from drivr.core.settings import Settings
+from drivr.db.pool import InstrumentedNullPool, InstrumentedQueuePool
+from drivr.db.session import engine_options
+
+
+class TestEngineOptions:
+    def test_should_configure_the_queue_pool_from_the_settings(self):
+        settings = Settings(
+            DB_POOL_SIZE=20,
+            DB_POOL_MAX_OVERFLOW=5,
+            DB_POOL_TIMEOUT=2.5,
+            DB_POOL_RECYCLE=1800,
+            DB_POOL_PRE_PING=True,
+        )
+
+        assert engine_options(settings) == {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": 20,
+            "max_overflow": 5,
+            "pool_timeout": 2.5,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+        }
+
+    def test_should_disable_pooling_and_statement_cache_for_pgbouncer(self):
+        settings = Settings(DB_PGBOUNCER_TRANSACTION_MODE=True)
+
+        assert engine_options(settings) == {
+            "poolclass": InstrumentedNullPool,
+            "pool_pre_ping": False,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+            },
+        }
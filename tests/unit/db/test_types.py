@@ -0,0 +1,39 @@
+from sqlalchemy.dialects import postgresql
+
+from drivr.db.compression import Compressor
+from drivr.db.types import CompressedText
+
+MODULE = "drivr.db.types"
+
+
+class TestCompressedText:
+    def test_should_compress_the_values_written(self, mocker):
+        compressor = mocker.MagicMock(spec=Compressor)
+        column_type = CompressedText(compressor)
+
+        bind = column_type.process_bind_param("text", postgresql.dialect())
+
+        assert bind == compressor.compress.return_value
+        compressor.compress.assert_called_once_with("text")
+
+    def test_should_decompress_the_values_read(self, mocker):
+        compressor = mocker.MagicMock(spec=Compressor)
+        column_type = CompressedText(compressor)
+
+        value = column_type.process_result_value(b"", postgresql.dialect())
+
+        assert value == compressor.decompress.return_value
+        compressor.decompress.assert_called_once_with(b"")
+
+    def test_should_keep_the_nulls(self, mocker):
+        column_type = CompressedText(mocker.MagicMock(spec=Compressor))
+        dialect = postgresql.dialect()
+
+        assert column_type.process_bind_param(None, dialect) is None
+        assert column_type.process_result_value(None, dialect) is None
+
+    def test_should_be_stored_as_bytea(self):
+        column_type = CompressedText(Compressor())
+
+        assert column_type.compile(dialect=postgresql.dialect()) == "BYTEA"
+        assert column_type.python_type is str
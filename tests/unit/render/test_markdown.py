@@ -0,0 +1,58 @@
+import pytest
+
+from drivr.render import markdown
+from drivr.render.markdown import render_markdown, render_markdown_async
+
+MODULE = "drivr.render.markdown"
+
+
+@pytest.fixture(autouse=True)
+def clear_renders():
+    markdown.renders.clear()
+    yield
+    markdown.renders.clear()
+
+
+class TestRenderMarkdown:
+    def test_should_render_the_markdown_as_html(self):
+        assert render_markdown("# Title\n\n**bold**") == (
+            "<h1>Title</h1>\n<p><strong>bold</strong></p>"
+        )
+
+    def test_should_escape_the_raw_html(self):
+        assert render_markdown("<script>alert(1)</script>") == (
+            "&lt;script&gt;alert(1)&lt;/script&gt;"
+        )
+
+    def test_should_strip_the_links_with_unsafe_protocols(self):
+        assert render_markdown("[link](javascript:alert(1))") == (
+            "<p><a>link</a></p>"
+        )
+
+
+class TestRenderMarkdownAsync:
+    @pytest.mark.asyncio
+    async def test_should_render_the_same_content_once(self, mocker):
+        render = mocker.patch(
+            f"{MODULE}.render_markdown", return_value="<p>text</p>"
+        )
+
+        assert "<p>text</p>" == await render_markdown_async("text")
+        assert "<p>text</p>" == await render_markdown_async("text")
+
+        render.assert_called_once_with("text")
+
+    @pytest.mark.asyncio
+    async def test_should_render_the_large_documents_off_the_loop(
+        self,
+        mocker,
+    ):
+        mocker.patch(f"{MODULE}.core.settings.MARKDOWN_OFFLOAD_SIZE", 4)
+        run_in_executor = mocker.patch(
+            "asyncio.BaseEventLoop.run_in_executor",
+            return_value=mocker.AsyncMock(return_value="<p>large</p>")(),
+        )
+
+        assert "<p>large</p>" == await render_markdown_async("large")
+
+        run_in_executor.assert_called_once_with(None, render_markdown, "large")
@@ -0,0 +1,60 @@
+from drivr.security.calibration import calibrate, main, measure
+
+MODULE = "drivr.security.calibration"
+
+
+def latency(time_cost, memory_cost, parallelism):
+    # 10 ms per pass over 64 MiB.
+    return 0.01 * time_cost * memory_cost / 65536
+
+
+class TestCalibrate:
+    def test_should_add_passes_while_they_fit_the_target(self):
+        assert calibrate(
+            target=0.05,
+            max_memory_cost=65536,
+            parallelism=4,
+            measure=latency,
+        ) == (5, 65536, 0.05)
+
+    def test_should_halve_the_memory_until_a_pass_fits_the_target(self):
+        time_cost, memory_cost, _ = calibrate(
+            target=0.025,
+            max_memory_cost=262144,
+            parallelism=4,
+            measure=latency,
+        )
+
+        assert (time_cost, memory_cost) == (1, 131072)
+
+    def test_should_not_go_below_the_minimum_memory(self):
+        assert calibrate(
+            target=0.0,
+            max_memory_cost=64,
+            parallelism=4,
+            measure=latency,
+        )[:2] == (1, 32)
+
+
+def test_should_measure_the_median_latency_of_the_hashes(mocker):
+    argon2 = mocker.patch(f"{MODULE}.argon2")
+    mocker.patch(f"{MODULE}.perf_counter", side_effect=[0, 1, 1, 4, 4, 6])
+
+    assert measure(2, 1024, 1, samples=3) == 2
+
+    argon2.using.assert_called_once_with(
+        rounds=2, memory_cost=1024, parallelism=1
+    )
+    assert argon2.using().hash.call_count == 3
+
+
+def test_should_print_the_settings(mocker, capsys):
+    mocker.patch(f"{MODULE}.calibrate", return_value=(4, 32768, 0.2))
+
+    main(["--target-ms", "200", "--parallelism", "2"])
+
+    assert capsys.readouterr().out == (
+        "ARGON2_TIME_COST=4\n"
+        "ARGON2_MEMORY_COST=32768\n"
+        "ARGON2_PARALLELISM=2\n"
+    )
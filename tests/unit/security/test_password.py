@@ -1,15 +1,35 @@
-from drivr.security.password import hash_password, verify_password
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from passlib.context import CryptContext
+from passlib.hash import argon2
+
+from drivr.security.password import (
+    Admission,
+    HashingPool,
+    PasswordHashingUnavailable,
+    hash_password,
+    hash_password_async,
+    hash_passwords_async,
+    verify_and_update,
+    verify_and_update_async,
+    verify_password,
+    verify_password_async,
+)
 
 MODULE = "drivr.security.password"
 
 
 class TestHashPassword:
-    def test_should_call_argon2_hash(self, faker, mocker):
+    def test_should_hash_with_the_policy(self, faker, mocker):
         plain_text = faker.word()
         hash_return = faker.sha256()
 
         argon2_hash = mocker.patch(
-            f"{MODULE}.argon2.hash", return_value=hash_return
+            f"{MODULE}.context.hash", return_value=hash_return
         )
 
         actual = hash_password(plain_text=plain_text)
@@ -19,13 +39,13 @@ class TestHashPassword:
 
 
 class TestVerifyPassword:
-    def test_should_call_argon2_verify(self, faker, mocker):
+    def test_should_verify_with_the_policy(self, faker, mocker):
         plain_text = faker.word()
         hashed_password = faker.sha256()
         verify_return = faker.boolean()
 
         argon2_verify = mocker.patch(
-            f"{MODULE}.argon2.verify",
+            f"{MODULE}.context.verify",
             return_value=verify_return,
         )
 
@@ -36,3 +56,329 @@ class TestVerifyPassword:
 
         assert verify_return == actual
         argon2_verify.assert_called_once()
+
+
+class TestVerifyAndUpdate:
+    def test_should_rehash_the_passwords_hashed_with_other_parameters(
+        self,
+        mocker,
+    ):
+        policy = CryptContext(
+            schemes=["argon2"],
+            argon2__rounds=1,
+            argon2__memory_cost=64,
+            argon2__parallelism=1,
+        )
+        mocker.patch(f"{MODULE}.context", policy)
+        outdated = policy.handler("argon2").using(rounds=2).hash("secret")
+
+        verified, rehashed = verify_and_update("secret", outdated)
+
+        assert verified
+        assert rehashed.startswith("$argon2id$v=19$m=64,t=1,p=1$")
+        assert verify_and_update("secret", rehashed) == (True, None)
+        assert verify_and_update("wrong", rehashed) == (False, None)
+
+    def test_should_keep_the_hashes_made_with_passlib_defaults(self):
+        existing = argon2.hash("secret")
+
+        assert verify_and_update("secret", existing) == (True, None)
+
+
+class TestHashingPool:
+    @pytest.mark.asyncio
+    async def test_should_run_the_function_in_the_executor(self, mocker):
+        mocker.patch(f"{MODULE}.ProcessPoolExecutor", ThreadPoolExecutor)
+
+        pool = HashingPool(workers=1, queue_size=0, timeout=1)
+        try:
+            assert 3 == await pool.run(sum, [1, 2])
+            assert 0 == pool.pending
+        finally:
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_should_raise_unavailable_when_the_queue_is_full(
+        self,
+        mocker,
+    ):
+        executor = mocker.patch(f"{MODULE}.ProcessPoolExecutor")
+
+        pool = HashingPool(workers=1, queue_size=1, timeout=1)
+        pool.pending = 2
+
+        with pytest.raises(PasswordHashingUnavailable):
+            await pool.run(sum, [1, 2])
+
+        executor.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_should_raise_unavailable_when_the_work_times_out(
+        self,
+        mocker,
+    ):
+        mocker.patch(f"{MODULE}.ProcessPoolExecutor", ThreadPoolExecutor)
+
+        pool = HashingPool(workers=1, queue_size=0, timeout=0.01)
+        try:
+            with pytest.raises(PasswordHashingUnavailable):
+                await pool.run(time.sleep, 0.1)
+            # The worker is still busy with it.
+            assert 1 == pool.pending
+            await asyncio.sleep(0.2)
+            assert 0 == pool.pending
+        finally:
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_should_drop_the_queued_work_that_times_out(self, mocker):
+        mocker.patch(f"{MODULE}.ProcessPoolExecutor", ThreadPoolExecutor)
+
+        pool = HashingPool(workers=1, queue_size=1, timeout=0.05)
+        try:
+            running = asyncio.ensure_future(pool.run(time.sleep, 0.1))
+            await asyncio.sleep(0.01)
+            with pytest.raises(PasswordHashingUnavailable):
+                await pool.run(time.sleep, 0.1)
+            await asyncio.sleep(0.01)
+            assert 1 == pool.pending
+
+            with pytest.raises(PasswordHashingUnavailable):
+                await running
+            await asyncio.sleep(0.1)
+            assert 0 == pool.pending
+        finally:
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_should_replace_the_executor_once_broken(self, mocker):
+        broken = Future()
+        broken.set_exception(BrokenProcessPool())
+        executor = mocker.patch(f"{MODULE}.ProcessPoolExecutor")
+        executor.return_value.submit.return_value = broken
+
+        pool = HashingPool(workers=1, queue_size=0, timeout=1)
+
+        with pytest.raises(PasswordHashingUnavailable):
+            await pool.run(sum, [1, 2])
+        await asyncio.sleep(0)
+
+        executor.return_value.shutdown.assert_called_once_with(wait=False)
+        assert pool._executor is None
+        assert 0 == pool.pending
+
+        executor.return_value.submit.side_effect = BrokenProcessPool()
+
+        with pytest.raises(PasswordHashingUnavailable):
+            await pool.run(sum, [1, 2])
+
+        assert executor.call_count == 2
+        assert pool._executor is None
+        assert 0 == pool.pending
+
+    @pytest.mark.asyncio
+    async def test_should_map_more_items_than_the_queue_takes(self, mocker):
+        mocker.patch(f"{MODULE}.ProcessPoolExecutor", ThreadPoolExecutor)
+
+        pool = HashingPool(workers=2, queue_size=0, timeout=1)
+        try:
+            assert [1, 2, 3, 4, 5] == await pool.map(abs, [-1, 2, -3, 4, -5])
+            assert 0 == pool.pending
+        finally:
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_should_pull_the_items_one_per_worker(self, mocker):
+        pulled = []
+
+        def items():
+            for item in range(5):
+                pulled.append(item)
+                yield item
+
+        async def run(function, item):
+            # Only the items being run have been pulled.
+            assert len(pulled) <= item + 2
+            await asyncio.sleep(0)
+            return function(item)
+
+        pool = HashingPool(workers=2, queue_size=0, timeout=1)
+        mocker.patch.object(pool, "run", run)
+
+        assert [0, 1, 4, 9, 16] == await pool.map(
+            lambda item: item * item, items()
+        )
+
+    @pytest.mark.asyncio
+    async def test_should_stop_mapping_when_an_item_fails(self, mocker):
+        pool = HashingPool(workers=2, queue_size=0, timeout=1)
+        run = mocker.patch.object(
+            pool, "run", side_effect=PasswordHashingUnavailable()
+        )
+
+        with pytest.raises(PasswordHashingUnavailable):
+            await pool.map(abs, range(10))
+
+        assert run.await_count == 2
+
+
+class TestAdmission:
+    @pytest.mark.asyncio
+    async def test_should_queue_the_requests_beyond_the_limit(self):
+        admission = Admission("login", limit=1, queue_size=1, timeout=1)
+        order = []
+
+        async def request(name):
+            async with admission.admit():
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(request("first"), request("second"))
+
+        assert order == ["first", "second"]
+        assert (admission.running, admission.waiting) == (0, 0)
+
+    @pytest.mark.asyncio
+    async def test_should_reject_when_the_queue_is_full(self, mocker):
+        rejections = mocker.patch(f"{MODULE}.admission_rejections_total")
+        admission = Admission("signup", limit=1, queue_size=0, timeout=1)
+
+        async with admission.admit():
+            with pytest.raises(PasswordHashingUnavailable):
+                async with admission.admit():
+                    pass
+
+        rejections.inc.assert_called_once_with("signup", "queue_full")
+
+    @pytest.mark.asyncio
+    async def test_should_reject_when_the_turn_does_not_come_in_time(
+        self,
+        mocker,
+    ):
+        rejections = mocker.patch(f"{MODULE}.admission_rejections_total")
+        admission = Admission("login", limit=1, queue_size=1, timeout=0.01)
+
+        async with admission.admit():
+            with pytest.raises(PasswordHashingUnavailable):
+                async with admission.admit():
+                    pass
+            assert admission.waiting == 0
+
+        rejections.inc.assert_called_once_with("login", "timeout")
+        assert not admission._slots.locked()
+
+    @pytest.mark.asyncio
+    async def test_should_not_keep_the_slot_of_a_cancelled_request(self):
+        admission = Admission("login", limit=1, queue_size=1, timeout=1)
+
+        async def request():
+            async with admission.admit():
+                pass
+
+        async with admission.admit():
+            waiting = asyncio.ensure_future(request())
+            await asyncio.sleep(0)
+            assert admission.waiting == 1
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+
+        assert (admission.running, admission.waiting) == (0, 0)
+        assert not admission._slots.locked()
+
+    @pytest.mark.asyncio
+    async def test_should_give_back_a_slot_taken_while_cancelled(self):
+        admission = Admission("login", limit=1, queue_size=1, timeout=1)
+        admitted = asyncio.Event()
+
+        async def request():
+            async with admission.admit():
+                admitted.set()
+
+        async with admission.admit():
+            waiting = asyncio.ensure_future(request())
+            await asyncio.sleep(0)
+        # The slot is handed to the waiting request, cancelled before it
+        # resumes.
+        waiting.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert not admitted.is_set()
+        assert not admission._slots.locked()
+
+    def test_should_estimate_when_the_queue_is_served(self):
+        admission = Admission("login", limit=2, queue_size=8, timeout=1)
+        admission.duration = 0.5
+        admission.waiting = 7
+
+        assert admission.retry_after() == 2
+
+        admission.waiting = 0
+
+        assert admission.retry_after() == 1
+
+
+class TestHashPasswordAsync:
+    @pytest.mark.asyncio
+    async def test_should_hash_the_password_in_the_pool(self, faker, mocker):
+        plain_text = faker.word()
+        hash_return = faker.sha256()
+
+        run = mocker.patch(f"{MODULE}.pool.run", return_value=hash_return)
+
+        assert hash_return == await hash_password_async(plain_text)
+        run.assert_awaited_once_with(hash_password, plain_text)
+
+
+class TestHashPasswordsAsync:
+    @pytest.mark.asyncio
+    async def test_should_hash_the_passwords_in_the_pool(self, faker, mocker):
+        plain_texts = [faker.word(), faker.word()]
+        hash_return = [faker.sha256(), faker.sha256()]
+
+        map = mocker.patch(f"{MODULE}.pool.map", return_value=hash_return)
+
+        assert hash_return == await hash_passwords_async(plain_texts)
+        map.assert_awaited_once_with(hash_password, plain_texts)
+
+
+class TestVerifyPasswordAsync:
+    @pytest.mark.asyncio
+    async def test_should_verify_the_password_in_the_pool(
+        self,
+        faker,
+        mocker,
+    ):
+        plain_text = faker.word()
+        hashed_password = faker.sha256()
+        verify_return = faker.boolean()
+
+        run = mocker.patch(f"{MODULE}.pool.run", return_value=verify_return)
+
+        assert verify_return == await verify_password_async(
+            plain_text=plain_text,
+            hashed_password=hashed_password,
+        )
+        run.assert_awaited_once_with(
+            verify_password, plain_text, hashed_password
+        )
+
+
+class TestVerifyAndUpdateAsync:
+    @pytest.mark.asyncio
+    async def test_should_verify_and_update_in_the_pool(self, faker, mocker):
+        plain_text = faker.word()
+        hashed_password = faker.sha256()
+        rehashed = faker.sha256()
+
+        run = mocker.patch(f"{MODULE}.pool.run", return_value=(True, rehashed))
+
+        assert (True, rehashed) == await verify_and_update_async(
+            plain_text=plain_text,
+            hashed_password=hashed_password,
+        )
+        run.assert_awaited_once_with(
+            verify_and_update, plain_text, hashed_password
+        )
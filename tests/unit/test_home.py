@@ -9,3 +9,18 @@ def test_should_return_the_hello_message(client: Session):
 
     assert response.status_code == expected_http_status
     assert response.json() == expected_json
+
+
+def test_should_expose_the_metrics_in_the_prometheus_format(client):
+    client.get("/")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == (
+        "text/plain; version=0.0.4; charset=utf-8"
+    )
+    assert (
+        'http_requests_total{method="GET",route="/",status="200"}'
+        in response.text
+    )